@@ -0,0 +1,454 @@
+"""Latency, throughput and round-trip benchmark for OpenSearchRetriever and the chat handler.
+
+Runs against an in-process fake (default) or a local OpenSearch container, with
+deterministic hash embeddings and synthetic specs, so results can be compared across
+commits without deploying the stack:
+
+    python evaluation/benchmark.py --paths 100,1000,10000 --output bench.json
+    python evaluation/benchmark.py --paths 1000 --compare bench.json
+    python evaluation/benchmark.py --opensearch-url http://localhost:9200 --no-nori
+    python evaluation/benchmark.py --paths 1000 --profiles float1024_l2,ip512,ip512_fp16,ip256_fp16,ip512_byte
+
+Scenarios: bulk_write_paths, bulk_write_components, add_documents (cold ingest, then a
+re-ingest of the unchanged spec), _get_relevant_documents (with recall@k on synthetic
+questions), kNN per vector index profile (--profiles: recall@k, latency and estimated native
+memory per vector; the fake runs exact kNN with fp16/byte storage applied, so HNSW parameters and
+approximate-search recall are only measured with --opensearch-url),
+get_path_with_resolved_components and chat_function.lambda_handler for plain questions and
+questions naming a path (endpoint lookup), sync and with CHAT_ASYNC (with a fake chat model;
+needs the layer at /opt/python like the Lambda runtime).
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import itertools
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+EVALUATION_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(EVALUATION_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, "lambda", "layer"))
+
+import bootstrap  # noqa: E402
+from fakes import HashEmbeddings, fake_async_opensearch_client, fake_opensearch_client  # noqa: E402
+from recall import recall_at_k  # noqa: E402
+from synthetic import synthetic_questions, synthetic_spec  # noqa: E402
+
+module = bootstrap.retriever_module()
+vectorprofile = bootstrap.load_layer_module("vectorprofile")
+from langchain.docstore.document import Document  # noqa: E402
+
+CHAT_FUNCTION_PATH = os.path.join(REPO_DIR, "lambda", "function", "chat_function.py")
+INDEX_MAPPINGS = {
+    "paths": "index_paths.json",
+    "components": "index_components.json",
+    "vector_paths": "index_vector.json",
+    "vector_components": "index_vector.json",
+}
+
+
+class RoundTripCounter:
+    """Counts requests (and request body bytes) sent through the transports of one or more clients."""
+
+    def __init__(self, client: Any):
+        self.requests = 0
+        self.request_bytes = 0
+        self._lock = threading.Lock()
+        self.count(client)
+
+    def count(self, client: Any):
+        perform_request = client.transport.perform_request
+
+        def record(body: Any):
+            size = len(body) if isinstance(body, (str, bytes)) else len(json.dumps(body)) if body is not None else 0
+            with self._lock:
+                self.requests += 1
+                self.request_bytes += size
+
+        def counting_perform_request(method, url, params=None, body=None, *args, **kwargs):
+            record(body)
+            return perform_request(method, url, params=params, body=body, *args, **kwargs)
+
+        async def counting_async_perform_request(method, url, params=None, body=None, *args, **kwargs):
+            record(body)
+            return await perform_request(method, url, params=params, body=body, *args, **kwargs)
+
+        client.transport.perform_request = counting_async_perform_request if asyncio.iscoroutinefunction(perform_request) else counting_perform_request
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"requests": self.requests, "request_bytes": self.request_bytes}
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    # nearest-rank 방식
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def measure(name: str, counter: RoundTripCounter, operations: List[Callable[[], Any]], units_per_op: int = 1,
+            extra: Optional[Callable[[List[Any]], Dict[str, Any]]] = None) -> Dict[str, Any]:
+    before = counter.snapshot()
+    latencies = []
+    results = []
+    started = time.perf_counter()
+    for operation in operations:
+        op_started = time.perf_counter()
+        results.append(operation())
+        latencies.append((time.perf_counter() - op_started) * 1000)
+    elapsed = time.perf_counter() - started
+    after = counter.snapshot()
+    result = {
+        "scenario": name,
+        "ops": len(operations),
+        "units": units_per_op * len(operations),
+        "seconds": round(elapsed, 4),
+        "throughput": round(units_per_op * len(operations) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 0.50), 3),
+            "p95": round(percentile(latencies, 0.95), 3),
+            "p99": round(percentile(latencies, 0.99), 3),
+            "max": round(max(latencies), 3),
+        },
+        "round_trips": after["requests"] - before["requests"],
+        "round_trips_per_op": round((after["requests"] - before["requests"]) / len(operations), 2),
+        "request_bytes": after["request_bytes"] - before["request_bytes"],
+    }
+    if extra:
+        result.update(extra(results))
+    print(f"  {name:<44} {result['throughput']:>10.1f}/s  p50 {result['latency_ms']['p50']:>9.2f}ms  "
+          f"p95 {result['latency_ms']['p95']:>9.2f}ms  p99 {result['latency_ms']['p99']:>9.2f}ms  "
+          f"rt/op {result['round_trips_per_op']:>7.2f}"
+          + "".join(f"  {key} {value}" for key, value in result.items() if key.startswith(("recall@", "errors", "bytes_per_vector"))))
+    return result
+
+
+def load_mapping(file_name: str, dimensions: int, nori: bool) -> Dict:
+    with open(os.path.join(REPO_DIR, "json", file_name), encoding="utf-8") as f:
+        mapping = json.load(f)
+    properties = mapping.get("mappings", {}).get("properties", {})
+    if "vector_field" in properties:
+        properties["vector_field"]["dimension"] = dimensions
+    if not nori:
+        # nori 플러그인이 없는 로컬 컨테이너용: 기본 analyzer 사용
+        mapping.get("settings", {}).pop("analysis", None)
+        for field in properties.values():
+            field.pop("analyzer", None)
+            field.pop("search_analyzer", None)
+    return mapping
+
+
+def path_document(path: str, item: Dict, spec_id: Optional[str] = None) -> Document:
+    summaries = [
+        " | ".join(filter(None, [f"{method.upper()} {path}", operation.get("summary"), operation.get("description")]))
+        for method, operation in item.items() if isinstance(operation, dict)
+    ]
+    metadata = {"id": path, "embedding_text": "\n".join(summaries)}
+    if spec_id:
+        metadata["spec_id"] = spec_id
+    return Document(page_content=json.dumps({path: item}, ensure_ascii=False), metadata=metadata)
+
+
+def spec_document(spec_id: str, spec: Dict) -> Document:
+    # s3_function처럼 스펙 공통 헤더를 벡터 없는 문서 하나로 저장
+    return Document(page_content=json.dumps({"info": spec["info"]}, ensure_ascii=False), metadata={"id": spec_id, "type": "spec"})
+
+
+def schema_document(name: str, schema: Dict) -> Document:
+    text = f"schema {name} | {schema.get('description', '')} | properties: {', '.join(schema.get('properties', {}))}"
+    return Document(page_content=json.dumps({name: schema}, ensure_ascii=False),
+                    metadata={"id": f"schemas_{name}", "embedding_text": text})
+
+
+class Benchmark:
+    def __init__(self, args):
+        self.args = args
+        self.embeddings = HashEmbeddings(args.dimensions)
+        prefix = "" if args.opensearch_url is None else args.index_prefix
+        self.index_names = {name: f"{prefix}{name}" for name in INDEX_MAPPINGS}
+        if args.opensearch_url:
+            from opensearchpy import AsyncOpenSearch, OpenSearch
+            http_auth = (args.user, args.password) if args.user else None
+            self.client = OpenSearch(hosts=[args.opensearch_url], http_auth=http_auth, verify_certs=False,
+                                     ssl_show_warn=False, timeout=60)
+            self.async_client_factory = lambda: self.counted(AsyncOpenSearch(
+                hosts=[args.opensearch_url], http_auth=http_auth, verify_certs=False, ssl_show_warn=False, timeout=60))
+        else:
+            self.client = fake_opensearch_client(latency=args.latency_ms / 1000)
+            self.async_client_factory = lambda: self.counted(fake_async_opensearch_client(self.client))
+        self.counter = RoundTripCounter(self.client)
+
+    def counted(self, client: Any) -> Any:
+        self.counter.count(client)
+        return client
+
+    def retriever(self, index: str, **kwargs) -> Any:
+        return module.OpenSearchRetriever(
+            client=self.client,
+            index_name=self.index_names[index],
+            embedding_function=self.embeddings,
+            vector_field="vector_field",
+            **kwargs
+        )
+
+    def vector_retriever(self, index: str) -> Any:
+        from langchain_community.vectorstores import OpenSearchVectorSearch
+        vector_search = OpenSearchVectorSearch(
+            index_name=self.index_names[index],
+            opensearch_url=self.args.opensearch_url or "http://fake-opensearch:9200",
+            embedding_function=self.embeddings,
+            engine="faiss",
+            space_type="l2",
+        )
+        return self.retriever(index, k=self.args.k, vector_search=vector_search, fusion=self.args.fusion,
+                              parent_cache_size=1024)
+
+    def profile_retriever(self, profile: Any) -> Any:
+        # 프로파일마다 별도 벡터 인덱스: 차원/공간/저장 형식이 매핑에 고정되므로
+        from langchain_community.vectorstores import OpenSearchVectorSearch
+        index = f"vector_paths_{profile.name}"
+        self.index_names[index] = f"{self.index_names['vector_paths']}_{profile.name}"
+        # Titan v2의 출력 차원 대신 같은 차원의 해시 임베딩 사용 (byte 프로파일은 int8로 양자화)
+        embeddings = profile.wrap_embeddings(HashEmbeddings(profile.dimensions))
+        vector_search = OpenSearchVectorSearch(
+            index_name=self.index_names[index],
+            opensearch_url=self.args.opensearch_url or "http://fake-opensearch:9200",
+            embedding_function=embeddings,
+            engine=profile.engine,
+            space_type=profile.space_type,
+        )
+        retriever = module.OpenSearchRetriever(client=self.client, index_name=self.index_names[index], embedding_function=embeddings,
+                                               vector_field="vector_field", k=self.args.k, vector_search=vector_search)
+        retriever.create_index(self.index_names[index], profile.apply(load_mapping("index_vector.json", profile.dimensions, not self.args.no_nori)))
+        return retriever
+
+    def create_indices(self):
+        admin = self.retriever("paths")
+        for index, file_name in INDEX_MAPPINGS.items():
+            admin.create_index(self.index_names[index], load_mapping(file_name, self.args.dimensions, not self.args.no_nori))
+
+    def delete_indices(self):
+        for name in self.index_names.values():
+            self.client.indices.delete(index=name, ignore=[404])
+
+    def run(self, num_paths: int) -> List[Dict[str, Any]]:
+        args = self.args
+        spec = synthetic_spec(num_paths, seed=args.seed)
+        questions = synthetic_questions(spec, args.queries, seed=args.seed)
+        dependencies = module.compute_component_dependencies(spec)
+        source = f"s3://benchmark/synthetic-{num_paths}.json"
+        schemas = spec["components"]["schemas"]
+        print(f"{num_paths} paths, {len(schemas)} schemas, {len(questions)} questions")
+
+        self.create_indices()
+        results = []
+        paths_retriever = self.retriever("paths", components_index_name=self.index_names["components"],
+                                         component_cache_size=args.component_cache_size)
+        components_retriever = self.retriever("components")
+        vector_paths = self.vector_retriever("vector_paths")
+        vector_components = self.vector_retriever("vector_components")
+
+        for label in ("cold", "unchanged"):
+            # 두 번째 실행은 같은 스펙의 재업로드: 증분 ingest 경로(해시 비교)만 측정
+            results.append(measure(f"bulk_write_paths ({label})", self.counter, [
+                lambda: paths_retriever.bulk_write_paths({"spec_id": f"spec:{source}", "paths": spec["paths"]},
+                                                         dependencies=dependencies["paths"], source=source)
+            ], units_per_op=len(spec["paths"])))
+            results.append(measure(f"bulk_write_components ({label})", self.counter, [
+                lambda: components_retriever.bulk_write_components({"components": spec["components"]},
+                                                                   dependencies=dependencies["components"], source=source)
+            ], units_per_op=len(schemas)))
+            results.append(measure(f"add_documents paths ({label})", self.counter, [
+                lambda: vector_paths.add_documents(itertools.chain(
+                    [spec_document(f"spec:{source}", spec)],
+                    (path_document(path, item, f"spec:{source}") for path, item in spec["paths"].items())
+                ), source=source)
+            ], units_per_op=len(spec["paths"])))
+            results.append(measure(f"add_documents components ({label})", self.counter, [
+                lambda: vector_components.add_documents((schema_document(name, schema) for name, schema in schemas.items()), source=source)
+            ], units_per_op=len(schemas)))
+
+        def retrieval_quality(documents: List[List[Document]]) -> Dict[str, Any]:
+            return {f"recall@{k}": round(sum(recall_at_k(docs, question["relevant"], k) for docs, question in zip(documents, questions)) / len(questions), 4)
+                    for k in (1, 5, args.k)}
+
+        for leg in ("paths", "components"):
+            retriever = vector_paths if leg == "paths" else vector_components
+            # ingest 직후 첫 검색의 일회성 비용(fake의 역색인/벡터 행렬 생성, 원격 캐시 적재)은 측정에서 제외
+            retriever._get_relevant_documents(questions[0]["question"])
+            results.append(measure(f"_get_relevant_documents {leg}", self.counter, [
+                (lambda question=question: retriever._get_relevant_documents(question["question"])) for question in questions
+            ], extra=retrieval_quality if leg == "paths" else None))
+
+        profiles = list(filter(None, (args.profiles or "").split(",")))
+        if profiles and args.opensearch_url is None:
+            print("  note: the fake runs exact kNN (fp16/byte storage is modeled, HNSW m/ef_* are not); "
+                  "profile recall and latency are only meaningful with --opensearch-url")
+        for name in profiles:
+            # 벡터 검색(kNN)만 측정: 프로파일별 recall, 지연시간과 벡터당 예상 네이티브 메모리
+            profile = vectorprofile.get_profile(name)
+            retriever = self.profile_retriever(profile)
+            retriever.add_documents((path_document(path, item) for path, item in spec["paths"].items()))
+            retriever._vector_search(questions[0]["question"])
+            results.append(measure(f"knn {profile.name}", self.counter, [
+                (lambda question=question: [doc for doc, _ in retriever._vector_search(question["question"])]) for question in questions
+            ], extra=lambda documents, profile=profile: {
+                **retrieval_quality(documents),
+                "bytes_per_vector": round(profile.memory_bytes_per_vector(), 1),
+                "profile": profile._asdict(),
+            }))
+
+        sample_paths = [question["relevant"][0] for question in questions]
+        results.append(measure("get_path_with_resolved_components", self.counter, [
+            (lambda path=path: paths_retriever.get_path_with_resolved_components(path)) for path in sample_paths
+        ]))
+
+        for chat_async in (False, True):
+            chat = self.load_chat_function(chat_async)
+            if chat is None:
+                break
+
+            # 질문마다 다른 문장을 써서 검색 결과 캐시에 걸리지 않게 함
+            def invoke(message: str, chat=chat) -> Dict[str, Any]:
+                # handler의 print 출력은 측정 결과에 섞이지 않도록 버림
+                with contextlib.redirect_stdout(io.StringIO()):
+                    return chat.lambda_handler({"body": json.dumps({"message": message})}, None)
+
+            results.append(measure("chat_function.lambda_handler" + (" (async)" if chat_async else ""), self.counter, [
+                (lambda message=f"{question['question']} ({index})": invoke(message))
+                for index, question in enumerate(questions)
+            ], extra=lambda responses: {"errors": sum(1 for response in responses if response["statusCode"] != 200)}))
+
+            # 질문에 path template이 그대로 있으면 endpoint 인덱스에서 바로 찾고 임베딩/kNN/BM25를 건너뜀
+            results.append(measure("chat_function.lambda_handler (endpoint" + (", async)" if chat_async else ")"), self.counter, [
+                (lambda message=f"What does {next(iter(spec['paths'][path])).upper()} {path} return? ({index})": invoke(message))
+                for index, path in enumerate(sample_paths)
+            ], extra=lambda responses: {"errors": sum(1 for response in responses if response["statusCode"] != 200)}))
+
+        if args.opensearch_url and not args.keep_indices:
+            self.delete_indices()
+        for result in results:
+            result["paths"] = num_paths
+        return results
+
+    def load_chat_function(self, chat_async: bool = False) -> Optional[Any]:
+        if self.args.skip_chat:
+            return None
+        if not os.path.exists("/opt/python/bootstrap.py"):
+            print("  chat_function.lambda_handler skipped: the layer must be at /opt/python "
+                  "(e.g. ln -s \"$PWD/lambda/layer\" /opt/python)")
+            return None
+        from langchain_core.language_models.fake_chat_models import FakeListChatModel
+
+        os.environ.update(
+            PATHS_INDEX_NAME=self.index_names["paths"],
+            COMPONENTS_INDEX_NAME=self.index_names["components"],
+            VECTORS_PATH_INDEX_NAME=self.index_names["vector_paths"],
+            VECTORS_COMPONENTS_INDEX_NAME=self.index_names["vector_components"],
+            RETRIEVAL_FUSION=self.args.fusion,
+            CHAT_ASYNC="true" if chat_async else "false",
+        )
+        os.environ.pop("HYBRID_SEARCH_PIPELINE", None)
+        # 답변 캐시에 걸리면 검색/생성 경로가 측정되지 않으므로 끔
+        os.environ.pop("ANSWER_CACHE_INDEX_NAME", None)
+        # 크기별로 새 모듈을 로드해 warm 캐시가 이전 실행의 결과를 재사용하지 않게 함
+        spec = importlib.util.spec_from_file_location("chat_function_benchmark", CHAT_FUNCTION_PATH)
+        chat = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(chat)
+        chat.bootstrap._instances.update({
+            "opensearch_client": self.client,
+            "async_opensearch_client": self.async_client_factory() if chat_async else None,
+            "embeddings": self.embeddings,
+            f"chat_model_{chat.model_id}": FakeListChatModel(responses=["benchmark answer"]),
+        })
+        chat.bootstrap._parameters.update(opensearchdomain="fake-opensearch:9200", opensearchid="", opensearchpassword="")
+        return chat
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_DIR, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def compare(results: List[Dict[str, Any]], baseline_path: str):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    previous = {(result["paths"], result["scenario"]): result for result in baseline["results"]}
+    print(f"\nCompared with {baseline_path} (commit {baseline.get('commit', '?')}):")
+    matched = [(result, previous[(result["paths"], result["scenario"])]) for result in results
+               if (result["paths"], result["scenario"]) in previous]
+    if not matched:
+        print("  no scenarios with the same spec size in the baseline")
+    for result, before in matched:
+        def change(new: float, old: float) -> str:
+            return f"{(new - old) / old * 100:+7.1f}%" if old else "    n/a"
+        print(f"  {result['paths']:>6} {result['scenario']:<44} "
+              f"p50 {change(result['latency_ms']['p50'], before['latency_ms']['p50'])}  "
+              f"p95 {change(result['latency_ms']['p95'], before['latency_ms']['p95'])}  "
+              f"throughput {change(result['throughput'], before['throughput'])}  "
+              f"rt/op {before['round_trips_per_op']} -> {result['round_trips_per_op']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark OpenSearchRetriever and the chat handler offline")
+    parser.add_argument("--paths", default="1000", help="comma separated spec sizes (number of paths, up to 50000)")
+    parser.add_argument("--queries", type=int, default=100, help="timed queries per retrieval scenario")
+    parser.add_argument("--k", type=int, default=15)
+    parser.add_argument("--fusion", default="rrf", choices=module.FUSION_STRATEGIES)
+    parser.add_argument("--dimensions", type=int, default=256, help="fake embedding dimensions")
+    parser.add_argument("--component-cache-size", type=int, default=0)
+    parser.add_argument("--profiles", help="comma separated vector index profiles to compare "
+                                           f"({', '.join(vectorprofile.PROFILES)})")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="simulated network latency per request (fake only)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--opensearch-url", help="use a local OpenSearch container instead of the in-process fake")
+    parser.add_argument("--user")
+    parser.add_argument("--password")
+    parser.add_argument("--no-nori", action="store_true", help="drop the nori analyzer from index mappings")
+    parser.add_argument("--index-prefix", default="bench_", help="index name prefix on a real cluster")
+    parser.add_argument("--keep-indices", action="store_true")
+    parser.add_argument("--skip-chat", action="store_true")
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    # opensearchretriever가 import 시 root logger를 INFO로 설정하므로 여기서 다시 지정
+    logging.getLogger().setLevel(logging.INFO if args.verbose else logging.ERROR)
+
+    sizes = [int(size) for size in args.paths.split(",")]
+    results = []
+    for size in sizes:
+        benchmark = Benchmark(args)
+        results.extend(benchmark.run(size))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "backend": args.opensearch_url or "fake",
+        "config": {key: value for key, value in vars(args).items() if key not in ("password", "output", "compare")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
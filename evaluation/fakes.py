@@ -0,0 +1,442 @@
+"""In-process stand-ins for OpenSearch and Bedrock embeddings used by the benchmark.
+
+``FakeTransport`` answers the REST calls OpenSearchRetriever and OpenSearchVectorSearch
+make (bulk, search, scroll, mget, index and mapping APIs) from memory, so the real
+opensearch-py client, helpers and serialization run unchanged. Scoring is a small BM25
+for ``match`` and brute-force ``knn`` in the field's space (cosinesimil, innerproduct or l2,
+with fp16 encoders and ``data_type: byte`` applied to the stored and query vectors). kNN is
+exact, so HNSW parameters have no effect and profile recall is an upper bound; it is meant for relative
+latency and round-trip comparisons, not for reproducing OpenSearch relevance exactly.
+``AsyncFakeTransport`` serves the same indices to ``AsyncOpenSearch`` for the async chat path.
+"""
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from opensearchpy import AsyncOpenSearch, AsyncTransport, OpenSearch, Transport
+from opensearchpy.exceptions import NotFoundError, RequestError
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text: str) -> List[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def _get_field(source: Dict, field: str) -> Any:
+    value = source
+    for part in field.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def _to_int8(values: Any) -> Any:
+    # data_type: byte 필드는 -128..127 정수만 저장 (OpenSearch는 범위 밖/소수 값을 거부, fake는 반올림해서 저장)
+    return np.clip(np.rint(values), -128, 127).astype(np.float32)
+
+
+def _field_values(source: Dict, field: str) -> List[Any]:
+    value = _get_field(source, field)
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings: each token is hashed to a signed dimension.
+
+    Texts that share words get similar vectors, which is enough to exercise the vector
+    leg without calling Bedrock.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.model_id = f"hash-embedding-{dimensions}"
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._lock:
+            self.calls += 1
+        vector = [0.0] * self.dimensions
+        for token in tokenize(text):
+            digest = hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+        return [value / norm for value in vector]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+class FakeIndex:
+    def __init__(self, body: Optional[Dict] = None):
+        self.body = body or {}
+        self.docs: Dict[str, Dict] = {}
+        self.meta: Dict[str, Any] = dict((self.body.get("mappings") or {}).get("_meta") or {})
+        self._postings: Dict[str, Tuple[Dict[str, Dict[str, int]], Dict[str, int], float]] = {}
+        self._vectors: Dict[str, Tuple[List[str], Any]] = {}
+
+    def write(self, doc_id: str, source: Dict) -> str:
+        result = "updated" if doc_id in self.docs else "created"
+        self.docs[doc_id] = source
+        self._invalidate()
+        return result
+
+    def delete(self, doc_id: str) -> bool:
+        self._invalidate()
+        return self.docs.pop(doc_id, None) is not None
+
+    def searchable(self, field: str) -> bool:
+        # dynamic: false(또는 strict) 아래의 매핑되지 않은 필드와 enabled: false 객체는 _source에만 있고 색인되지 않음
+        mapping = self.body.get("mappings") or {}
+        dynamic = True
+        for part in field.split("."):
+            if mapping.get("enabled") is False:
+                return False
+            dynamic = str(mapping.get("dynamic", dynamic)).lower() == "true"
+            properties = mapping.get("properties") or {}
+            if part not in properties:
+                return dynamic
+            mapping = properties[part]
+        return mapping.get("enabled") is not False
+
+    def _invalidate(self):
+        self._postings.clear()
+        self._vectors.clear()
+
+    def postings(self, field: str) -> Tuple[Dict[str, Dict[str, int]], Dict[str, int], float]:
+        # 검색 때마다 다시 토큰화하지 않도록 다음 쓰기 전까지 필드별 역색인을 캐시
+        if field not in self._postings:
+            postings = {}
+            lengths = {}
+            for doc_id, source in self.docs.items():
+                text = " ".join(str(value) for value in _field_values(source, field))
+                counts = Counter(tokenize(text))
+                lengths[doc_id] = sum(counts.values())
+                for term, count in counts.items():
+                    postings.setdefault(term, {})[doc_id] = count
+            average = sum(lengths.values()) / max(1, len(lengths))
+            self._postings[field] = (postings, lengths, average)
+        return self._postings[field]
+
+    def vector_method(self, field: str) -> Tuple[str, Optional[str], Optional[str]]:
+        # (space_type, engine, encoder): method가 없으면 인덱스 설정 knn.space_type, 그것도 없으면 OpenSearch 기본값 l2
+        mapping = ((self.body.get("mappings") or {}).get("properties") or {}).get(field, {})
+        method = mapping.get("method") or {}
+        settings = self.body.get("settings") or {}
+        index_settings = settings.get("index") or {}
+        space_type = method.get("space_type") or index_settings.get("knn.space_type") or settings.get("index.knn.space_type") or "l2"
+        encoder = ((method.get("parameters") or {}).get("encoder") or {}).get("parameters", {}).get("type")
+        return space_type, method.get("engine"), encoder
+
+    def vector_data_type(self, field: str) -> str:
+        mapping = ((self.body.get("mappings") or {}).get("properties") or {}).get(field, {})
+        return mapping.get("data_type", "float")
+
+    def vectors(self, field: str) -> Tuple[List[str], Any]:
+        if field not in self._vectors:
+            ids = [doc_id for doc_id, source in self.docs.items() if isinstance(source.get(field), list)]
+            matrix = np.array([self.docs[doc_id][field] for doc_id in ids], dtype=np.float32) if ids else None
+            space_type, _, encoder = self.vector_method(field)
+            if matrix is not None and encoder == "fp16":
+                # faiss SQ fp16: 저장된 벡터만 half precision으로 반올림
+                matrix = matrix.astype(np.float16).astype(np.float32)
+            if matrix is not None and self.vector_data_type(field) == "byte":
+                matrix = _to_int8(matrix)
+            if matrix is not None and space_type == "cosinesimil":
+                matrix /= np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+            self._vectors[field] = (ids, matrix)
+        return self._vectors[field]
+
+
+class FakeTransport(Transport):
+    """opensearch-py transport that serves requests from in-memory indices."""
+
+    def __init__(self, hosts: Any, **kwargs: Any):
+        super().__init__(hosts, **kwargs)
+        self.indices = {}
+        self._scrolls: Dict[str, List[Dict]] = {}
+        self._lock = threading.RLock()
+        # 요청마다 더할 네트워크 지연(초): 왕복 횟수 차이가 지연시간에 드러나도록 함
+        self.latency = 0.0
+
+    def perform_request(self, method: str, url: str, params: Optional[Dict] = None, body: Any = None,
+                        timeout: Any = None, ignore: Any = (), headers: Any = None) -> Any:
+        if self.latency:
+            time.sleep(self.latency)
+        return self.handle(method, url, params, body, ignore)
+
+    def handle(self, method: str, url: str, params: Optional[Dict], body: Any, ignore: Any = ()) -> Any:
+        params = dict(params or {})
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode("utf-8")
+        if isinstance(body, str) and not url.endswith("_bulk"):
+            body = json.loads(body)
+        parts = [unquote(part) for part in url.strip("/").split("/") if part]
+        with self._lock:
+            try:
+                return self._route(method, parts, params, body)
+            except (NotFoundError, RequestError) as e:
+                if e.status_code in (ignore if isinstance(ignore, (list, tuple, set)) else (ignore,)):
+                    return e.info
+                raise
+
+    def _route(self, method: str, parts: List[str], params: Dict, body: Any) -> Any:
+        if parts[:2] == ["_search", "scroll"]:
+            return self._scroll(method, body)
+        if parts[:2] == ["_search", "pipeline"]:
+            return {"acknowledged": True}
+        if parts and parts[-1] == "_bulk":
+            return self._bulk(parts[0] if len(parts) > 1 else None, body)
+        if parts and parts[-1] == "_delete_by_query":
+            return self._delete_by_query(parts[0], body or {})
+        if len(parts) == 2 and parts[1] == "_doc" and method == "POST":
+            doc_id = hashlib.sha1(f"{len(self._index(parts[0]).docs)}:{json.dumps(body, sort_keys=True)}".encode()).hexdigest()
+            return {"_index": parts[0], "_id": doc_id, "result": self._index(parts[0]).write(doc_id, body)}
+        if parts and parts[-1] == "_mget":
+            return self._mget(parts[0] if len(parts) > 1 else None, body)
+        if len(parts) == 2 and parts[1] == "_search":
+            return self._search(parts[0], body or {}, params)
+        if len(parts) == 2 and parts[1] == "_mapping":
+            return self._mapping(method, parts[0], body)
+        if len(parts) == 2 and parts[1] == "_refresh":
+            return {"_shards": {"total": 1, "successful": 1, "failed": 0}}
+        if len(parts) == 1:
+            return self._index_api(method, parts[0], body)
+        raise RequestError(400, "unsupported_operation", f"{method} /{'/'.join(parts)} is not supported by the fake")
+
+    def _index(self, name: str) -> FakeIndex:
+        if name not in self.indices:
+            raise NotFoundError(404, "index_not_found_exception", {"error": {"type": "index_not_found_exception", "index": name}})
+        return self.indices[name]
+
+    def _index_api(self, method: str, name: str, body: Any) -> Any:
+        if method == "HEAD":
+            return name in self.indices
+        if method == "PUT":
+            if name in self.indices:
+                raise RequestError(400, "resource_already_exists_exception", {"error": {"type": "resource_already_exists_exception"}})
+            self.indices[name] = FakeIndex(body)
+            return {"acknowledged": True, "index": name}
+        if method == "DELETE":
+            self._index(name)
+            del self.indices[name]
+            return {"acknowledged": True}
+        raise RequestError(400, "unsupported_operation", f"{method} /{name}")
+
+    def _mapping(self, method: str, names: str, body: Any) -> Any:
+        if method == "PUT":
+            index = self._index(names)
+            index.meta.update((body or {}).get("_meta") or {})
+            return {"acknowledged": True}
+        return {name: {"mappings": {"_meta": dict(self._index(name).meta)}} for name in names.split(",")}
+
+    def _bulk(self, default_index: Optional[str], body: Any) -> Dict:
+        lines = body.splitlines() if isinstance(body, str) else list(body)
+        items = []
+        errors = False
+        position = 0
+        while position < len(lines):
+            line = lines[position]
+            position += 1
+            if not line:
+                continue
+            action = json.loads(line) if isinstance(line, str) else line
+            op, meta = next(iter(action.items()))
+            name = meta.get("_index", default_index)
+            index = self.indices.setdefault(name, FakeIndex())
+            if op == "delete":
+                found = index.delete(meta["_id"])
+                items.append({op: {"_index": name, "_id": meta["_id"], "status": 200 if found else 404,
+                                   "result": "deleted" if found else "not_found"}})
+                continue
+            source = lines[position]
+            position += 1
+            source = json.loads(source) if isinstance(source, str) else source
+            doc_id = meta.get("_id") or hashlib.sha1(json.dumps(source, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+            if op == "create" and doc_id in index.docs:
+                errors = True
+                items.append({op: {"_index": name, "_id": doc_id, "status": 409, "error": {"type": "version_conflict_engine_exception"}}})
+                continue
+            if op == "update":
+                source = {**index.docs.get(doc_id, {}), **source.get("doc", {})}
+            result = index.write(doc_id, source)
+            items.append({op: {"_index": name, "_id": doc_id, "status": 201 if result == "created" else 200, "result": result}})
+        return {"took": 0, "errors": errors, "items": items}
+
+    def _mget(self, default_index: Optional[str], body: Dict) -> Dict:
+        docs = []
+        requests = body.get("docs") or [{"_id": doc_id} for doc_id in body.get("ids", [])]
+        for request in requests:
+            name = request.get("_index", default_index)
+            index = self.indices.get(name)
+            source = index.docs.get(request["_id"]) if index else None
+            doc = {"_index": name, "_id": request["_id"], "found": source is not None}
+            if source is not None:
+                doc["_source"] = copy.deepcopy(source)
+            docs.append(doc)
+        return {"docs": docs}
+
+    def _search(self, names: str, body: Dict, params: Dict) -> Dict:
+        query = body.get("query", {"match_all": {}})
+        if "hybrid" in query:
+            # neural-search 플러그인이 없는 클러스터처럼 동작 (retriever는 Python 결합으로 fallback)
+            raise RequestError(400, "parsing_exception", "unknown query [hybrid]")
+        size = int(params.get("size", body.get("size", 10)))
+        hits = []
+        for name in names.split(","):
+            index = self._index(name)
+            scored = self._evaluate(index, query)
+            hits.extend({"_index": name, "_id": doc_id, "_score": score, "_source": index.docs[doc_id]} for doc_id, score in scored.items())
+        hits.sort(key=lambda hit: hit["_score"], reverse=True)
+        if "scroll" not in params:
+            hits = hits[:size]
+        excludes = ((body.get("_source") or {}) if isinstance(body.get("_source"), dict) else {}).get("excludes", [])
+        hits = [{**hit, "_source": {key: value for key, value in copy.deepcopy(hit["_source"]).items() if key not in excludes}} for hit in hits]
+
+        response = {"took": 0, "timed_out": False, "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                    "hits": {"total": {"value": len(hits), "relation": "eq"}, "max_score": hits[0]["_score"] if hits else None}}
+        if "scroll" in params:
+            scroll_id = str(len(self._scrolls) + 1)
+            self._scrolls[scroll_id] = hits[size:]
+            response["_scroll_id"] = scroll_id
+        response["hits"]["hits"] = hits[:size]
+        return response
+
+    def _delete_by_query(self, names: str, body: Dict) -> Dict:
+        deleted = 0
+        for name in names.split(","):
+            index = self._index(name)
+            for doc_id in list(self._evaluate(index, body.get("query", {"match_all": {}}))):
+                deleted += index.delete(doc_id)
+        return {"took": 0, "timed_out": False, "total": deleted, "deleted": deleted, "failures": []}
+
+    def _scroll(self, method: str, body: Dict) -> Dict:
+        scroll_ids = (body or {}).get("scroll_id")
+        if method == "DELETE":
+            for scroll_id in scroll_ids if isinstance(scroll_ids, list) else [scroll_ids]:
+                self._scrolls.pop(scroll_id, None)
+            return {"succeeded": True}
+        remaining = self._scrolls.get(scroll_ids, [])
+        page, self._scrolls[scroll_ids] = remaining[:1000], remaining[1000:]
+        return {"_scroll_id": scroll_ids, "_shards": {"total": 1, "successful": 1, "skipped": 0, "failed": 0},
+                "hits": {"hits": page}}
+
+    def _evaluate(self, index: FakeIndex, query: Dict) -> Dict[str, float]:
+        kind, clause = next(iter(query.items()))
+        docs = index.docs
+        if kind == "match_all":
+            return {doc_id: 1.0 for doc_id in docs}
+        if kind == "ids":
+            return {doc_id: 1.0 for doc_id in clause["values"] if doc_id in docs}
+        if kind in ("term", "terms"):
+            field, value = next(iter(clause.items()))
+            if not index.searchable(field):
+                return {}
+            values = set(value if kind == "terms" else [value.get("value") if isinstance(value, dict) else value])
+            return {doc_id: 1.0 for doc_id, source in docs.items() if values.intersection(map(str, _field_values(source, field)))}
+        if kind == "match":
+            field, value = next(iter(clause.items()))
+            if not index.searchable(field):
+                return {}
+            return self._bm25(index, field, value.get("query") if isinstance(value, dict) else value)
+        if kind == "knn":
+            field, options = next(iter(clause.items()))
+            # filter는 OpenSearch의 efficient filtering처럼 k-NN 탐색 전에 후보를 제한
+            allowed = self._evaluate(index, options["filter"]) if options.get("filter") else None
+            return self._knn(index, field, options["vector"], int(options.get("k", 10)), allowed)
+        if kind == "bool":
+            scores = None
+            for must in clause.get("must", []) + clause.get("filter", []):
+                matched = self._evaluate(index, must)
+                scores = matched if scores is None else {doc_id: scores[doc_id] + score for doc_id, score in matched.items() if doc_id in scores}
+            if scores is None:
+                scores = {doc_id: 1.0 for doc_id in docs}
+            for must_not in clause.get("must_not", []):
+                excluded = self._evaluate(index, must_not)
+                scores = {doc_id: score for doc_id, score in scores.items() if doc_id not in excluded}
+            return scores
+        raise RequestError(400, "parsing_exception", f"unknown query [{kind}]")
+
+    @staticmethod
+    def _bm25(index: FakeIndex, field: str, text: str, k1: float = 1.2, b: float = 0.75) -> Dict[str, float]:
+        postings, lengths, average_length = index.postings(field)
+        scores = {}
+        for term in set(tokenize(text)):
+            containing = postings.get(term)
+            if not containing:
+                continue
+            idf = math.log(1 + (len(lengths) - len(containing) + 0.5) / (len(containing) + 0.5))
+            for doc_id, tf in containing.items():
+                norm = k1 * (1 - b + b * lengths[doc_id] / (average_length or 1))
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+    @staticmethod
+    def _knn(index: FakeIndex, field: str, vector: List[float], k: int, allowed: Optional[Dict[str, float]] = None) -> Dict[str, float]:
+        ids, matrix = index.vectors(field)
+        if matrix is None:
+            return {}
+        space_type, engine, _ = index.vector_method(field)
+        query = np.asarray(vector, dtype=np.float32)
+        if index.vector_data_type(field) == "byte":
+            query = _to_int8(query)
+        if space_type == "cosinesimil":
+            query /= max(float(np.linalg.norm(query)), 1e-12)
+            similarities = matrix @ query
+            # lucene 엔진 점수: (1 + cos) / 2, nmslib/faiss: 1 / (2 - cos)
+            scores = (1.0 + similarities) / 2.0 if engine == "lucene" else 1.0 / (2.0 - similarities)
+        elif space_type == "innerproduct":
+            products = matrix @ query
+            # OpenSearch innerproduct 점수: 내적이 음수면 1 / (1 - ip), 아니면 ip + 1
+            scores = np.where(products >= 0, products + 1.0, 1.0 / (1.0 - np.minimum(products, 0.0)))
+        else:
+            # l2 점수: 1 / (1 + 거리 제곱)
+            scores = 1.0 / (1.0 + np.sum((matrix - query) ** 2, axis=1))
+        if allowed is not None:
+            scores = np.where([doc_id in allowed for doc_id in ids], scores, -np.inf)
+        top = [position for position in np.argsort(-scores)[:k] if np.isfinite(scores[position])]
+        return {ids[position]: float(scores[position]) for position in top}
+
+
+def fake_opensearch_client(latency: float = 0.0) -> OpenSearch:
+    client = OpenSearch(hosts=[{"host": "fake-opensearch", "port": 9200}], transport_class=FakeTransport)
+    client.transport.latency = latency
+    return client
+
+
+class AsyncFakeTransport(AsyncTransport):
+    """Async transport that answers from a ``FakeTransport``'s indices, sleeping its latency without blocking the loop."""
+
+    def __init__(self, hosts: Any, backend: Optional[FakeTransport] = None, **kwargs: Any):
+        super().__init__(hosts, **kwargs)
+        self.backend = backend
+
+    async def perform_request(self, method: str, url: str, params: Optional[Dict] = None, body: Any = None,
+                              timeout: Any = None, ignore: Any = (), headers: Any = None) -> Any:
+        if self.backend.latency:
+            await asyncio.sleep(self.backend.latency)
+        return self.backend.handle(method, url, params, body, ignore)
+
+    async def close(self) -> None:
+        pass
+
+
+def fake_async_opensearch_client(client: OpenSearch) -> AsyncOpenSearch:
+    # 동기 fake 클라이언트와 같은 인덱스를 공유하는 AsyncOpenSearch
+    return AsyncOpenSearch(hosts=[{"host": "fake-opensearch", "port": 9200}], transport_class=AsyncFakeTransport,
+                           backend=client.transport)
@@ -0,0 +1,172 @@
+"""Offline recall@k evaluation of keyword/vector fusion strategies.
+
+Runs the keyword and vector legs of OpenSearchRetriever once per labelled question and
+fuses them with every requested strategy, so strategies are compared on identical
+candidates. Leg results can be saved and replayed without a cluster:
+
+    python evaluation/recall.py --index vector_paths --save-legs legs.json
+    python evaluation/recall.py --legs legs.json --fusion rrf,min_max --alpha 0.3
+
+Questions are a JSON list of {"question": str, "relevant": [metadata.id, ...]}; a result
+counts as relevant when its id or parent_id is in the list.
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List, Tuple
+
+LAYER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "lambda", "layer")
+sys.path.insert(0, LAYER_DIR)
+
+import bootstrap  # noqa: E402
+
+module = bootstrap.retriever_module()
+from langchain.docstore.document import Document  # noqa: E402
+
+
+def load_questions(path: str) -> List[Dict[str, Any]]:
+    with open(path, encoding="utf-8") as f:
+        questions = json.load(f)
+    for question in questions:
+        if not question.get("question") or not question.get("relevant"):
+            raise ValueError(f"Question needs 'question' and 'relevant': {question}")
+    return questions
+
+
+def create_retriever(args) -> Any:
+    if args.legs:
+        # 저장된 결과를 재사용할 때는 OpenSearch/Bedrock에 연결하지 않음
+        client, embeddings, vector_search = module.OpenSearch(), None, None
+    else:
+        client = bootstrap.opensearch_client()
+        embeddings = bootstrap.vector_profile().wrap_embeddings(bootstrap.embeddings())
+        vector_search = bootstrap.vector_search(args.index, embeddings)
+    return module.OpenSearchRetriever(
+        client=client,
+        index_name=args.index,
+        k=args.candidates,
+        vector_search=vector_search,
+        embedding_function=embeddings,
+        vector_field=args.vector_field,
+        alpha=args.alpha,
+        rrf_k=args.rrf_k
+    )
+
+
+def search_legs(retriever: Any, questions: List[Dict[str, Any]]) -> List[Tuple[Dict, List]]:
+    legs = []
+    for question in questions:
+        keyword_results = retriever._run_search_leg("keyword", retriever._keyword_search, question["question"])
+        vector_results = retriever._run_search_leg("vector", retriever._vector_search, question["question"])
+        legs.append((keyword_results, vector_results))
+    return legs
+
+
+def dump_legs(legs: List[Tuple[Dict, List]]) -> List[Dict]:
+    return [
+        {
+            "keyword": {"hits": {"hits": [
+                {"_id": hit["_id"], "_score": hit["_score"], "_source": hit["_source"]}
+                for hit in keyword_results["hits"]["hits"]
+            ]}},
+            "vector": [
+                {"page_content": doc.page_content, "metadata": doc.metadata, "score": score}
+                for doc, score in vector_results
+            ],
+        }
+        for keyword_results, vector_results in legs
+    ]
+
+
+def restore_legs(saved: List[Dict]) -> List[Tuple[Dict, List]]:
+    return [
+        (leg["keyword"], [(Document(page_content=doc["page_content"], metadata=doc["metadata"]), doc["score"]) for doc in leg["vector"]])
+        for leg in saved
+    ]
+
+
+def is_relevant(doc: Document, relevant: set) -> bool:
+    return doc.metadata.get("id") in relevant or doc.metadata.get("parent_id") in relevant
+
+
+def recall_at_k(docs: List[Document], relevant: List[str], k: int) -> float:
+    relevant = set(relevant)
+    # 청크가 여러 개 걸려도 relevant id 하나로 계산
+    found = {doc.metadata.get("parent_id") if doc.metadata.get("parent_id") in relevant else doc.metadata.get("id")
+             for doc in docs[:k] if is_relevant(doc, relevant)}
+    return len(found) / len(relevant)
+
+
+def reciprocal_rank(docs: List[Document], relevant: List[str]) -> float:
+    relevant = set(relevant)
+    for rank, doc in enumerate(docs, start=1):
+        if is_relevant(doc, relevant):
+            return 1.0 / rank
+    return 0.0
+
+
+def evaluate(retriever: Any, questions: List[Dict[str, Any]], legs: List[Tuple[Dict, List]],
+             strategies: List[str], ks: List[int]) -> Dict[str, Dict[str, float]]:
+    report = {}
+    for strategy in strategies:
+        totals = {f"recall@{k}": 0.0 for k in ks}
+        totals["mrr"] = 0.0
+        for question, (keyword_results, vector_results) in zip(questions, legs):
+            docs = retriever._combine_and_rerank(keyword_results, vector_results, fusion=strategy)
+            for k in ks:
+                totals[f"recall@{k}"] += recall_at_k(docs, question["relevant"], k)
+            totals["mrr"] += reciprocal_rank(docs, question["relevant"])
+        report[strategy] = {name: round(total / len(questions), 4) for name, total in totals.items()}
+    return report
+
+
+def print_report(report: Dict[str, Dict[str, float]]):
+    columns = list(next(iter(report.values())))
+    print("strategy".ljust(14) + "".join(column.rjust(12) for column in columns))
+    for strategy, metrics in report.items():
+        print(strategy.ljust(14) + "".join(f"{metrics[column]:12.4f}" for column in columns))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare keyword/vector fusion strategies by recall@k")
+    parser.add_argument("--questions", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "questions.sample.json"))
+    parser.add_argument("--index", default=os.getenv("VECTORS_PATH_INDEX_NAME", "vector_paths"))
+    parser.add_argument("--vector-field", default="vector_field")
+    parser.add_argument("--fusion", default=",".join(module.FUSION_STRATEGIES))
+    parser.add_argument("--k", default="1,3,5,10")
+    parser.add_argument("--candidates", type=int, default=15, help="results per search leg")
+    parser.add_argument("--alpha", type=float, default=0.5, help="keyword weight (vector weight is 1 - alpha)")
+    parser.add_argument("--rrf-k", type=int, default=60)
+    parser.add_argument("--legs", help="replay saved leg results instead of querying OpenSearch")
+    parser.add_argument("--save-legs", help="save leg results for later replay")
+    parser.add_argument("--output", help="write the report as JSON")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    strategies = [strategy.strip() for strategy in args.fusion.split(",") if strategy.strip()]
+    ks = sorted(int(k) for k in args.k.split(","))
+    retriever = create_retriever(args)
+    # 최종 결과 수가 가장 큰 k보다 작으면 recall이 잘리므로 맞춰줌
+    retriever.k = max(retriever.k, ks[-1])
+
+    if args.legs:
+        with open(args.legs, encoding="utf-8") as f:
+            legs = restore_legs(json.load(f))
+        if len(legs) != len(questions):
+            raise ValueError(f"{args.legs} has {len(legs)} results for {len(questions)} questions")
+    else:
+        legs = search_legs(retriever, questions)
+        if args.save_legs:
+            with open(args.save_legs, "w", encoding="utf-8") as f:
+                json.dump(dump_legs(legs), f, ensure_ascii=False)
+
+    report = evaluate(retriever, questions, legs, strategies, ks)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"questions": len(questions), "alpha": args.alpha, "rrf_k": args.rrf_k, "report": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Synthetic OpenAPI specs and labelled questions for benchmarks.
+
+Specs are deterministic for a given size and seed: resources get CRUD-style paths and
+a schema each. Schemas reference a few of the first ``SHARED_SCHEMAS`` resources, which
+only reference earlier shared ones, so $ref resolution has real depth while dependency
+closures stay bounded as specs grow. Every operation yields a question whose answer is
+its path.
+"""
+import random
+from typing import Any, Dict, List
+
+NOUNS = [
+    "account", "address", "alert", "invoice", "order", "payment", "product", "shipment", "customer",
+    "review", "coupon", "inventory", "warehouse", "device", "session", "report", "ticket", "message",
+    "subscription", "refund", "category", "supplier", "contract", "employee", "project", "task",
+    "comment", "file", "policy", "quota", "region", "tenant", "token", "webhook", "workflow",
+]
+ACTIONS = {
+    "get": ("Get", "Returns the {noun} identified by {param}"),
+    "put": ("Update", "Replaces the {noun} identified by {param}"),
+    "delete": ("Delete", "Removes the {noun} identified by {param}"),
+}
+COLLECTION_ACTIONS = {
+    "get": ("List", "Lists {noun}s with paging and filters"),
+    "post": ("Create", "Creates a new {noun}"),
+}
+SHARED_SCHEMAS = 10
+FIELD_TYPES = [
+    {"type": "string"}, {"type": "integer", "format": "int64"}, {"type": "number"}, {"type": "boolean"},
+    {"type": "string", "format": "date-time"}, {"type": "string", "enum": ["active", "inactive", "pending"]},
+]
+
+
+def _resource_name(index: int) -> str:
+    noun = NOUNS[index % len(NOUNS)]
+    generation = index // len(NOUNS)
+    return noun if generation == 0 else f"{noun}{generation}"
+
+
+def _schema_name(resource: str) -> str:
+    return resource[0].upper() + resource[1:]
+
+
+def _schema(rng: random.Random, resource: str, shared: List[str], fields: int) -> Dict[str, Any]:
+    properties = {"id": {"type": "string", "description": f"Unique {resource} identifier"}}
+    for field in range(fields):
+        properties[f"{resource}Field{field}"] = {**rng.choice(FIELD_TYPES), "description": f"{resource} attribute {field}"}
+    for related in rng.sample(shared, min(len(shared), rng.randint(0, 3))):
+        properties[related] = {"$ref": f"#/components/schemas/{_schema_name(related)}"}
+    return {"type": "object", "description": f"A {resource} resource", "required": ["id"], "properties": properties}
+
+
+def _operation(rng: random.Random, method: str, resource: str, label: str, description: str, param: str) -> Dict[str, Any]:
+    schema_ref = {"$ref": f"#/components/schemas/{_schema_name(resource)}"}
+    operation = {
+        "tags": [resource],
+        "summary": f"{label} {resource}",
+        "description": description.format(noun=resource, param=param),
+        "operationId": f"{label.lower()}{_schema_name(resource)}{'ById' if param else ''}",
+        "responses": {
+            "200": {"description": "Successful response", "content": {"application/json": {"schema": schema_ref}}},
+            "404": {"description": f"{resource} not found"},
+        },
+    }
+    if method in ("post", "put"):
+        operation["requestBody"] = {"required": True, "content": {"application/json": {"schema": schema_ref}}}
+    if param:
+        operation["parameters"] = [{"name": param, "in": "path", "required": True, "schema": {"type": "string"}, "example": rng.randint(1, 9999)}]
+    elif method == "get":
+        operation["parameters"] = [
+            {"name": "limit", "in": "query", "schema": {"type": "integer"}, "example": 20},
+            {"name": "status", "in": "query", "schema": {"type": "string"}},
+        ]
+    return operation
+
+
+def synthetic_spec(num_paths: int, seed: int = 7, fields: int = 8) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    # 리소스 하나당 컬렉션 path와 항목 path 2개
+    num_resources = max(1, (num_paths + 1) // 2)
+    resources = [_resource_name(index) for index in range(num_resources)]
+    paths = {}
+    for resource in resources:
+        if len(paths) >= num_paths:
+            break
+        paths[f"/{resource}s"] = {
+            method: _operation(rng, method, resource, label, description, "")
+            for method, (label, description) in COLLECTION_ACTIONS.items()
+        }
+        if len(paths) >= num_paths:
+            break
+        param = f"{resource}Id"
+        paths[f"/{resource}s/{{{param}}}"] = {
+            method: _operation(rng, method, resource, label, description, param)
+            for method, (label, description) in ACTIONS.items()
+        }
+    return {
+        "openapi": "3.0.3",
+        "info": {"title": f"Synthetic API ({num_paths} paths)", "version": "1.0.0"},
+        "servers": [{"url": "https://api.example.com/v1"}],
+        "security": [{"apiKey": []}],
+        "paths": paths,
+        "components": {
+            "securitySchemes": {"apiKey": {"type": "apiKey", "in": "header", "name": "X-API-Key"}},
+            "schemas": {
+                _schema_name(resource): _schema(rng, resource, resources[:min(index, SHARED_SCHEMAS)], fields)
+                for index, resource in enumerate(resources)
+            },
+        },
+    }
+
+
+def synthetic_questions(spec: Dict[str, Any], count: int, seed: int = 7) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    operations = [
+        (path, method, operation)
+        for path, item in spec["paths"].items()
+        for method, operation in item.items()
+    ]
+    questions = []
+    for path, method, operation in rng.sample(operations, min(count, len(operations))):
+        # summary/operationId 대신 description 문장으로 질문을 만듦
+        questions.append({"question": f"How do I {operation['description'].lower()}?", "relevant": [path], "method": method})
+    return questions
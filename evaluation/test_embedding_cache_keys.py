@@ -0,0 +1,107 @@
+"""Ingest (s3_function) and query (chat_function) must share embedding cache keys per vector profile.
+
+Both sides build their cache with ``bootstrap.cached_embeddings``; ingest wraps Bedrock in
+``RateLimitedEmbeddings`` first. A shared persistent store must hand each profile vectors of
+its own dimension, so a 512-dimension profile never reads 1024-dimension entries.
+
+    python -m pytest evaluation
+"""
+import os
+import sys
+from typing import List
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "lambda", "layer"))
+
+import bootstrap  # noqa: E402
+from langchain_core.embeddings import Embeddings  # noqa: E402
+
+embeddingcache = bootstrap.load_layer_module("embeddingcache")
+ratelimit = bootstrap.load_layer_module("ratelimit")
+vectorprofile = bootstrap.load_layer_module("vectorprofile")
+module = bootstrap.retriever_module()
+
+TEXT = "get /pets list all pets"
+
+
+class TitanStub(Embeddings):
+    """Answers like BedrockEmbeddings: ``model_kwargs["dimensions"]`` picks the output size."""
+
+    def __init__(self, model_kwargs=None):
+        self.model_id = bootstrap.EMBEDDING_MODEL_ID
+        self.model_kwargs = model_kwargs
+        self.calls = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        self.calls += 1
+        dimensions = (self.model_kwargs or {}).get("dimensions", vectorprofile.TITAN_V2_DEFAULT_DIMENSIONS)
+        return [1.0 / dimensions ** 0.5] * dimensions
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(text) for text in texts]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = embeddingcache.SQLiteEmbeddingStore(str(tmp_path / "embeddings.sqlite3"))
+    monkeypatch.setitem(bootstrap._instances, "embedding_cache_store", store)
+    return store
+
+
+def use_profile(monkeypatch, profile):
+    monkeypatch.setitem(bootstrap._instances, "vector_profile", profile)
+    return TitanStub(profile.embedding_kwargs() or None)
+
+
+def ingest_embeddings(titan):
+    # s3_function._create_embeddings와 같은 구성
+    rate_limited = ratelimit.RateLimitedEmbeddings(titan, ratelimit.TokenBucket(0))
+    return bootstrap.cached_embeddings(rate_limited, module.LRUCache(16), concurrency=1)
+
+
+def query_embeddings(titan):
+    # chat_function.ChatRuntime과 같은 구성
+    return bootstrap.cached_embeddings(titan, module.LRUCache(16))
+
+
+@pytest.mark.parametrize("name", list(vectorprofile.PROFILES))
+def test_ingest_and_query_keys_match(name, store, monkeypatch):
+    profile = vectorprofile.get_profile(name)
+    titan = use_profile(monkeypatch, profile)
+    ingest, query = ingest_embeddings(titan), query_embeddings(titan)
+
+    assert (ingest.model_id, ingest.dimensions) == (query.model_id, query.dimensions)
+    assert embeddingcache.embedding_cache_key(ingest.model_id, ingest.dimensions, TEXT) == \
+        embeddingcache.embedding_cache_key(query.model_id, query.dimensions, TEXT)
+
+    ingest.embed_documents([TEXT])
+    vector = query.embed_query(TEXT)
+    # 질의는 ingest가 저장한 벡터를 재사용하고 Bedrock을 다시 호출하지 않음
+    assert titan.calls == 1
+    assert query.stats()["store_hits"] == 1
+    assert len(vector) == profile.dimensions
+
+
+def test_profiles_sharing_a_store_get_their_own_dimensions(store, monkeypatch):
+    for profile in vectorprofile.PROFILES.values():
+        ingest_embeddings(use_profile(monkeypatch, profile)).embed_documents([TEXT])
+
+    for profile in vectorprofile.PROFILES.values():
+        query = profile.wrap_embeddings(query_embeddings(use_profile(monkeypatch, profile)))
+        vector = query.embed_query(TEXT)
+        assert len(vector) == profile.dimensions
+        if profile.encoding == "byte":
+            assert all(isinstance(value, int) and -128 <= value <= 127 for value in vector)
+
+
+def test_cache_keys_differ_by_dimensions(monkeypatch):
+    keys = {}
+    for profile in vectorprofile.PROFILES.values():
+        query = query_embeddings(use_profile(monkeypatch, profile))
+        keys.setdefault(profile.dimensions, set()).add(
+            embeddingcache.embedding_cache_key(query.model_id, query.dimensions, TEXT))
+    # 같은 차원의 프로파일(float/fp16/byte)은 float 벡터를 공유하고, 차원이 다르면 키가 다름
+    assert all(len(dimension_keys) == 1 for dimension_keys in keys.values())
+    assert len(set.union(*keys.values())) == len(keys)
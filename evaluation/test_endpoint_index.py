@@ -0,0 +1,104 @@
+"""EndpointIndex against the deployed index mappings (json/*.json) on the fake OpenSearch.
+
+The fake only answers term/match queries on fields the mapping indexes, so a lookup on a
+field that exists in ``_source`` but is not mapped under ``dynamic: false`` finds nothing,
+as on a real cluster.
+
+    python -m pytest evaluation
+"""
+import json
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(REPO_DIR, "lambda", "layer"))
+
+import bootstrap  # noqa: E402
+from fakes import fake_opensearch_client  # noqa: E402
+
+endpointindex = bootstrap.load_layer_module("endpointindex")
+module = bootstrap.retriever_module()
+
+SPEC = {
+    "paths": {
+        "/pets": {"get": {"operationId": "listPets", "responses": {}}},
+        "/pets/{petId}": {"get": {"operationId": "showPetById", "responses": {}}},
+    },
+    "components": {
+        "schemas": {"Pet": {"type": "object"}, "Pets": {"type": "array", "items": {"$ref": "#/components/schemas/Pet"}}},
+        "parameters": {"limit": {"name": "limit", "in": "query"}},
+    },
+}
+
+
+def load_mapping(name):
+    with open(os.path.join(REPO_DIR, "json", name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def client():
+    client = fake_opensearch_client()
+    client.indices.create(index="paths", body=load_mapping("index_paths.json"))
+    client.indices.create(index="components", body=load_mapping("index_components.json"))
+    dependencies = module.compute_component_dependencies(SPEC)
+    module.OpenSearchRetriever(client=client, index_name="paths", embedding_function=None).bulk_write_paths(
+        {"paths": SPEC["paths"]}, dependencies=dependencies["paths"], source="petstore.json")
+    module.OpenSearchRetriever(client=client, index_name="components", embedding_function=None).bulk_write_components(
+        {"components": SPEC["components"]}, dependencies=dependencies["components"], source="petstore.json")
+    return client
+
+
+def test_from_opensearch_finds_schemas_with_deployed_mappings(client):
+    index = endpointindex.EndpointIndex.from_opensearch(client, "paths", "components")
+    assert index.schemas == {"Pet", "Pets"}
+    assert set(index.operations) == {"listPets", "showPetById"}
+    assert index.dependencies_of(["schemas_Pets"]) == ["schemas_Pet"]
+
+
+def test_fake_skips_unmapped_fields_under_dynamic_false():
+    # component_type 매핑이 없던 인덱스: _source에는 있지만 term 쿼리로 찾을 수 없음
+    client = fake_opensearch_client()
+    mapping = load_mapping("index_components.json")
+    del mapping["mappings"]["properties"]["component_type"]
+    client.indices.create(index="components", body=mapping)
+    module.OpenSearchRetriever(client=client, index_name="components", embedding_function=None).bulk_write_components(
+        {"components": SPEC["components"]}, source="petstore.json")
+    response = client.search(index="components", body={"query": {"term": {"component_type": "schemas"}}})
+    assert response["hits"]["hits"] == []
+    assert client.search(index="components", body={"query": {"term": {"key": "Pet"}}})["hits"]["hits"]
+
+
+@pytest.fixture
+def index():
+    index = endpointindex.EndpointIndex()
+    index.add_path("/search", {"get": {"operationId": "search"}})
+    index.add_path("/user/login", {"get": {"operationId": "login"}})
+    index.add_path("/pets", {"get": {"operationId": "listPets"}})
+    index.add_path("/store/order", {"post": {"operationId": "place_order"}})
+    index.add_schema("User")
+    index.add_schema("Pet")
+    return index
+
+
+@pytest.mark.parametrize("question", [
+    "How do I search for pets by status?",
+    "What happens after I login with an expired password?",
+    "Which fields does a User have?",
+])
+def test_prose_words_do_not_take_the_fast_path(index, question):
+    assert index.match(question) == endpointindex.EndpointMatch({}, [])
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("what does listPets return", endpointindex.EndpointMatch({"/pets": ["get"]}, [])),
+    ("is place_order idempotent?", endpointindex.EndpointMatch({"/store/order": ["post"]}, [])),
+    ("what does `search` return", endpointindex.EndpointMatch({"/search": ["get"]}, [])),
+    ("call login() before anything else", endpointindex.EndpointMatch({"/user/login": ["get"]}, [])),
+    ("explain the `User` schema", endpointindex.EndpointMatch({}, ["User"])),
+    ("Pet 스키마 설명", endpointindex.EndpointMatch({}, ["Pet"])),
+])
+def test_identifier_shaped_tokens_match(index, question, expected):
+    assert index.match(question) == expected
@@ -1,7 +1,10 @@
 import streamlit as st
 import requests
+import json
 import os
 import boto3
+from botocore.auth import SigV4Auth
+from botocore.awsrequest import AWSRequest
 from botocore.exceptions import BotoCoreError, ClientError
 
 def get_api_url_from_ssm(parameter_name: str, region: str = "us-west-2") -> str:
@@ -22,10 +25,47 @@ def get_api_url_from_ssm(parameter_name: str, region: str = "us-west-2") -> str:
         st.error(f"SSM Parameter를 가져오는 중 오류가 발생했습니다: {error}")
         return None
 
+def get_optional_parameter(parameter_name: str, region: str = "us-west-2") -> str:
+    """
+    선택적인 SSM Parameter를 가져옵니다. 없으면 None을 반환합니다.
+    """
+    try:
+        ssm_client = boto3.client("ssm", region_name=region)
+        return ssm_client.get_parameter(Name=parameter_name)["Parameter"]["Value"]
+    except (BotoCoreError, ClientError):
+        return None
+
+def sign_request(url: str, body: str, region: str = "us-west-2") -> dict:
+    """
+    IAM 인증 Function URL 요청에 task role 자격 증명으로 SigV4 서명한 헤더를 반환합니다.
+    """
+    credentials = boto3.Session().get_credentials().get_frozen_credentials()
+    request = AWSRequest(method="POST", url=url, data=body, headers={"Content-Type": "application/json"})
+    SigV4Auth(credentials, "lambda", region).add_auth(request)
+    return dict(request.headers)
+
+def stream_chat(stream_url: str, message: str, region: str = "us-west-2"):
+    """
+    스트리밍 Function URL의 Server-Sent Events 응답을 토큰 단위로 반환합니다.
+    """
+    body = json.dumps({"message": message})
+    headers = sign_request(stream_url, body, region)
+    with requests.post(stream_url, data=body, headers=headers, stream=True, timeout=300) as response:
+        response.raise_for_status()
+        for line in response.iter_lines(decode_unicode=True):
+            if not line or not line.startswith("data: "):
+                continue
+            event = json.loads(line[len("data: "):])
+            if "token" in event:
+                yield event["token"]
+            elif "error" in event:
+                raise RuntimeError(event["error"])
+
 # SSM Parameter Store에서 API Gateway URL 가져오기
 parameter_name = '/wwapi/api-gateway-url'  # SSM Parameter 이름
 region = "us-west-2"  # AWS 리전
 api_gateway_url = get_api_url_from_ssm(parameter_name, region)
+chat_stream_url = get_optional_parameter('/wwapi/chat-stream-url', region)
 
 if not api_gateway_url:
     st.error("API Gateway URL을 가져올 수 없습니다. 환경 변수를 확인해주세요.")
@@ -35,7 +75,14 @@ else:
     user_input = st.text_input("메시지를 입력하세요:")
 
     if st.button("전송"):
-        if user_input:
+        if user_input and chat_stream_url:
+            # 스트리밍 엔드포인트가 있으면 토큰이 도착하는 대로 표시
+            st.markdown("**챗봇 응답:**")
+            try:
+                st.write_stream(stream_chat(chat_stream_url, user_input, region))
+            except (requests.RequestException, RuntimeError, BotoCoreError) as error:
+                st.error(f"오류가 발생했습니다. 다시 시도해주세요. ({error})")
+        elif user_input:
             response = requests.post(api_gateway_url + "/chat", json={"message": user_input})
             if response.status_code == 200:
                 bot_response = response.json().get('response', '응답을 받을 수 없습니다.')
@@ -1,130 +1,39 @@
-import boto3
+import asyncio
 import importlib.util
 import os
 import json
-from typing import List, Tuple
+import threading
 
-import langchain_aws
-
-from opensearchpy import OpenSearch, RequestsHttpConnection
-from botocore.config import Config
-from langchain.docstore.document import Document
-from requests_aws4auth import AWS4Auth
-from langchain.schema import Document
-from langchain_core.messages import HumanMessage
-from langchain.schema.output_parser import StrOutputParser
-from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
-from langchain_community.vectorstores import OpenSearchVectorSearch
-
-ssm = boto3.client('ssm')
-s3 = boto3.client('s3')
+spec = importlib.util.spec_from_file_location("Bootstrap", "/opt/python/bootstrap.py")
+bootstrap = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bootstrap)
 
 index_paths_name = os.getenv('PATHS_INDEX_NAME')
 index_components_name = os.getenv('COMPONENTS_INDEX_NAME')
 index_vector_paths_name = os.getenv('VECTORS_PATH_INDEX_NAME')
 index_vector_components_name = os.getenv('VECTORS_COMPONENTS_INDEX_NAME')
+hybrid_search_pipeline = os.getenv('HYBRID_SEARCH_PIPELINE')
+# hybrid pipeline을 쓰지 않거나 실패했을 때 사용하는 keyword/vector 결합 방식
+retrieval_fusion = os.getenv('RETRIEVAL_FUSION', 'rrf')
+# true면 lambda_handler가 AsyncOpenSearch + ainvoke로 path/component 검색을 하나의 이벤트 루프에서 동시에 실행
+chat_async = os.getenv('CHAT_ASYNC', 'false').lower() == 'true'
+# 설정 시 질의 임베딩의 cosine 유사도가 임계값 이상인 이전 답변을 같은 스펙 버전에서 재사용
+answer_cache_index_name = os.getenv('ANSWER_CACHE_INDEX_NAME')
+answer_cache_threshold = float(os.getenv('ANSWER_CACHE_THRESHOLD', '0.95'))
+# 질문에 path template/operationId가 그대로 있으면 hybrid 검색 없이 바로 조회
+endpoint_lookup = os.getenv('ENDPOINT_LOOKUP', 'true').lower() == 'true'
 
-opensearch_domain_endpoint = ssm.get_parameter(Name='opensearchdomain')['Parameter']['Value']
-opensearch_user_password = ssm.get_parameter(Name='opensearchpassword')['Parameter']['Value']
-opensearch_user_id = ssm.get_parameter(Name='opensearchid')['Parameter']['Value']
-
-opensearch = boto3.client('opensearch')
-
-
-http_auth = (opensearch_user_id, opensearch_user_password) # Master username, Master password
-
-region="us-west-2"
-
-boto3_bedrock_runtime = boto3.client("bedrock-runtime")
-llm_emb = langchain_aws.BedrockEmbeddings( region_name=region, model_id="amazon.titan-embed-text-v2:0", 
-                                       client=boto3_bedrock_runtime
-)
 model_id = "anthropic.claude-3-5-sonnet-20240620-v1:0"
 #model_id = "meta.llama3-70b-instruct-v1:0"
 
 model_kwargs =  { 
-    "max_tokens": 10000000,  # Claude-3 use “max_tokens” However Claud-2 requires “max_tokens_to_sample”.
+    "max_tokens": int(os.getenv('MAX_OUTPUT_TOKENS', '4096')),  # Claude-3 use “max_tokens” However Claud-2 requires “max_tokens_to_sample”.
     "temperature": 0.0,
 #    "top_k": 250,
     "top_p": 1
 #    "stop_sequences": ["\n\nHuman"],
 }
 
-llm_text = langchain_aws.ChatBedrock(
-    client=boto3_bedrock_runtime,
-    model_id=model_id,
-    model_kwargs=model_kwargs,
-)
-
-credentials = boto3.Session().get_credentials()
-# awsauth = AWS4Auth(credentials.access_key, credentials.secret_key, region, 'es', session_token=credentials.token)
- 
-os_client = OpenSearch(
-    hosts=[
-        {'host': opensearch_domain_endpoint.replace("https://", ""),
-         'port': 443
-        }
-    ],
-    http_auth=http_auth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
-spec = importlib.util.spec_from_file_location("OpenSearchRetriever", "/opt/python/opensearchretriever.py")
-module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(module)
-
-vector_path_db = OpenSearchVectorSearch(
-    index_name=index_vector_paths_name,
-    opensearch_url=f"https://{opensearch_domain_endpoint}",
-    embedding_function=llm_emb,
-    http_auth=http_auth, # http_auth
-    is_aoss=False,
-    engine="faiss",
-    space_type="l2",
-    bulk_size=100000,
-    timeout=60
-)
-vector_component_db = OpenSearchVectorSearch(
-    index_name=index_vector_components_name,
-    opensearch_url=f"https://{opensearch_domain_endpoint}",
-    embedding_function=llm_emb,
-    http_auth=http_auth, # http_auth
-    is_aoss=False,
-    engine="faiss",
-    space_type="l2",
-    bulk_size=100000,
-    timeout=60
-)
-
-    
-path_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_paths_name,
-    k=15, 
-    embedding_function=llm_emb
-)
-vector_path_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_vector_paths_name,
-    k=15,
-    vector_search=vector_path_db,
-    embedding_function=llm_emb
-)
-components_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_components_name,
-    k=15, 
-    embedding_function=llm_emb
-)
-vector_components_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_vector_components_name,
-    k=15,
-    vector_search=vector_component_db,
-    embedding_function=llm_emb
-)
-
 system_template = '''
 You are an API expert. 
 Your task is to analyze OpenAPI specifications provided by the user and generate accurate responses based on the information contained within these specifications. 
@@ -154,19 +63,350 @@ OpenAPI Components:
 {OPENAPI_COMPONENTS}
 '''
 
+# paths/components 블록은 system 메시지에만 한 번 포함
 human_template = '''
-    {OPENAPI_COMPONENTS}
-    {OPENAPI_PATHS}
     {QUERY}
 '''
-system_message_prompt = SystemMessagePromptTemplate.from_template(system_template)
-human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
 
-chat_prompt = ChatPromptTemplate.from_messages([
-    system_message_prompt,
-    human_message_prompt
-])
-qa_chain = chat_prompt | llm_text | StrOutputParser() 
+class ChatRuntime:
+    # 클라이언트, retriever, 캐시, 체인을 첫 호출 시 한 번만 생성 (warm 컨테이너에서 재사용)
+    def __init__(self):
+        module = bootstrap.retriever_module()
+        cache_module = bootstrap.load_layer_module("retrievalcache")
+        context_module = bootstrap.load_layer_module("contextbuilder")
+        os_client = bootstrap.opensearch_client()
+        self.os_client = os_client
+        async_client = bootstrap.async_opensearch_client() if chat_async else None
+
+        self.cache_module = cache_module
+        # warm 컨테이너 간에 유지되는 캐시: 질의 임베딩, 검색 결과
+        self.query_embedding_cache = cache_module.TTLCache(maxsize=1024, ttl=3600, name="query_embeddings")
+        self.retrieval_cache = cache_module.TTLCache(maxsize=256, ttl=float(os.getenv('RETRIEVAL_CACHE_TTL', '300')), name="retrieval")
+        # 답변 캐시는 float 벡터를 그대로 쓰고, 벡터 검색에는 프로파일의 저장 형식(byte 양자화)을 적용
+        self.embeddings = bootstrap.cached_embeddings(
+            bootstrap.embeddings(),
+            self.query_embedding_cache,
+            query_normalizer=cache_module.normalize_query
+        )
+        llm_query_emb = bootstrap.vector_profile().wrap_embeddings(self.embeddings)
+
+        # 프롬프트에 넣는 paths/components 컨텍스트의 토큰 상한
+        self.context_builder = context_module.ContextBuilder(token_budget=int(os.getenv('CONTEXT_TOKEN_BUDGET', '40000')))
+
+        self.path_retriever = module.OpenSearchRetriever(
+            client=os_client,
+            async_client=async_client,
+            index_name=index_paths_name,
+            k=15, 
+            embedding_function=llm_query_emb,
+            components_index_name=index_components_name
+        )
+        self.vector_path_retriever = module.OpenSearchRetriever(
+            client=os_client,
+            async_client=async_client,
+            index_name=index_vector_paths_name,
+            k=15,
+            vector_search=bootstrap.vector_search(index_vector_paths_name, llm_query_emb),
+            embedding_function=llm_query_emb,
+            vector_field="vector_field",
+            hybrid_search_pipeline=hybrid_search_pipeline,
+            fusion=retrieval_fusion,
+            parent_cache_size=1024
+        )
+        self.components_retriever = module.OpenSearchRetriever(
+            client=os_client,
+            async_client=async_client,
+            index_name=index_components_name,
+            k=15, 
+            embedding_function=llm_query_emb,
+            component_cache_size=4096
+        )
+        self.vector_components_retriever = module.OpenSearchRetriever(
+            client=os_client,
+            async_client=async_client,
+            index_name=index_vector_components_name,
+            k=15,
+            vector_search=bootstrap.vector_search(index_vector_components_name, llm_query_emb),
+            embedding_function=llm_query_emb,
+            vector_field="vector_field",
+            hybrid_search_pipeline=hybrid_search_pipeline,
+            fusion=retrieval_fusion,
+            parent_cache_size=1024
+        )
+
+        self.index_version_tracker = cache_module.IndexVersionTracker(
+            os_client,
+            [index_paths_name, index_components_name, index_vector_paths_name, index_vector_components_name],
+            refresh_interval=float(os.getenv('INDEX_VERSION_REFRESH_INTERVAL', '30')),
+            on_change=self._on_index_version_change
+        )
+        # 질문에 그대로 나온 path/operationId/스키마 이름용 메모리 인덱스 (첫 사용 시 생성, 인덱스 버전이 바뀌면 다시 생성)
+        self.endpoint_module = bootstrap.load_layer_module("endpointindex")
+        self._endpoint_index = None
+        self._endpoint_lock = threading.Lock()
+        self.answer_cache_module = bootstrap.load_layer_module("answercache")
+        self.answer_cache = self.answer_cache_module.SemanticAnswerCache(
+            os_client,
+            answer_cache_index_name,
+            threshold=answer_cache_threshold
+        ) if answer_cache_index_name else None
+        self.qa_chain = self._build_qa_chain()
+
+    def _on_index_version_change(self, versions):
+        # 새 스펙이 ingest되면 이전 버전 기준 검색 결과를 버리고 retriever 캐시 세대를 갱신
+        self.retrieval_cache.clear()
+        self._endpoint_index = None
+        for retriever in (self.path_retriever, self.vector_path_retriever, self.components_retriever, self.vector_components_retriever):
+            retriever.index_generation = versions.get(retriever.index_name, "")
+        print(f"Index versions changed: {versions}")
+
+    def endpoint_index(self):
+        if not endpoint_lookup:
+            return None
+        # 버전 변경(on_change)으로 인덱스가 버려지는 것을 먼저 반영해야 방금 만든 인덱스를 다시 만들지 않음
+        self.index_version_tracker.versions()
+        with self._endpoint_lock:
+            if self._endpoint_index is None:
+                try:
+                    self._endpoint_index = self.endpoint_module.EndpointIndex.from_opensearch(
+                        self.os_client, index_paths_name, index_components_name)
+                except Exception as e:
+                    print(f"Error building endpoint index: {e}")
+                    return None
+            return self._endpoint_index
+
+    @staticmethod
+    def _build_qa_chain():
+        from langchain.schema.output_parser import StrOutputParser
+        from langchain_core.prompts import ChatPromptTemplate, HumanMessagePromptTemplate, SystemMessagePromptTemplate
+
+        system_message_prompt = SystemMessagePromptTemplate.from_template(system_template)
+        human_message_prompt = HumanMessagePromptTemplate.from_template(human_template)
+
+        chat_prompt = ChatPromptTemplate.from_messages([
+            system_message_prompt,
+            human_message_prompt
+        ])
+        return chat_prompt | bootstrap.chat_model(model_id, model_kwargs) | StrOutputParser() 
+
+
+def get_runtime():
+    return bootstrap.lazy("chat_runtime", ChatRuntime)
+
+def lookup_cached_answer(query, match):
+    # (캐시된 답변 또는 None, 저장할 때 쓸 (임베딩, 스펙 버전)) 반환
+    # 질의 임베딩은 CachedEmbeddings에 남으므로 이후 벡터 검색에서 다시 계산하지 않음
+    runtime = get_runtime()
+    if runtime.answer_cache is None:
+        return None, None
+    if match is not None and match.paths:
+        # endpoint fast path로 답할 질문은 임베딩(Bedrock 호출) 없이 처리: 시맨틱 캐시 조회/저장을 건너뜀
+        return None, None
+    tracing = bootstrap.tracing()
+    with tracing.span("answer_cache_lookup"):
+        vector = runtime.embeddings.embed_query(query)
+        version = runtime.answer_cache_module.spec_version(runtime.index_version_tracker.versions())
+        cached = runtime.answer_cache.lookup(vector, version)
+    print(f"Answer cache: {runtime.answer_cache.stats()}")
+    if cached is None:
+        tracing.add("answer_cache.misses")
+        return None, (vector, version)
+    tracing.add("answer_cache.hits")
+    tracing.add("answer_cache.saved_input_tokens", cached.get("input_tokens", 0))
+    tracing.add("answer_cache.saved_output_tokens", cached.get("output_tokens", 0))
+    return cached, None
+
+def store_answer(query, cache_key, answer):
+    if cache_key is None:
+        return
+    tracing = bootstrap.tracing()
+    trace = tracing.current_trace()
+    counters = trace.counters if trace is not None else {}
+    vector, version = cache_key
+    get_runtime().answer_cache.put(query, vector, answer, version,
+                                   input_tokens=counters.get("bedrock.input_tokens", 0),
+                                   output_tokens=counters.get("bedrock.output_tokens", 0))
+
+def match_endpoints(query):
+    # 질문에 있는 path template/operationId/스키마 이름을 메모리 인덱스에서 찾음 (OpenSearch 요청 없음)
+    runtime = get_runtime()
+    tracing = bootstrap.tracing()
+    with tracing.span("endpoint_lookup"):
+        index = runtime.endpoint_index()
+        match = index.match(query) if index is not None else None
+    if match is not None and match.paths:
+        tracing.add("endpoint_lookup.hits")
+    return match
+
+def _endpoints_cache_key(match, versions):
+    return ("endpoints", versions.get(index_paths_name, ""), versions.get(index_components_name, ""),
+            tuple((path, tuple(methods)) for path, methods in match.paths.items()), tuple(match.schemas))
+
+def _endpoint_context(match, resolved_paths, schema_components):
+    # 메서드가 지정된 path는 그 operation만 남기고, 스펙 공통 헤더를 붙일 수 있도록 spec_id를 기록
+    resolved = []
+    for resolved_path, methods in zip(resolved_paths, match.paths.values()):
+        if not resolved_path:
+            continue
+        path_doc = get_runtime().endpoint_module.restrict_methods(resolved_path["path"], methods)
+        resolved.append({**resolved_path, "path": path_doc, "spec_id": path_doc.get("spec_id")})
+    if schema_components:
+        resolved.append({"components": schema_components})
+    return resolved
+
+def _cached_retrieval(key, compute):
+    # 일부 검색 단계가 실패/시간 초과로 빠진 결과는 캐시하지 않음 (다음 요청에서 다시 검색)
+    with bootstrap.retriever_module().track_degradation() as degraded:
+        return get_runtime().retrieval_cache.get_or_compute(key, compute, cache_if=lambda value: bool(value) and not degraded)
+
+async def _acached_retrieval(key, compute):
+    with bootstrap.retriever_module().track_degradation() as degraded:
+        return await get_runtime().retrieval_cache.aget_or_compute(key, compute, cache_if=lambda value: bool(value) and not degraded)
+
+def resolve_endpoints(match, versions):
+    if match is None or not (match.paths or match.schemas):
+        return []
+    runtime = get_runtime()
+    index = runtime.endpoint_index()
+    schema_ids = [f"schemas_{name}" for name in match.schemas]
+    return _cached_retrieval(
+        _endpoints_cache_key(match, versions),
+        lambda: _endpoint_context(
+            match,
+            runtime.path_retriever.get_paths_with_resolved_components(list(match.paths), index.dependencies_of(match.paths)) if match.paths else [],
+            runtime.components_retriever.get_components_with_dependencies(schema_ids, index.dependencies_of(schema_ids))
+        )
+    )
+
+async def aresolve_endpoints(match, versions):
+    if match is None or not (match.paths or match.schemas):
+        return []
+    runtime = get_runtime()
+    index = runtime.endpoint_index()
+    schema_ids = [f"schemas_{name}" for name in match.schemas]
+
+    async def compute():
+        resolved_paths, schema_components = await asyncio.gather(
+            runtime.path_retriever.aget_paths_with_resolved_components(list(match.paths), index.dependencies_of(match.paths)) if match.paths else asyncio.sleep(0, []),
+            runtime.components_retriever.aget_components_with_dependencies(schema_ids, index.dependencies_of(schema_ids))
+        )
+        return _endpoint_context(match, resolved_paths, schema_components)
+
+    return await _acached_retrieval(_endpoints_cache_key(match, versions), compute)
+
+def _spec_ids(retrieval_vector_path, resolved_paths):
+    return list(dict.fromkeys(
+        [doc.metadata["spec_id"] for doc in retrieval_vector_path if doc.metadata.get("spec_id")]
+        + [resolved["spec_id"] for resolved in resolved_paths if resolved.get("spec_id")]
+    ))
+
+def build_chain_input(query, match):
+    # (체인 입력, 답변을 캐시해도 되는지) 반환, match는 호출 측에서 먼저 찾은 match_endpoints 결과
+    runtime = get_runtime()
+    tracing = bootstrap.tracing()
+    versions = runtime.index_version_tracker.versions()
+    normalized_query = runtime.cache_module.normalize_query(query)
+
+    with bootstrap.retriever_module().track_degradation() as degraded:
+        if match is not None and match.paths:
+            # path/operationId가 그대로 있으면 임베딩 + kNN + BM25를 건너뛰고 해당 path만 사용
+            retrieval_vector_path = []
+        else:
+            with tracing.span("path_retrieval"):
+                retrieval_vector_path = _cached_retrieval(
+                    ("vector_paths", index_vector_paths_name, versions.get(index_vector_paths_name, ""), normalized_query),
+                    lambda: runtime.vector_path_retriever._get_relevant_documents(query)
+                )
+
+        resolved_paths = resolve_endpoints(match, versions)
+        print(f"Cache stats: {runtime.embeddings.stats()} {runtime.query_embedding_cache.stats()} {runtime.retrieval_cache.stats()}")
+
+        # path 문서가 참조하는 스펙 공통 헤더를 한 번의 _mget(캐시)으로 가져와 프롬프트 조립 시 붙임
+        spec_ids = _spec_ids(retrieval_vector_path, resolved_paths)
+        with tracing.span("spec_header_fetch"):
+            spec_headers = runtime.vector_path_retriever.get_documents_by_ids(spec_ids) if spec_ids else {}
+    return _chain_input(query, retrieval_vector_path, resolved_paths, spec_headers, degraded)
+
+async def abuild_chain_input(query, match):
+    # build_chain_input과 같은 입력을 만들되 path 검색과 endpoint 해석을 동시에 실행
+    runtime = get_runtime()
+    tracing = bootstrap.tracing()
+    versions = runtime.index_version_tracker.versions()
+    normalized_query = runtime.cache_module.normalize_query(query)
+
+    async def retrieve_paths():
+        if match is not None and match.paths:
+            return []
+        with tracing.span("path_retrieval"):
+            return await _acached_retrieval(
+                ("vector_paths", index_vector_paths_name, versions.get(index_vector_paths_name, ""), normalized_query),
+                lambda: runtime.vector_path_retriever._aget_relevant_documents(query)
+            )
+
+    with bootstrap.retriever_module().track_degradation() as degraded:
+        retrieval_vector_path, resolved_paths = await asyncio.gather(retrieve_paths(), aresolve_endpoints(match, versions))
+        print(f"Cache stats: {runtime.embeddings.stats()} {runtime.query_embedding_cache.stats()} {runtime.retrieval_cache.stats()}")
+
+        spec_ids = _spec_ids(retrieval_vector_path, resolved_paths)
+        with tracing.span("spec_header_fetch"):
+            spec_headers = await runtime.vector_path_retriever.aget_documents_by_ids(spec_ids) if spec_ids else {}
+    return _chain_input(query, retrieval_vector_path, resolved_paths, spec_headers, degraded)
+
+def _chain_input(query, retrieval_vector_path, resolved_paths, spec_headers, degraded):
+    runtime = get_runtime()
+    tracing = bootstrap.tracing()
+
+    # 중복 제거 후 검색 점수 순으로 토큰 예산 안에 맞춰 배치
+    with tracing.span("context_build"):
+        context_paths, context_components, context_report = runtime.context_builder.build(retrieval_vector_path, resolved_paths, spec_headers)
+    print(f"Context: {context_report}")
+    tracing.add("context.tokens", context_report["used_tokens"])
+    tracing.add("context.dropped", context_report["dropped"])
+
+    # 컨텍스트가 비었거나 실패/시간 초과로 빠진 검색 단계가 있으면 답변을 캐시하지 않음
+    # (답변 캐시는 스펙 버전이 바뀔 때만 비워지므로 일시적인 장애로 만든 답변이 계속 반환됨)
+    cacheable = not degraded and bool(context_report["paths"] or context_report["components"])
+    if not cacheable:
+        print(f"Answer not cacheable: degraded={sorted(set(degraded))} context={context_report}")
+
+    return {
+        # "OPENAPI_INFO" : json.dumps( JSON_object["info"], ensure_ascii=False),
+        # "OPENAPI_SECURITY" : json.dumps(JSON_object["security"], ensure_ascii=False),
+        # "OPENAPI_SERVER" : json.dumps(JSON_object["servers"], ensure_ascii=False),
+        "OPENAPI_PATHS" : context_paths,
+        "OPENAPI_COMPONENTS" : context_components,
+        "QUERY": query
+    }, cacheable
+
+def stream_response(query):
+    # 응답 전체를 기다리지 않고 생성되는 대로 텍스트 조각을 반환 (chat_stream_server.py에서 사용)
+    print(query)
+    tracing = bootstrap.tracing()
+    # endpoint 매칭(메모리)을 먼저 해서 fast path 질문은 답변 캐시용 임베딩을 만들지 않음
+    match = match_endpoints(query)
+    cached, cache_key = lookup_cached_answer(query, match)
+    if cached is not None:
+        yield cached["answer"]
+        return
+    chain_input, cacheable = build_chain_input(query, match)
+    chunks = []
+    with tracing.span("generation"):
+        for chunk in get_runtime().qa_chain.stream(input=chain_input, config={"callbacks": [tracing.token_usage_callback()]}):
+            if chunk:
+                chunks.append(chunk)
+                yield chunk
+    if cacheable:
+        store_answer(query, cache_key, "".join(chunks))
+
+async def agenerate_response(query, trace, match):
+    tracing = bootstrap.tracing()
+    chain_input, cacheable = await abuild_chain_input(query, match)
+    with tracing.span("generation"):
+        response = await get_runtime().qa_chain.ainvoke(
+            input=chain_input,
+            config={"callbacks": [tracing.token_usage_callback(trace)]}
+        )
+    return response, cacheable
 
 def lambda_handler(event, context):
     try:
@@ -174,47 +414,41 @@ def lambda_handler(event, context):
         body = json.loads(event['body'])
         query = body['message']
         print(query)
-        
-        
-        retrieval_vector_path = vector_path_retriever._get_relevant_documents(query)
-        context_vector_path = []
-        for doc in retrieval_vector_path:
-            context_vector_path.append( json.dumps(json.loads(doc.page_content), ensure_ascii=False))
-
-        # retrieval_path = path_retriever.get_path_with_resolved_components(query)
-        # context_path = []
-        # for doc in retrieval_path:
-        #     context_path.append( json.dumps(json.loads(doc.page_content), ensure_ascii=False))
- 
-        print(context_vector_path) 
-        context_components = components_retriever.get_path_with_resolved_components (query)
-    
-        print(context_components) 
-    
-        message = {
-            # "OPENAPI_INFO" : json.dumps( JSON_object["info"], ensure_ascii=False),
-            # "OPENAPI_SECURITY" : json.dumps(JSON_object["security"], ensure_ascii=False),
-            # "OPENAPI_SERVER" : json.dumps(JSON_object["servers"], ensure_ascii=False),
-            "OPENAPI_PATHS" : json.dumps( context_vector_path),
-            "OPENAPI_COMPONENTS" : json.dumps( context_components, ensure_ascii=False),
-            "QUERY": query
-        }
-        response = qa_chain.invoke(
-            input={
-                "OPENAPI_PATHS" : json.dumps( context_vector_path),
-                "OPENAPI_COMPONENTS" : json.dumps( context_components, ensure_ascii=False),
-                "QUERY": query
-            },
-            verbose=False
-        )
+
+        runtime = get_runtime()
+        bootstrap.timer.log_once()
+        tracing = bootstrap.tracing()
+        with tracing.trace("chat", request_id=getattr(context, "aws_request_id", None)) as trace:
+            # endpoint 매칭(메모리)을 먼저 해서 fast path 질문은 답변 캐시용 임베딩을 만들지 않음
+            match = match_endpoints(query)
+            cached, cache_key = lookup_cached_answer(query, match)
+            cacheable = False
+            if cached is not None:
+                response = cached["answer"]
+            elif chat_async:
+                response, cacheable = bootstrap.event_loop().run_until_complete(agenerate_response(query, trace, match))
+            else:
+                chain_input, cacheable = build_chain_input(query, match)
+                with tracing.span("generation"):
+                    response = runtime.qa_chain.invoke(
+                        input=chain_input,
+                        config={"callbacks": [tracing.token_usage_callback(trace)]},
+                        verbose=False
+                    )
+            if cacheable:
+                store_answer(query, cache_key, response)
         # response, contexts = qa_chain.invoke(
         #     query = message,
         #     verbose=False
         # )
- 
+
+        result = {'response': response}
+        if body.get('debug'):
+            # 단계별 소요시간, OpenSearch 왕복/바이트, Bedrock 토큰 수
+            result['debug'] = trace.report()
         return {
             'statusCode': 200,
-            'body': json.dumps({'response': response}),
+            'body': json.dumps(result),
             'headers': {
                 'Content-Type': 'application/json',
                 'Access-Control-Allow-Origin': '*'  # CORS 설정
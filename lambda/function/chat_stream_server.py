@@ -0,0 +1,75 @@
+import json
+import os
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Lambda Web Adapter(AWS_LWA_INVOKE_MODE=response_stream) 뒤에서 실행되는 스트리밍 엔드포인트
+# 응답은 Server-Sent Events 형식: data: {"token": "..."} ... data: {"done": true}
+# 요청에 "debug": true가 있으면 done 직전에 data: {"debug": {...단계별 소요시간...}}를 보냄
+import chat_function
+
+
+class ChatStreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        # Lambda Web Adapter readiness check
+        self._send_json(200, {"status": "ok"})
+
+    def do_OPTIONS(self):
+        self.send_response(204)
+        self._send_cors_headers()
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            body = json.loads(self.rfile.read(length))
+            query = body['message']
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {'error': f"Invalid request body: {e}"})
+            return
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self._send_cors_headers()
+        self.end_headers()
+
+        try:
+            with chat_function.bootstrap.tracing().trace("chat_stream") as trace:
+                for token in chat_function.stream_response(query):
+                    self._write_event({'token': token})
+            if body.get('debug'):
+                self._write_event({'debug': trace.report()})
+            self._write_event({'done': True})
+        except Exception as e:
+            print(f"Error streaming response: {e}")
+            self._write_event({'error': str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _write_event(self, payload):
+        data = f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode('utf-8')
+        self.wfile.write(f"{len(data):X}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self._send_cors_headers()
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_cors_headers(self):
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Allow-Headers', 'Content-Type')
+        self.send_header('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
+
+
+if __name__ == "__main__":
+    port = int(os.getenv('PORT', '8080'))
+    ThreadingHTTPServer(('0.0.0.0', port), ChatStreamHandler).serve_forever()
@@ -1,65 +1,38 @@
-import boto3
 import json
-from typing import List, Tuple
-from opensearchpy import OpenSearch, RequestsHttpConnection
-import boto3
-from botocore.config import Config
-import langchain_aws
-from langchain.docstore.document import Document
 import importlib.util
-from requests_aws4auth import AWS4Auth
 import os
 
-ssm = boto3.client('ssm')
-s3 = boto3.client('s3')
+spec = importlib.util.spec_from_file_location("Bootstrap", "/opt/python/bootstrap.py")
+bootstrap = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bootstrap)
 
 
-opensearch_domain_endpoint = ssm.get_parameter(Name='opensearchdomain')['Parameter']['Value']
-opensearch_user_password = ssm.get_parameter(Name='opensearchpassword')['Parameter']['Value']
-opensearch_user_id = ssm.get_parameter(Name='opensearchid')['Parameter']['Value']
-http_auth = (opensearch_user_id, opensearch_user_password) # Master username, Master password
-opensearch = boto3.client('opensearch')
-
-region="us-west-2"
-
-boto3_bedrock_runtime = boto3.client("bedrock-runtime")
-llm_emb = langchain_aws.BedrockEmbeddings( region_name=region, model_id="amazon.titan-embed-text-v2:0", 
-                                       client=boto3_bedrock_runtime
-)
-
-credentials = boto3.Session().get_credentials()
-# awsauth = AWS4Auth(credentials.access_key, credentials.secret_key, region, 'es', session_token=credentials.token)
- 
-os_client = OpenSearch(
-    hosts=[
-        {'host': opensearch_domain_endpoint.replace("https://", ""),
-         'port': 443
-        }
-    ],
-    http_auth=http_auth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
-spec = importlib.util.spec_from_file_location("OpenSearchRetriever", "/opt/python/opensearchretriever.py")
-module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(module)
-    
-api_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    embedding_function=llm_emb
-)
+def get_api_retriever():
+    return bootstrap.lazy("api_retriever", lambda: bootstrap.retriever_module().OpenSearchRetriever(
+        client=bootstrap.opensearch_client(),
+        embedding_function=bootstrap.embeddings()
+    ))
 
 index_paths_name = os.getenv('PATHS_INDEX_NAME')
 index_components_name = os.getenv('COMPONENTS_INDEX_NAME')
 index_vector_name = os.getenv('VECTORS_INDEX_NAME')
 index_vector_paths_name = os.getenv('VECTORS_PATH_INDEX_NAME')
 index_vector_components_name = os.getenv('VECTORS_COMPONENTS_INDEX_NAME')
+hybrid_search_pipeline = os.getenv('HYBRID_SEARCH_PIPELINE')
+# 시맨틱 답변 캐시용 k-NN 인덱스 (설정 값은 같은 이름의 SSM 파라미터)
+index_answer_cache_name = os.getenv('ANSWER_CACHE_INDEX_NAME')
 def lambda_handler(event, context):
- 
-    index_vector_settings = ssm.get_parameter(Name=index_vector_name)['Parameter']['Value']
-    index_paths_settings = ssm.get_parameter(Name=index_paths_name)['Parameter']['Value']
-    index_components_settings = ssm.get_parameter(Name=index_components_name)['Parameter']['Value']
+    api_retriever = get_api_retriever()
+    bootstrap.timer.log_once()
+
+    # 인덱스 설정을 get_parameters 한 번으로 조회
+    settings = bootstrap.get_parameters([name for name in [index_vector_name, index_paths_name, index_components_name, index_answer_cache_name] if name])
+    # 벡터 인덱스는 VECTOR_INDEX_PROFILE의 차원/공간/양자화/HNSW 파라미터로 생성
+    profile = bootstrap.vector_profile()
+    index_vector_settings = profile.apply(json.loads(settings[index_vector_name]))
+    print(f"Vector index profile: {profile}")
+    index_paths_settings = settings[index_paths_name]
+    index_components_settings = settings[index_components_name]
     
     try:
         # 인덱스 생성
@@ -71,6 +44,15 @@ def lambda_handler(event, context):
         print(f"Index created: {response}")
         response = api_retriever.create_index(index_name= index_vector_components_name, index_mapping = index_vector_settings  )
         print(f"Index created: {response}")
+        if index_answer_cache_name:
+            # 답변 캐시도 같은 임베딩을 저장하므로 차원만 프로파일에 맞춤
+            index_answer_cache_settings = json.loads(settings[index_answer_cache_name])
+            index_answer_cache_settings["mappings"]["properties"]["query_vector"]["dimension"] = profile.dimensions
+            response = api_retriever.create_index(index_name= index_answer_cache_name, index_mapping = index_answer_cache_settings  )
+            print(f"Index created: {response}")
+        if hybrid_search_pipeline:
+            response = api_retriever.create_hybrid_search_pipeline(hybrid_search_pipeline)
+            print(f"Search pipeline created: {response}")
         
         responseMessage = {
             'PhysicalResourceId': [index_paths_name,index_components_name,index_vector_name],
@@ -0,0 +1,3 @@
+#!/bin/bash
+# Lambda Web Adapter 진입점: 스트리밍 채팅 서버 실행
+exec python3 chat_stream_server.py
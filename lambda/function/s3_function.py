@@ -1,168 +1,290 @@
-import boto3
 import json
-from typing import List, Tuple
-from opensearchpy import OpenSearch, RequestsHttpConnection
-import boto3
-from botocore.config import Config
-import langchain_aws
-from langchain.docstore.document import Document
 import importlib.util
-from requests_aws4auth import AWS4Auth
 import os
-from langchain_community.vectorstores import OpenSearchVectorSearch
-
-
-ssm = boto3.client('ssm')
-s3 = boto3.client('s3')
-opensearch_domain_endpoint = ssm.get_parameter(Name='opensearchdomain')['Parameter']['Value']
-opensearch_user_password = ssm.get_parameter(Name='opensearchpassword')['Parameter']['Value']
-opensearch_user_id = ssm.get_parameter(Name='opensearchid')['Parameter']['Value']
-http_auth = (opensearch_user_id, opensearch_user_password) # Master username, Master password
-
-opensearch = boto3.client('opensearch')
-
-region="us-west-2"
-
-boto3_bedrock_runtime = boto3.client("bedrock-runtime")
-llm_emb = langchain_aws.BedrockEmbeddings( region_name=region, model_id="amazon.titan-embed-text-v2:0", 
-                                       client=boto3_bedrock_runtime
-)
-
-credentials = boto3.Session().get_credentials()
-# awsauth = AWS4Auth(credentials.access_key, credentials.secret_key, region, 'es', session_token=credentials.token)
- 
-os_client = OpenSearch(
-    hosts=[
-        {'host': opensearch_domain_endpoint.replace("https://", ""),
-         'port': 443
-        }
-    ],
-    http_auth=http_auth,
-    use_ssl=True,
-    verify_certs=True,
-    connection_class=RequestsHttpConnection
-)
-
-spec = importlib.util.spec_from_file_location("OpenSearchRetriever", "/opt/python/opensearchretriever.py")
-module = importlib.util.module_from_spec(spec)
-spec.loader.exec_module(module)
-    
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+spec = importlib.util.spec_from_file_location("Bootstrap", "/opt/python/bootstrap.py")
+bootstrap = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bootstrap)
 
 index_paths_name = os.getenv('PATHS_INDEX_NAME')
 index_components_name = os.getenv('COMPONENTS_INDEX_NAME')
 index_vector_paths_name = os.getenv('VECTORS_PATH_INDEX_NAME')
 index_vector_components_name = os.getenv('VECTORS_COMPONENTS_INDEX_NAME')
+ingest_concurrency = int(os.getenv('INGEST_CONCURRENCY', '4'))
+embedding_rps = float(os.getenv('EMBEDDING_RPS', '20'))
+embedding_burst = float(os.getenv('EMBEDDING_BURST', str(embedding_rps)))
+embedding_max_retries = int(os.getenv('EMBEDDING_MAX_RETRIES', '5'))
+embedding_concurrency = int(os.getenv('EMBEDDING_CONCURRENCY', '4'))
+chunk_max_tokens = int(os.getenv('CHUNK_MAX_TOKENS', '2000'))
+# 시맨틱 답변 캐시 인덱스: 스펙이 바뀌면 이전 버전의 답변을 삭제
+answer_cache_index_name = os.getenv('ANSWER_CACHE_INDEX_NAME')
+
+
+def _create_embeddings():
+    module = bootstrap.retriever_module()
+    ratelimit = bootstrap.load_layer_module("ratelimit")
+    # 두 벡터 파이프라인이 같은 token bucket을 공유해 합산 호출률이 Bedrock 한도를 넘지 않도록 함
+    rate_limited_emb = ratelimit.RateLimitedEmbeddings(
+        bootstrap.embeddings(),
+        ratelimit.TokenBucket(embedding_rps, embedding_burst),
+        max_retries=embedding_max_retries
+    )
+    # 캐시 적중은 Bedrock 호출(토큰)을 쓰지 않도록 rate limiter 바깥에서 캐시
+    llm_emb = bootstrap.cached_embeddings(
+        rate_limited_emb,
+        module.LRUCache(int(os.getenv('EMBEDDING_MEMORY_CACHE_SIZE', '1024'))),
+        concurrency=embedding_concurrency
+    )
+    return llm_emb, rate_limited_emb
+
+
+def get_embeddings():
+    return bootstrap.lazy("s3_embeddings", _create_embeddings)
+
+
+def _create_retrievers():
+    # ingest는 자체 임베딩 + _bulk로 처리하므로 OpenSearchVectorSearch가 필요 없음
+    module = bootstrap.retriever_module()
+    os_client = bootstrap.opensearch_client()
+    llm_emb, _ = get_embeddings()
+    # byte 프로파일은 캐시된 float 벡터를 인덱스에 쓰기 직전에 양자화
+    vector_emb = bootstrap.vector_profile().wrap_embeddings(llm_emb)
+    return {
+        "paths": module.OpenSearchRetriever(
+            client=os_client,
+            index_name=index_paths_name,
+            embedding_function=llm_emb
+        ),
+        "components": module.OpenSearchRetriever(
+            client=os_client,
+            index_name=index_components_name,
+            embedding_function=llm_emb
+        ),
+        "paths_vector": module.OpenSearchRetriever(
+            client=os_client,
+            index_name=index_vector_paths_name,
+            embedding_function=vector_emb,
+            vector_field="vector_field",
+            # 배치 단위로 embed_documents를 호출해 캐시 조회를 묶고, 동시 호출은 CachedEmbeddings가 처리
+            embedding_concurrency=1
+        ),
+        "components_vector": module.OpenSearchRetriever(
+            client=os_client,
+            index_name=index_vector_components_name,
+            embedding_function=vector_emb,
+            vector_field="vector_field",
+            # 배치 단위로 embed_documents를 호출해 캐시 조회를 묶고, 동시 호출은 CachedEmbeddings가 처리
+            embedding_concurrency=1
+        ),
+    }
+
+
+def get_retrievers():
+    return bootstrap.lazy("s3_retrievers", _create_retrievers)
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+def _truncate(text, limit=500):
+    text = " ".join(str(text).split())
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def path_embedding_text(module, path, item):
+    # 임베딩에는 path JSON 전체 대신 operation별 요약만 사용
+    lines = []
+    for method, operation in item.items():
+        if method not in HTTP_METHODS or not isinstance(operation, dict):
+            continue
+        parts = [f"{method.upper()} {path}"]
+        for field in ("summary", "description", "operationId"):
+            if operation.get(field):
+                parts.append(_truncate(operation[field]))
+        if operation.get("tags"):
+            parts.append("tags: " + ", ".join(map(str, operation["tags"])))
+        parameters = [p.get("name") for p in list(item.get("parameters") or []) + list(operation.get("parameters") or []) if isinstance(p, dict) and p.get("name")]
+        if parameters:
+            parts.append("parameters: " + ", ".join(parameters))
+        # 분할된 청크는 requestBody/응답 단위로 내용이 달라지므로 설명도 포함
+        request_body = operation.get("requestBody")
+        if isinstance(request_body, dict) and request_body.get("description"):
+            parts.append("requestBody: " + _truncate(request_body["description"]))
+        responses = operation.get("responses")
+        if isinstance(responses, dict) and responses:
+            parts.append("responses: " + ", ".join(
+                f"{status} {_truncate(response['description'], 200)}" if isinstance(response, dict) and response.get("description") else str(status)
+                for status, response in responses.items()
+            ))
+        schemas = module.referenced_names(operation)
+        if schemas:
+            parts.append("schemas: " + ", ".join(schemas))
+        lines.append(" | ".join(parts))
+    return "\n".join(lines)
+
+
+def schema_embedding_text(module, name, schema):
+    parts = [f"schema {name}"]
+    if isinstance(schema, dict):
+        for field in ("title", "description", "type"):
+            if schema.get(field):
+                parts.append(_truncate(schema[field]))
+        if isinstance(schema.get("properties"), dict):
+            parts.append("properties: " + ", ".join(list(schema["properties"])[:50]))
+        if isinstance(schema.get("required"), list):
+            parts.append("required: " + ", ".join(map(str, schema["required"])))
+    references = module.referenced_names(schema)
+    if references:
+        parts.append("references: " + ", ".join(references))
+    return " | ".join(parts)
+
+
+def spec_document(spec_id, shared):
+    # 모든 path/schema 문서가 공유하는 스펙 공통 항목은 벡터 없는 문서 하나로 저장하고 spec_id로 참조
+    from langchain.docstore.document import Document
+
+    shared = {k: v for k, v in shared.items() if v}
+    if not shared:
+        return None
+    return Document(page_content=json.dumps(shared, ensure_ascii=False), metadata={"id": spec_id, "type": "spec"})
+
+
+def chunk_document(chunker, chunk, spec_id, embedding_text):
+    from langchain.docstore.document import Document
+
+    metadata = {"id": chunk.id}
+    if chunk.is_parent:
+        # 전체 객체는 벡터 없이 저장하고, 자식 청크가 검색되면 parent_id로 함께 가져옴
+        metadata["type"] = "parent"
+    else:
+        metadata["embedding_text"] = chunker.truncate(embedding_text(chunk.content))
+    if chunk.parent_id:
+        metadata["parent_id"] = chunk.parent_id
+    if spec_id:
+        metadata["spec_id"] = spec_id
+    return Document(page_content=json.dumps(chunk.content, ensure_ascii=False), metadata=metadata)
+
+
+def path_documents(module, chunker, spec_id, header, paths):
+    spec_doc = spec_document(spec_id, {key: header.get(key) for key in ("info", "servers", "security")})
+    if spec_doc:
+        yield spec_doc
+    for path, item in paths:
+        # Only create a Document if the path item is not empty
+        if item:
+            # path를 id로 사용해 재업로드 시 같은 문서를 갱신 (큰 path는 path#method 등으로 분할)
+            for chunk in chunker.chunk_path(path, item):
+                yield chunk_document(chunker, chunk, spec_doc and spec_id,
+                                     lambda content: path_embedding_text(module, path, content[path]))
+
+
+def component_documents(module, chunker, spec_id, component_header, schemas):
+    spec_doc = spec_document(spec_id, component_header)
+    if spec_doc:
+        yield spec_doc
+    for _, name, value in schemas:
+        # Only create a Document if the schema is not empty
+        if value:
+            for chunk in chunker.chunk_schema(f"schemas_{name}", name, value):
+                yield chunk_document(chunker, chunk, spec_doc and spec_id,
+                                     lambda content: schema_embedding_text(module, name, content[name]))
+
+
+def run_pipelines(pipelines, max_workers):
+    summaries = {}
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="ingest") as executor:
+        futures = {name: executor.submit(pipeline) for name, pipeline in pipelines.items()}
+        for name, future in futures.items():
+            try:
+                summaries[name] = future.result()
+            except Exception as e:
+                print(f"Error in {name} pipeline: {e}")
+                summaries[name] = {"indexed": 0, "created": 0, "updated": 0, "deleted": 0, "unchanged": 0,
+                                   "failed": 1, "errors": [{"id": None, "error": str(e)}]}
+    print(f"Ingest pipelines finished in {time.monotonic() - started:.1f}s")
+    return summaries
 
-vector_path_db = OpenSearchVectorSearch(
-    index_name=index_vector_paths_name,
-    opensearch_url=f"https://{opensearch_domain_endpoint}",
-    embedding_function=llm_emb,
-    http_auth=http_auth, # http_auth
-    is_aoss=False,
-    engine="faiss",
-    space_type="l2",
-    bulk_size=100000,
-    timeout=60
-)
-vector_component_db = OpenSearchVectorSearch(
-    index_name=index_vector_components_name,
-    opensearch_url=f"https://{opensearch_domain_endpoint}",
-    embedding_function=llm_emb,
-    http_auth=http_auth, # http_auth
-    is_aoss=False,
-    engine="faiss",
-    space_type="l2",
-    bulk_size=100000,
-    timeout=60
-)
-
-
-paths_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_paths_name,
-    embedding_function=llm_emb
-)
-components_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_components_name,
-    embedding_function=llm_emb
-)
-paths_vector_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_vector_paths_name,
-    embedding_function=llm_emb,
-    vector_search=vector_path_db,
-)
-components_vector_retriever = module.OpenSearchRetriever(
-    client=os_client,
-    index_name=index_vector_components_name,
-    embedding_function=llm_emb,
-    vector_search=vector_component_db
-)
 
 def lambda_handler(event, context):
-    
+    retrievers = get_retrievers()
+    module = bootstrap.retriever_module()
+    specstream = bootstrap.load_layer_module("specstream")
+    # Titan v2 입력 한도(8k 토큰) 안에서 path/schema를 청크로 나눔
+    chunker = bootstrap.load_layer_module("specchunker").SpecChunker(
+        max_tokens=chunk_max_tokens,
+        token_counter=bootstrap.load_layer_module("contextbuilder").estimate_tokens
+    )
+    s3 = bootstrap.boto3_client('s3')
+    bootstrap.timer.log_once()
+
     bucket = event['Records'][0]['s3']['bucket']['name']
     key = event['Records'][0]['s3']['object']['key']
+    # S3 객체를 source로 사용: 이전 업로드와 내용 해시가 같은 항목은 건너뛰고 사라진 항목은 삭제
+    source = f"s3://{bucket}/{key}"
+    spec_id = f"spec:{source}"
     
     
 # # 'apispecification/' 폴더의 파일만 처리
 #     if key.startswith('apispecification/'):    
-    obj = s3.get_object(Bucket=bucket, Key=key)
-    data = obj['Body'].read().decode('utf-8')
-
-    print( "Data validate and preprocess")
-    # 데이터 검증 및 전처리
-    data = data.strip()
-    JSON_object = json.loads(data)
-  
-    # JSON 객체 처리
-    for key in JSON_object:
-        JSON_string = json.dumps(key)
-        print(JSON_string)
-
-    child_path_docs = []
-
-    for i, obj in enumerate(JSON_object["paths"]):
-        schema = {}
-        schema["info"] = JSON_object["info"] if JSON_object.get("info") else None
-        schema["servers"] = JSON_object["servers"] if JSON_object.get("servers") else None
-        schema["security"] = JSON_object["security"] if JSON_object.get("security") else None
-        schema[obj] = JSON_object["paths"][obj] if JSON_object["paths"].get(obj) else None
-
-        # Remove keys with None values
-        schema = {k: v for k, v in schema.items() if v is not None}
-
-        # Only create a Document if schema is not empty
-        if schema:
-            doc = Document(page_content=json.dumps(schema, ensure_ascii=False))
-            child_path_docs.append(doc)
-        
-    child_components_docs = []
-    if "components" in JSON_object:
-        for i, obj in enumerate(JSON_object["components"].get("schemas", {})):
-            schema = {}
-            schema["securitySchemes"] = JSON_object["components"].get("securitySchemes") if JSON_object["components"].get("securitySchemes") else None
-            schema["basicAuth"] = JSON_object["components"].get("basicAuth") if JSON_object["components"].get("basicAuth") else None
-            schema[obj] = JSON_object["components"]["schemas"].get(obj) if JSON_object["components"]["schemas"].get(obj) else None
-
-            # Remove keys with None values
-            schema = {k: v for k, v in schema.items() if v is not None}
-
-            # Only create a Document if schema is not empty
-            if schema:
-                doc = Document(page_content=json.dumps(schema, ensure_ascii=False))
-                child_components_docs.append(doc)
-    else:
+    # 스펙 전체를 메모리에 올리지 않고 S3 본문을 스트리밍으로 파싱 (JSON/YAML)
+    # 패스마다 GetObject를 새로 호출하며, 한 번에 한 항목만 메모리에 유지
+    stream = specstream.SpecStream(lambda: s3.get_object(Bucket=bucket, Key=key)['Body'], specstream.spec_format(key))
+
+    print( "Scan header and component references")
+    # 1차 패스: 헤더, 컴포넌트 공통 항목, path/component별 전이적 컴포넌트 의존성
+    header = {}
+    component_header = {"securitySchemes": {}, "basicAuth": {}}
+    graph = module.ComponentDependencyGraph()
+    for section, name, value in stream.items():
+        if section == specstream.HEADER:
+            header[name] = value
+            print(json.dumps(name))
+        elif section == specstream.PATHS:
+            graph.add_path(name, value)
+        else:
+            graph.add_component(section, name, value)
+            if section in component_header:
+                component_header[section][name] = value
+    dependencies = graph.resolve()
+    if not graph.direct:
         print("No components found in the JSON object.")
 
-    
     print( "Start OpenSearch")
-    paths_vector_retriever.add_documents(child_path_docs)
-    paths_retriever.bulk_write_paths ( JSON_object )
-
-    components_vector_retriever.add_documents(child_components_docs)    
-    components_retriever.bulk_write_components ( JSON_object )
+    # paths 인덱스도 벡터 파이프라인과 같이 spec 문서를 spec_id로 참조 (spec 문서가 없으면 기록하지 않음)
+    path_spec_id = spec_id if any(header.get(key) for key in ("info", "servers", "security")) else None
+    # 이후 패스: 항목을 generator로 읽어 배치 임베딩 / _bulk 색인으로 바로 전달
+    # 네 파이프라인은 각자 스트림을 열어 동시에 실행 (전체 시간 ≈ 가장 느린 파이프라인)
+    pipelines = {
+        "paths_vector": lambda: retrievers["paths_vector"].add_documents(
+            path_documents(module, chunker, spec_id, header, stream.paths()), source=source),
+        "paths": lambda: retrievers["paths"].bulk_write_paths(
+            {"spec_id": path_spec_id, "paths": stream.paths()}, dependencies=dependencies["paths"], source=source),
+        "components_vector": lambda: retrievers["components_vector"].add_documents(
+            component_documents(module, chunker, spec_id, component_header, stream.components(["schemas"])), source=source),
+        "components": lambda: retrievers["components"].bulk_write_components(
+            {"components": stream.components(module.COMPONENT_TYPES)}, dependencies=dependencies["components"], source=source),
+    }
+    summaries = run_pipelines(pipelines, ingest_concurrency)
+    for name, summary in summaries.items():
+        print(f"{name}: {summary}")
+    llm_emb, rate_limited_emb = get_embeddings()
+    print(f"Embedding cache: {llm_emb.stats()}")
+    if rate_limited_emb.throttled:
+        print(f"Embedding calls throttled and retried: {rate_limited_emb.throttled}")
+    # 변경된 인덱스만 버전을 갱신해 chat_function의 warm 캐시를 무효화
+    changed = False
+    for name, retriever in retrievers.items():
+        summary = summaries[name]
+        if summary["created"] or summary["updated"] or summary["deleted"]:
+            retriever.bump_index_version()
+            changed = True
+    if changed and answer_cache_index_name:
+        # 이전 스펙 버전으로 생성된 답변은 더 이상 조회되지 않으므로 삭제
+        answercache = bootstrap.load_layer_module("answercache")
+        version = answercache.spec_version({retriever.index_name: retriever.get_index_version() for retriever in retrievers.values()})
+        answercache.SemanticAnswerCache(bootstrap.opensearch_client(), answer_cache_index_name).invalidate(keep_version=version)
     print( "Fin OpenSearch")
     
     return {
@@ -0,0 +1,118 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 반복되는 질문의 답변을 질의 임베딩 유사도로 재사용 (Bedrock 생성 한 번을 k-NN 조회 한 번으로 대체)
+# 항목은 생성 당시의 spec_version과 함께 저장되고 같은 버전끼리만 조회됨
+# 인덱스는 os_index_function이 json/index_answer_cache.json으로 생성 (lucene HNSW, cosinesimil)
+
+
+def spec_version(versions: Dict[str, str]) -> str:
+    # 검색 인덱스별 _meta.spec_version을 하나의 값으로: 어느 인덱스든 다시 ingest되면 바뀜
+    joined = "|".join(f"{name}={version}" for name, version in sorted(versions.items()))
+    return hashlib.sha256(joined.encode('utf-8')).hexdigest()[:32]
+
+
+def cosine_from_score(score: float) -> float:
+    # lucene 엔진 cosinesimil 공간의 점수 = (1 + cos) / 2
+    return 2 * score - 1
+
+
+class SemanticAnswerCache:
+    """Answers to earlier questions, returned when a new query embedding is within ``threshold`` cosine similarity.
+
+    Hit/miss counts and the Bedrock tokens the hits saved are kept per container. Thread safe.
+    """
+
+    def __init__(self, client: Any, index_name: str, threshold: float = 0.95, vector_field: str = "query_vector",
+                 request_timeout: float = 5.0):
+        self.client = client
+        self.index_name = index_name
+        self.threshold = threshold
+        self.vector_field = vector_field
+        self.request_timeout = request_timeout
+        self.hits = 0
+        self.misses = 0
+        self.saved_input_tokens = 0
+        self.saved_output_tokens = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, vector: List[float], version: str) -> Optional[Dict[str, Any]]:
+        # filter는 k-NN 탐색 중에 적용(efficient filtering)되므로 다른 버전 항목이 가장 가까워도 결과가 비지 않음
+        query = {
+            "size": 1,
+            "_source": {"excludes": [self.vector_field]},
+            "query": {
+                "knn": {
+                    self.vector_field: {
+                        "vector": vector,
+                        "k": 1,
+                        "filter": {"term": {"spec_version": version}}
+                    }
+                }
+            }
+        }
+        try:
+            response = self.client.search(index=self.index_name, body=query, request_timeout=self.request_timeout)
+            hits = response['hits']['hits']
+        except Exception as e:
+            logger.error(f"Error looking up cached answer: {e}")
+            hits = []
+
+        similarity = cosine_from_score(hits[0]['_score']) if hits else None
+        with self._lock:
+            if similarity is None or similarity < self.threshold:
+                self.misses += 1
+                return None
+            entry = hits[0]['_source']
+            self.hits += 1
+            self.saved_input_tokens += entry.get('input_tokens', 0)
+            self.saved_output_tokens += entry.get('output_tokens', 0)
+        return {**entry, "similarity": round(similarity, 4)}
+
+    def put(self, query: str, vector: List[float], answer: str, version: str, input_tokens: float = 0, output_tokens: float = 0):
+        if not answer:
+            return
+        document = {
+            "query": query,
+            self.vector_field: vector,
+            "answer": answer,
+            "spec_version": version,
+            "input_tokens": int(input_tokens),
+            "output_tokens": int(output_tokens),
+            "created_at": int(time.time() * 1000),
+        }
+        try:
+            self.client.index(index=self.index_name, body=document, request_timeout=self.request_timeout)
+        except Exception as e:
+            logger.error(f"Error storing cached answer: {e}")
+
+    def invalidate(self, keep_version: Optional[str] = None) -> int:
+        # 새 스펙이 ingest되면 keep_version이 아닌 항목을 삭제 (None이면 전부)
+        if keep_version:
+            query = {"query": {"bool": {"must_not": [{"term": {"spec_version": keep_version}}]}}}
+        else:
+            query = {"query": {"match_all": {}}}
+        try:
+            response = self.client.delete_by_query(index=self.index_name, body=query, conflicts="proceed",
+                                                   request_timeout=max(self.request_timeout, 60))
+            logger.info(f"Invalidated {response.get('deleted', 0)} cached answers in '{self.index_name}'")
+            return response.get('deleted', 0)
+        except Exception as e:
+            logger.error(f"Error invalidating cached answers: {e}")
+            return 0
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": "answers",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "saved_input_tokens": self.saved_input_tokens,
+            "saved_output_tokens": self.saved_output_tokens,
+        }
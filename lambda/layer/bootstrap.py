@@ -0,0 +1,217 @@
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+# Lambda 함수들이 공유하는 지연 초기화 모듈
+# SSM 값은 get_parameters 한 번으로 가져오고, 클라이언트는 처음 사용할 때 생성하며
+# OpenSearch 연결(커넥션 풀)은 모든 retriever와 벡터 검색이 함께 사용한다.
+
+REGION = os.getenv('BEDROCK_REGION', 'us-west-2')
+EMBEDDING_MODEL_ID = "amazon.titan-embed-text-v2:0"
+OPENSEARCH_PARAMETERS = ['opensearchdomain', 'opensearchpassword', 'opensearchid']
+LAYER_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class StartupTimer:
+    """Records how long each lazily initialized phase took (inclusive of nested phases)."""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.phases = {}
+        self._reported = False
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.monotonic() - start) * 1000
+
+    def report(self) -> Dict[str, Any]:
+        return {
+            "since_import_ms": round((time.monotonic() - self.started) * 1000, 1),
+            "phases_ms": {name: round(elapsed, 1) for name, elapsed in self.phases.items()},
+        }
+
+    def log_once(self):
+        # cold start 후 첫 호출에서만 초기화 비용을 출력
+        if not self._reported:
+            self._reported = True
+            print(json.dumps({"startup": self.report()}))
+
+
+timer = StartupTimer()
+
+_lock = threading.RLock()
+_instances = {}
+_parameters = {}
+
+
+def lazy(name: str, factory: Callable[[], Any]) -> Any:
+    with _lock:
+        if name not in _instances:
+            with timer.phase(name):
+                _instances[name] = factory()
+        return _instances[name]
+
+
+def boto3_client(service_name: str) -> Any:
+    return lazy(f"boto3_{service_name}", lambda: boto3.client(service_name))
+
+
+def get_parameters(names: List[str]) -> Dict[str, str]:
+    with _lock:
+        missing = [name for name in names if name not in _parameters]
+        if missing:
+            with timer.phase("ssm_parameters"):
+                # get_parameters는 한 번에 최대 10개
+                for start in range(0, len(missing), 10):
+                    response = boto3_client('ssm').get_parameters(Names=missing[start:start + 10], WithDecryption=True)
+                    for parameter in response['Parameters']:
+                        _parameters[parameter['Name']] = parameter['Value']
+                    if response.get('InvalidParameters'):
+                        raise KeyError(f"SSM parameters not found: {response['InvalidParameters']}")
+        return {name: _parameters[name] for name in names}
+
+
+def get_parameter(name: str) -> str:
+    return get_parameters([name])[name]
+
+
+def opensearch_endpoint() -> str:
+    return get_parameters(OPENSEARCH_PARAMETERS)['opensearchdomain']
+
+
+def opensearch_http_auth():
+    parameters = get_parameters(OPENSEARCH_PARAMETERS)
+    return (parameters['opensearchid'], parameters['opensearchpassword'])  # Master username, Master password
+
+
+def opensearch_client() -> Any:
+    return lazy("opensearch_client", lambda: retriever_module().create_opensearch_client(
+        opensearch_endpoint(),
+        opensearch_http_auth(),
+        pool_maxsize=int(os.getenv('OPENSEARCH_POOL_MAXSIZE', '16')),
+        timeout=float(os.getenv('OPENSEARCH_TIMEOUT', '30')),
+        backoff_retries=int(os.getenv('OPENSEARCH_RETRIES', '3'))
+    ))
+
+
+def async_opensearch_client() -> Any:
+    # async 경로 전용 AsyncOpenSearch (aiohttp 커넥션 풀), event_loop()에서만 사용
+    return lazy("async_opensearch_client", lambda: retriever_module().create_async_opensearch_client(
+        opensearch_endpoint(),
+        opensearch_http_auth(),
+        pool_maxsize=int(os.getenv('OPENSEARCH_POOL_MAXSIZE', '16')),
+        timeout=float(os.getenv('OPENSEARCH_TIMEOUT', '30')),
+        backoff_retries=int(os.getenv('OPENSEARCH_RETRIES', '3'))
+    ))
+
+
+def event_loop() -> asyncio.AbstractEventLoop:
+    # warm 컨테이너당 하나의 이벤트 루프: aiohttp 세션이 처음 사용한 루프에 묶이므로 호출마다 새로 만들지 않음
+    return lazy("event_loop", asyncio.new_event_loop)
+
+
+def vector_profile() -> Any:
+    # 벡터 인덱스 프로파일 (VECTOR_INDEX_PROFILE): 인덱스 매핑, Titan 출력 차원, 검색 공간이 모두 이 값을 따름
+    return lazy("vector_profile", lambda: load_layer_module("vectorprofile").profile_from_env())
+
+
+def embeddings() -> Any:
+    def create():
+        import langchain_aws
+        # float 벡터를 반환: byte 프로파일의 양자화는 임베딩 캐시 바깥에서 적용 (vector_profile().wrap_embeddings)
+        return langchain_aws.BedrockEmbeddings(
+            region_name=REGION, model_id=EMBEDDING_MODEL_ID, client=boto3_client("bedrock-runtime"),
+            model_kwargs=vector_profile().embedding_kwargs() or None)
+    return lazy("embeddings", create)
+
+
+def cached_embeddings(embeddings: Any, memory_cache: Any, **kwargs) -> Any:
+    # 캐시 키의 모델/차원은 감싼 객체(rate limiter 등)가 아니라 프로파일에서 정함
+    # ingest(s3_function)와 질의(chat_function)가 공유 저장소에서 같은 키를 쓰고, 차원이 다른 프로파일끼리는 섞이지 않음
+    return load_layer_module("embeddingcache").CachedEmbeddings(
+        embeddings,
+        memory_cache,
+        store=embedding_cache_store(),
+        model_id=EMBEDDING_MODEL_ID,
+        dimensions=vector_profile().embedding_kwargs().get("dimensions"),
+        **kwargs
+    )
+
+
+def embedding_cache_store() -> Optional[Any]:
+    # EMBEDDING_CACHE_BACKEND: none | sqlite(/tmp, warm 컨테이너 한정) | opensearch(함수 간 공유)
+    def create():
+        backend = os.getenv('EMBEDDING_CACHE_BACKEND', 'none')
+        module = load_layer_module("embeddingcache")
+        if backend == 'sqlite':
+            return module.SQLiteEmbeddingStore(os.getenv('EMBEDDING_CACHE_PATH', '/tmp/embedding-cache.sqlite3'))
+        if backend == 'opensearch':
+            return module.OpenSearchEmbeddingStore(opensearch_client(), os.getenv('EMBEDDING_CACHE_INDEX', 'embedding_cache'))
+        return None
+    return lazy("embedding_cache_store", create)
+
+
+def chat_model(model_id: str, model_kwargs: Dict[str, Any]) -> Any:
+    def create():
+        import langchain_aws
+        return langchain_aws.ChatBedrock(
+            client=boto3_client("bedrock-runtime"),
+            model_id=model_id,
+            model_kwargs=model_kwargs,
+        )
+    return lazy(f"chat_model_{model_id}", create)
+
+
+def vector_search(index_name: str, embedding_function: Optional[Any] = None) -> Any:
+    def create():
+        from langchain_community.vectorstores import OpenSearchVectorSearch
+        store = OpenSearchVectorSearch(
+            index_name=index_name,
+            opensearch_url=f"https://{opensearch_endpoint()}",
+            embedding_function=embedding_function or embeddings(),
+            http_auth=opensearch_http_auth(),
+            is_aoss=False,
+            engine=vector_profile().engine,
+            space_type=vector_profile().space_type,
+            bulk_size=100000,
+            timeout=60
+        )
+        # OpenSearchRetriever에 전달되면 공유 OpenSearch 클라이언트로 교체됨
+        return store
+    return lazy(f"vector_search_{index_name}", create)
+
+
+def load_layer_module(module_name: str) -> Any:
+    def load():
+        spec = importlib.util.spec_from_file_location(module_name, os.path.join(LAYER_DIR, f"{module_name}.py"))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return lazy(f"module_{module_name}", load)
+
+
+def retriever_module() -> Any:
+    def load():
+        module = load_layer_module("opensearchretriever")
+        # retriever의 단계별 span/OpenSearch 왕복 카운터를 요청 트레이스에 기록
+        module.set_tracer(tracing())
+        return module
+    return lazy("retriever_module", load)
+
+
+def tracing() -> Any:
+    return load_layer_module("tracing")
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    # 토크나이저 없이 보수적으로 추정: ASCII는 약 4자당 1토큰, 한글 등 비ASCII는 1자당 1토큰
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def _compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class ContextBuilder:
+    """Packs retrieved paths and components into a token budget for the qa_chain prompt.
+
+    Pieces are deduplicated, ranked by retrieval score and added greedily until the budget
+    is spent; pieces that do not fit are skipped so smaller, lower ranked ones can still go in.
+    """
+
+    def __init__(self, token_budget: int = 40000):
+        self.token_budget = token_budget
+
+    def build(self, path_docs: List[Any], resolved_path: Optional[Union[Dict, List[Dict]]] = None,
+              spec_headers: Optional[Dict[str, Any]] = None) -> Tuple[str, str, Dict[str, Any]]:
+        # resolved_path: {"path", "components"} 하나 또는 목록 (컴포넌트만 있는 항목은 "path" 생략)
+        resolved_paths = [resolved_path] if isinstance(resolved_path, dict) else [resolved for resolved in (resolved_path or []) if resolved]
+        pieces = self._collect_pieces(path_docs, resolved_paths, spec_headers or {})
+        pieces.sort(key=lambda piece: (-piece["score"], piece["order"]))
+
+        selected = {"paths": [], "components": []}
+        used_tokens = 0
+        dropped = 0
+        for piece in pieces:
+            if used_tokens + piece["tokens"] > self.token_budget:
+                dropped += 1
+                continue
+            used_tokens += piece["tokens"]
+            selected[piece["kind"]].append(piece)
+
+        report = {
+            "budget": self.token_budget,
+            "used_tokens": used_tokens,
+            "paths": len(selected["paths"]),
+            "components": len(selected["components"]),
+            "dropped": dropped,
+        }
+        logger.info(f"Context assembled: {report}")
+        # 선택된 조각은 원래 순서대로 배치
+        return (
+            "\n".join(piece["text"] for piece in sorted(selected["paths"], key=lambda piece: piece["order"])),
+            "\n".join(piece["text"] for piece in sorted(selected["components"], key=lambda piece: piece["order"])),
+            report,
+        )
+
+    def _collect_pieces(self, path_docs: List[Any], resolved_paths: List[Dict],
+                        spec_headers: Dict[str, Any]) -> List[Dict[str, Any]]:
+        pieces = []
+        seen = set()
+
+        def add(kind: str, dedupe_key: str, text: str, score: float):
+            if dedupe_key in seen:
+                return
+            seen.add(dedupe_key)
+            pieces.append({
+                "kind": kind,
+                "text": text,
+                "score": score,
+                "order": len(pieces),
+                "tokens": estimate_tokens(text),
+            })
+
+        # 정확히 일치한 path와 그 컴포넌트가 가장 우선
+        for resolved_path in resolved_paths:
+            if resolved_path.get("spec_id") in spec_headers:
+                spec_id = resolved_path["spec_id"]
+                add("paths", f"spec:{spec_id}", self._doc_text(spec_headers[spec_id]), float("inf"))
+            if resolved_path.get("path"):
+                path_text = _compact_json(resolved_path["path"])
+                add("paths", self._text_key(path_text), path_text, float("inf"))
+            for component in resolved_path.get("components", []):
+                component_key = f"component:{component.get('component_type')}:{component.get('key')}"
+                add("components", component_key, _compact_json(component), float("inf"))
+
+        previous_score = 0.0
+        for rank, doc in enumerate(path_docs):
+            text = self._doc_text(doc)
+            score = doc.metadata.get("score")
+            if score is None:
+                # parent 문서는 바로 앞 자식 문서의 점수를 따름
+                score = previous_score if doc.metadata.get("is_parent") else 1.0 / (rank + 1)
+            previous_score = score
+            # 스펙 공통 헤더(info/servers/security)는 문서에 복사하지 않고 여기서 한 번만 붙임
+            spec_id = doc.metadata.get("spec_id")
+            if spec_id in spec_headers:
+                add("paths", f"spec:{spec_id}", self._doc_text(spec_headers[spec_id]), score)
+            add("paths", self._text_key(text), text, score)
+        return pieces
+
+    @staticmethod
+    def _doc_text(doc: Any) -> str:
+        try:
+            return _compact_json(json.loads(doc.page_content))
+        except ValueError:
+            return doc.page_content
+
+    @staticmethod
+    def _text_key(text: str) -> str:
+        return "text:" + hashlib.sha1(text.encode("utf-8")).hexdigest()
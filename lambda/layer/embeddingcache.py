@@ -0,0 +1,210 @@
+import array
+import hashlib
+import logging
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def embedding_cache_key(model_id: str, dimensions: Optional[int], text: str) -> str:
+    # 모델과 차원이 다르면 벡터도 다르므로 키에 포함
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    return f"{model_id}:{dimensions or 'default'}:{digest}"
+
+
+def _pack(vector: List[float]) -> bytes:
+    return array.array("f", vector).tobytes()
+
+
+def _unpack(blob: bytes) -> List[float]:
+    values = array.array("f")
+    values.frombytes(blob)
+    return values.tolist()
+
+
+class SQLiteEmbeddingStore:
+    """Persistent embedding store in a local SQLite file (e.g. under /tmp for warm Lambda containers)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        found = {}
+        with self._lock:
+            # SQLite 바인딩 변수 개수 제한 때문에 나눠서 조회
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                )
+                found.update((key, _unpack(blob)) for key, blob in rows)
+        return found
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                ((key, _pack(vector)) for key, vector in items.items())
+            )
+            self._conn.commit()
+
+
+class OpenSearchEmbeddingStore:
+    """Persistent embedding store in an OpenSearch index shared by all functions.
+
+    Vectors are kept in ``_source`` only (not indexed); the index is created on first use.
+    """
+
+    mapping = {
+        "settings": {"index": {"number_of_shards": 1, "number_of_replicas": 1}},
+        "mappings": {
+            "dynamic": False,
+            "properties": {"model": {"type": "keyword"}},
+        },
+    }
+
+    def __init__(self, client: Any, index_name: str, request_timeout: float = 10.0):
+        self.client = client
+        self.index_name = index_name
+        self.request_timeout = request_timeout
+        self._checked = False
+        self._lock = threading.Lock()
+
+    def _ensure_index(self):
+        with self._lock:
+            if self._checked:
+                return
+            if not self.client.indices.exists(index=self.index_name):
+                # 다른 함수가 동시에 만들었으면 400(resource_already_exists)은 무시
+                self.client.indices.create(index=self.index_name, body=self.mapping, ignore=400)
+            self._checked = True
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        if not keys:
+            return {}
+        self._ensure_index()
+        response = self.client.mget(index=self.index_name, body={"ids": keys}, request_timeout=self.request_timeout)
+        return {
+            doc["_id"]: doc["_source"]["vector"]
+            for doc in response.get("docs", [])
+            if doc.get("found")
+        }
+
+    def put_many(self, items: Dict[str, List[float]]):
+        if not items:
+            return
+        self._ensure_index()
+        from opensearchpy import helpers
+
+        actions = (
+            {"_index": self.index_name, "_id": key, "_source": {"model": key.split(":", 1)[0], "vector": vector}}
+            for key, vector in items.items()
+        )
+        _, errors = helpers.bulk(self.client, actions, raise_on_error=False, request_timeout=self.request_timeout)
+        if errors:
+            logger.warning(f"Failed to store {len(errors)} cached embeddings")
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper with an in-memory cache in front of an optional persistent store.
+
+    Keys are model id + dimensions + SHA-256 of the text, so identical blocks shared by
+    many documents, re-uploaded specs and repeated queries are embedded once. Store
+    errors are logged and treated as misses.
+    """
+
+    def __init__(self, embeddings: Embeddings, memory_cache: Any, store: Optional[Any] = None,
+                 dimensions: Optional[int] = None, concurrency: int = 4,
+                 query_normalizer: Optional[Callable[[str], str]] = None, model_id: Optional[str] = None):
+        self.embeddings = embeddings
+        self.memory_cache = memory_cache
+        self.store = store
+        self.model_id = model_id or getattr(embeddings, "model_id", type(embeddings).__name__)
+        self.dimensions = dimensions or (getattr(embeddings, "model_kwargs", None) or {}).get("dimensions")
+        self.concurrency = concurrency
+        # 질의는 공백/대소문자를 정규화한 텍스트로 키를 만들 수 있음 (문서는 원문 그대로)
+        self.query_normalizer = query_normalizer
+        self.memory_hits = 0
+        self.store_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def embed_query(self, text: str) -> List[float]:
+        key_text = self.query_normalizer(text) if self.query_normalizer else text
+        return self._embed({embedding_cache_key(self.model_id, self.dimensions, key_text): text})[0]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [embedding_cache_key(self.model_id, self.dimensions, text) for text in texts]
+        texts_by_key = dict(zip(keys, texts))
+        vectors = dict(zip(texts_by_key, self._embed(texts_by_key)))
+        return [vectors[key] for key in keys]
+
+    def _embed(self, texts_by_key: Dict[str, str]) -> List[List[float]]:
+        found = {}
+        for key in texts_by_key:
+            vector = self.memory_cache.get(key, _MISSING)
+            if vector is not _MISSING:
+                found[key] = vector
+        memory_hits = len(found)
+
+        missing = [key for key in texts_by_key if key not in found]
+        if missing and self.store is not None:
+            try:
+                stored = self.store.get_many(missing)
+            except Exception as e:
+                logger.error(f"Error reading embedding cache store: {e}")
+                stored = {}
+            for key, vector in stored.items():
+                found[key] = vector
+                self.memory_cache.put(key, vector)
+            missing = [key for key in missing if key not in found]
+        store_hits = len(found) - memory_hits
+
+        computed = {}
+        if missing:
+            def compute(key: str) -> List[float]:
+                vector = self.embeddings.embed_query(texts_by_key[key])
+                # 배치 중간에 실패해도 이미 계산한 벡터는 재시도 때 재사용
+                self.memory_cache.put(key, vector)
+                return vector
+
+            if self.concurrency > 1 and len(missing) > 1:
+                with ThreadPoolExecutor(max_workers=min(self.concurrency, len(missing))) as executor:
+                    computed = dict(zip(missing, executor.map(compute, missing)))
+            else:
+                computed = {key: compute(key) for key in missing}
+            found.update(computed)
+            if self.store is not None:
+                try:
+                    self.store.put_many(computed)
+                except Exception as e:
+                    logger.error(f"Error writing embedding cache store: {e}")
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.store_hits += store_hits
+            self.misses += len(computed)
+        return [found[key] for key in texts_by_key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.memory_hits + self.store_hits + self.misses
+        return {
+            "name": "embeddings",
+            "memory_hits": self.memory_hits,
+            "store_hits": self.store_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.store_hits) / total, 4) if total else 0.0,
+        }
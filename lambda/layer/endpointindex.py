@@ -0,0 +1,232 @@
+import logging
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 질문에 path/operationId/스키마 이름이 그대로 들어 있으면 임베딩 + kNN + BM25 없이 바로 찾기 위한 메모리 인덱스
+# paths/components 인덱스를 한 번 scan해서 만들고, 인덱스 버전이 바뀌면 다시 만듦
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+# "/v1/users/{id}", "`/pets/123`", "https://api.example.com/v1/users/1?x=1" 의 path 부분
+PATH_PATTERN = re.compile(r"(?:https?://[^/\s`'\"<>]+|(?<![\w/.]))(/[^\s`'\"<>()\[\],;?#]*)")
+# 대문자 메서드는 단독으로도, 소문자는 path 바로 앞에 있을 때만 메서드로 봄 ("get /pets" vs "how do I get a pet")
+METHOD_PATTERN = re.compile(r"(?i:\b(get|put|post|delete|options|head|patch|trace)\s+(?=/))|\b(GET|PUT|POST|DELETE|OPTIONS|HEAD|PATCH|TRACE)\b")
+IDENTIFIER_PATTERN = re.compile(r"[A-Za-z_][\w.\-]*")
+# 식별자 모양: camelCase/PascalCase(소문자 뒤 대문자), snake_case
+IDENTIFIER_SHAPE = re.compile(r"[a-z][A-Z]|[A-Za-z0-9]_[A-Za-z0-9]")
+# 모양이 없는 평범한 단어는 이 길이 이상이고 불용어가 아닐 때만 operationId/스키마 이름과 비교
+# (백틱으로 감싸거나 "login(" 처럼 호출 형태로 쓰면 짧거나 흔한 단어도 식별자로 봄)
+MIN_PLAIN_IDENTIFIER_LENGTH = 3
+STOPWORDS = frozenset("""
+a an and are as at be by can do does for from how i in is it me my of on or the this that to what when where which
+who why with you your get set put add use using show list find make call send return returns
+api apis endpoint endpoints path paths method methods operation operations schema schemas field fields model models
+request requests response responses status error errors search login logout user users id ids
+name names type types value values data info item items query token message version page order orders file files
+result results create update delete remove upload download example object string number integer boolean array
+""".split())
+# 단계 수가 다른 서버 base path(/v1, /api/v1)를 허용하기 위해 앞에서 건너뛸 수 있는 segment 수
+MAX_PREFIX_SEGMENTS = 2
+
+
+class QueryAnalysis(NamedTuple):
+    paths: List[str]
+    methods: List[str]
+    identifiers: List[str]
+
+
+class EndpointMatch(NamedTuple):
+    # path template -> 질문에서 지정된 메서드 (비어 있으면 전체)
+    paths: Dict[str, List[str]]
+    schemas: List[str]
+
+
+def analyze_query(text: str) -> QueryAnalysis:
+    paths = []
+    for match in PATH_PATTERN.finditer(text):
+        path = match.group(1).rstrip(".:!")
+        if len(path) > 1:
+            paths.append(path)
+    methods = []
+    for match in METHOD_PATTERN.finditer(text):
+        methods.append((match.group(1) or match.group(2)).lower())
+    prose = PATH_PATTERN.sub(" ", text)
+    identifiers = []
+    for match in IDENTIFIER_PATTERN.finditer(prose):
+        token = match.group().rstrip(".-")
+        if token and _looks_like_identifier(token, prose, match.start(), match.start() + len(token)):
+            identifiers.append(token)
+    return QueryAnalysis(
+        list(dict.fromkeys(paths)),
+        list(dict.fromkeys(methods)),
+        list(dict.fromkeys(identifiers))
+    )
+
+
+def _looks_like_identifier(token: str, text: str, start: int, end: int) -> bool:
+    # 평범한 문장의 단어("search", "status", "User")가 같은 이름의 operationId/스키마로 질문 전체를 가져가지 않도록 함
+    if IDENTIFIER_SHAPE.search(token):
+        return True
+    if text[start - 1:start] == "`" and text[end:end + 1] == "`":
+        return True
+    if text[end:].lstrip().startswith("("):
+        return True
+    return len(token) >= MIN_PLAIN_IDENTIFIER_LENGTH and token.lower() not in STOPWORDS
+
+
+def _segments(path: str) -> List[str]:
+    return [segment for segment in path.split("/") if segment]
+
+
+def _is_template(segment: str) -> bool:
+    return "{" in segment and "}" in segment
+
+
+class _Node:
+    __slots__ = ("literals", "param", "template")
+
+    def __init__(self):
+        self.literals: Dict[str, "_Node"] = {}
+        self.param: Optional["_Node"] = None
+        self.template: Optional[str] = None
+
+
+class PathTemplateTrie:
+    """Maps concrete paths (``/users/42``) and templates with any parameter names (``/users/{id}``) to spec path templates.
+
+    Literal segments are preferred over parameters, so ``/users/me`` matches ``/users/me`` before ``/users/{userId}``.
+    """
+
+    def __init__(self):
+        self._root = _Node()
+        self._size = 0
+
+    def insert(self, template: str):
+        node = self._root
+        for segment in _segments(template):
+            if _is_template(segment):
+                node.param = node.param or _Node()
+                node = node.param
+            else:
+                node = node.literals.setdefault(segment.lower(), _Node())
+        if node.template is None:
+            self._size += 1
+        node.template = template
+
+    def match(self, path: str) -> Optional[str]:
+        segments = _segments(path)
+        for skip in range(min(MAX_PREFIX_SEGMENTS, max(0, len(segments) - 1)) + 1):
+            template = self._match(self._root, segments[skip:])
+            if template:
+                return template
+        return None
+
+    def _match(self, node: _Node, segments: List[str]) -> Optional[str]:
+        # 깊이 우선: 각 단계에서 literal을 먼저, 그다음 파라미터를 시도
+        stack = [(node, 0)]
+        while stack:
+            current, position = stack.pop()
+            if position == len(segments):
+                if current.template:
+                    return current.template
+                continue
+            segment = segments[position]
+            if current.param is not None:
+                stack.append((current.param, position + 1))
+            literal = None if _is_template(segment) else current.literals.get(segment.lower())
+            if literal is not None:
+                stack.append((literal, position + 1))
+        return None
+
+    def __len__(self):
+        return self._size
+
+
+class EndpointIndex:
+    """Path-template trie, operationId map and schema names of the ingested specs."""
+
+    def __init__(self):
+        self.trie = PathTemplateTrie()
+        self.operations: Dict[str, Tuple[str, str]] = {}
+        self.methods: Dict[str, List[str]] = {}
+        self.schemas: Set[str] = set()
+        # 문서 id(path, "schemas_<name>") -> 저장된 의존성 closure: 있으면 path 문서와 컴포넌트를 동시에 조회할 수 있음
+        self.dependencies: Dict[str, List[str]] = {}
+
+    def add_path(self, path: str, methods: Dict[str, Any], dependencies: Optional[List[str]] = None):
+        self.trie.insert(path)
+        if dependencies is not None:
+            self.dependencies[path] = list(dependencies)
+        self.methods[path] = [method for method in methods if method in HTTP_METHODS]
+        for method, operation in methods.items():
+            operation_id = operation.get("operationId") if isinstance(operation, dict) else None
+            if operation_id:
+                self.operations.setdefault(operation_id, (path, method))
+
+    def add_schema(self, name: str, dependencies: Optional[List[str]] = None):
+        self.schemas.add(name)
+        if dependencies is not None:
+            self.dependencies[f"schemas_{name}"] = list(dependencies)
+
+    def dependencies_of(self, doc_ids: Iterable[str]) -> Optional[List[str]]:
+        # 하나라도 의존성이 저장되지 않은 예전 문서면 None (호출 측이 문서를 읽은 뒤 해석)
+        doc_ids = list(doc_ids)
+        if any(doc_id not in self.dependencies for doc_id in doc_ids):
+            return None
+        return list(dict.fromkeys(dep for doc_id in doc_ids for dep in self.dependencies[doc_id]))
+
+    @classmethod
+    def from_opensearch(cls, client: Any, paths_index: str, components_index: Optional[str] = None,
+                        request_timeout: float = 30) -> "EndpointIndex":
+        from opensearchpy import helpers
+
+        index = cls()
+        for hit in helpers.scan(client, index=paths_index, query={"_source": ["key", "methods.*.operationId", "dependencies"]},
+                                size=1000, request_timeout=request_timeout):
+            source = hit.get('_source', {})
+            if source.get('key'):
+                index.add_path(source['key'], source.get('methods') or {}, source.get('dependencies'))
+        if components_index:
+            for hit in helpers.scan(client, index=components_index,
+                                    query={"query": {"term": {"component_type": "schemas"}}, "_source": ["key", "dependencies"]},
+                                    size=1000, request_timeout=request_timeout):
+                source = hit.get('_source', {})
+                if source.get('key'):
+                    index.add_schema(source['key'], source.get('dependencies'))
+        logger.info(f"Endpoint index built: {len(index.trie)} paths, {len(index.operations)} operations, {len(index.schemas)} schemas")
+        return index
+
+    def match(self, query: str, max_paths: int = 5) -> EndpointMatch:
+        analysis = analyze_query(query)
+        paths: Dict[str, Set[str]] = {}
+        for raw_path in analysis.paths:
+            template = self.trie.match(raw_path)
+            if template:
+                # 질문에 있는 메서드 중 이 path에 정의된 것만 남김
+                paths.setdefault(template, set()).update(method for method in analysis.methods if method in self.methods.get(template, []))
+        schemas = []
+        for identifier in analysis.identifiers:
+            if identifier in self.operations:
+                path, method = self.operations[identifier]
+                paths.setdefault(path, set()).add(method)
+            elif identifier in self.schemas:
+                schemas.append(identifier)
+        selected = list(paths.items())[:max_paths]
+        return EndpointMatch(
+            {path: [method for method in self.methods.get(path, []) if method in methods] for path, methods in selected},
+            schemas
+        )
+
+    def __len__(self):
+        return len(self.trie)
+
+
+def restrict_methods(path_doc: Dict[str, Any], methods: Iterable[str]) -> Dict[str, Any]:
+    # 질문이 특정 메서드를 지정했으면 그 operation만 컨텍스트에 넣음
+    methods = list(methods)
+    if not methods or not isinstance(path_doc.get("methods"), dict):
+        return path_doc
+    kept = {method: value for method, value in path_doc["methods"].items() if method in methods}
+    return {**path_doc, "methods": kept} if kept else path_doc
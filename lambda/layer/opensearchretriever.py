@@ -1,17 +1,393 @@
+import asyncio
+import contextvars
+import copy
+import hashlib
 import logging
+import random
+import threading
+import itertools
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from langchain.docstore.document import Document
-from opensearchpy import OpenSearch, RequestsHttpConnection, NotFoundError
+from opensearchpy import OpenSearch, RequestsHttpConnection, NotFoundError, RequestError, TransportError, ConnectionError as OpenSearchConnectionError, helpers
 from langchain.schema import BaseRetriever
 from langchain_community.vectorstores import OpenSearchVectorSearch
-from typing import List, Dict, Optional, Any, Union
-from pydantic import BaseModel, Field
+from typing import List, Dict, Optional, Any, Union, Iterable, Iterator, Tuple
+from pydantic import BaseModel, Field, PrivateAttr
 import json
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# 키워드/벡터 검색을 동시에 실행하기 위한 공용 스레드 풀 (warm 컨테이너에서 재사용)
+_search_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hybrid-search")
+# path 문서와 동시에 가져오는 component 조회 전용 풀: 호출한 쪽이 _search_executor의 worker에서 결과를 기다려도
+# 같은 풀에 작업을 넣고 막히지 않음 (풀이 가득 차면 교착)
+_ref_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ref-resolution")
+# async 경로에서 동기 메서드를 실행하는 풀: 실행되는 메서드가 위의 풀에 검색 leg를 넣고 기다리므로 별도로 둠
+_offload_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="async-offload")
+
+
+class _NoopTracer:
+    @staticmethod
+    @contextmanager
+    def span(name: str, **attributes: Any):
+        yield
+
+    @staticmethod
+    def add(name: str, value: float = 1):
+        pass
+
+
+# 단계별 span/카운터 기록 대상 (bootstrap이 tracing 레이어 모듈로 교체)
+tracer: Any = _NoopTracer()
+
+
+def set_tracer(new_tracer: Any):
+    global tracer
+    tracer = new_tracer
+
+
+# 실패하거나 시간 초과로 빠진 검색 단계를 기록할 목록들 (track_degradation 블록마다 하나, 바깥 블록에도 함께 기록)
+_degradations: contextvars.ContextVar = contextvars.ContextVar("search_degradations", default=())
+
+
+@contextmanager
+def track_degradation() -> Iterator[List[str]]:
+    # 블록 안의 검색(worker 스레드와 async task 포함)에서 degraded 결과를 반환한 단계 이름을 모음
+    # 호출 측은 목록이 비어 있을 때만 결과를 캐시하는 식으로 사용
+    degraded: List[str] = []
+    token = _degradations.set(_degradations.get() + (degraded,))
+    try:
+        yield degraded
+    finally:
+        _degradations.reset(token)
+
+
+def _record_degraded(stage: str):
+    tracer.add("search.degraded")
+    for degraded in _degradations.get():
+        degraded.append(stage)
+
+
+def _submit_in_context(executor: ThreadPoolExecutor, fn, *args):
+    # 현재 트레이스(contextvars)가 worker 스레드에서도 보이도록 컨텍스트를 복사해 실행
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+
+async def _run_in_thread(fn, *args):
+    # async 경로에서 동기 전용 작업(예: 의존성이 없는 문서의 $ref 해석)을 이벤트 루프 밖에서 실행
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_offload_executor, contextvars.copy_context().run, fn, *args)
+
+
+RETRY_STATUSES = (429, 502, 503, 504)
+
+
+class RetryingHttpConnection(RequestsHttpConnection):
+    """Keep-alive requests connection that retries throttled/unavailable responses with backoff.
+
+    The opensearch-py transport retries immediately; this adds exponential backoff with
+    jitter for 429/502/503/504 and connection errors, which is what OpenSearch expects
+    from clients that are being throttled.
+    """
+
+    def __init__(self, *args, backoff_retries: int = 3, backoff_base: float = 0.2, backoff_max: float = 5.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.backoff_retries = backoff_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+    def perform_request(self, method, url, params=None, body=None, *args, **kwargs):
+        for attempt in range(self.backoff_retries + 1):
+            tracer.add("opensearch.round_trips")
+            tracer.add("opensearch.request_bytes", len(body) if body else 0)
+            try:
+                status, headers, data = super().perform_request(method, url, params, body, *args, **kwargs)
+                tracer.add("opensearch.response_bytes", len(data) if data else 0)
+                return status, headers, data
+            except (TransportError, OpenSearchConnectionError) as e:
+                retryable = isinstance(e, OpenSearchConnectionError) or e.status_code in RETRY_STATUSES
+                if not retryable or attempt == self.backoff_retries:
+                    raise
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                logger.warning(f"OpenSearch request failed ({e.status_code}), retrying in {delay:.2f}s")
+                time.sleep(delay)
+
+
+def create_opensearch_client(host: str, http_auth: Any, pool_maxsize: int = 16, timeout: float = 30,
+                             backoff_retries: int = 3, backoff_base: float = 0.2) -> OpenSearch:
+    # 하나의 keep-alive 커넥션 풀을 모든 retriever와 벡터 검색이 공유
+    return OpenSearch(
+        hosts=[
+            {'host': host.replace("https://", ""),
+             'port': 443
+            }
+        ],
+        http_auth=http_auth,
+        use_ssl=True,
+        verify_certs=True,
+        connection_class=RetryingHttpConnection,
+        pool_maxsize=pool_maxsize,
+        timeout=timeout,
+        # 재시도는 RetryingHttpConnection에서 backoff와 함께 처리
+        max_retries=0,
+        backoff_retries=backoff_retries,
+        backoff_base=backoff_base
+    )
+
+
+_async_connection_class = None
+
+
+def _retrying_async_connection_class() -> Any:
+    # aiohttp가 있어야 AIOHttpConnection을 import할 수 있으므로 async 클라이언트를 만들 때 정의
+    global _async_connection_class
+    if _async_connection_class is not None:
+        return _async_connection_class
+    from opensearchpy import AIOHttpConnection
+
+    class AsyncRetryingHttpConnection(AIOHttpConnection):
+        """aiohttp connection with the same backoff and tracing as RetryingHttpConnection."""
+
+        def __init__(self, *args, backoff_retries: int = 3, backoff_base: float = 0.2, backoff_max: float = 5.0, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.backoff_retries = backoff_retries
+            self.backoff_base = backoff_base
+            self.backoff_max = backoff_max
+
+        async def perform_request(self, method, url, params=None, body=None, *args, **kwargs):
+            for attempt in range(self.backoff_retries + 1):
+                tracer.add("opensearch.round_trips")
+                tracer.add("opensearch.request_bytes", len(body) if body else 0)
+                try:
+                    status, headers, data = await super().perform_request(method, url, params, body, *args, **kwargs)
+                    tracer.add("opensearch.response_bytes", len(data) if data else 0)
+                    return status, headers, data
+                except (TransportError, OpenSearchConnectionError) as e:
+                    retryable = isinstance(e, OpenSearchConnectionError) or e.status_code in RETRY_STATUSES
+                    if not retryable or attempt == self.backoff_retries:
+                        raise
+                    delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                    logger.warning(f"OpenSearch request failed ({e.status_code}), retrying in {delay:.2f}s")
+                    await asyncio.sleep(delay)
+
+    _async_connection_class = AsyncRetryingHttpConnection
+    return _async_connection_class
+
+
+def create_async_opensearch_client(host: str, http_auth: Any, pool_maxsize: int = 16, timeout: float = 30,
+                                   backoff_retries: int = 3, backoff_base: float = 0.2) -> Any:
+    # async 경로용 클라이언트: aiohttp 세션은 처음 요청한 이벤트 루프에 묶이므로 루프와 함께 재사용해야 함
+    from opensearchpy import AsyncOpenSearch
+    return AsyncOpenSearch(
+        hosts=[
+            {'host': host.replace("https://", ""),
+             'port': 443
+            }
+        ],
+        http_auth=http_auth,
+        use_ssl=True,
+        verify_certs=True,
+        connection_class=_retrying_async_connection_class(),
+        maxsize=pool_maxsize,
+        timeout=timeout,
+        max_retries=0,
+        backoff_retries=backoff_retries,
+        backoff_base=backoff_base
+    )
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def content_hash(value: Any) -> str:
+    # 키 순서와 공백에 영향받지 않는 내용 해시 (증분 ingest에서 변경 여부 판단)
+    if not isinstance(value, str):
+        value = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+COMPONENT_TYPES = ["schemas", "responses", "parameters", "examples", "requestBodies", "headers", "securitySchemes", "links", "callbacks"]
+
+
+def component_doc_id(ref: str) -> Optional[str]:
+    # "#/components/schemas/Pet" -> "schemas_Pet" (bulk_write_components의 문서 id)
+    parts = ref.split('/')
+    if len(parts) != 4 or parts[0] != '#' or parts[1] != 'components':
+        return None
+    return f"{parts[2]}_{parts[3]}"
+
+
+def _iter_refs_in_order(obj: Any) -> Iterator[str]:
+    # 문서 순서(깊이 우선)로 $ref 값을 반환
+    stack = [iter(obj.items()) if isinstance(obj, dict) else iter(enumerate(obj)) if isinstance(obj, list) else iter(())]
+    while stack:
+        try:
+            key, value = next(stack[-1])
+        except StopIteration:
+            stack.pop()
+            continue
+        if key == "$ref" and isinstance(value, str):
+            yield value
+        elif isinstance(value, dict):
+            stack.append(iter(value.items()))
+        elif isinstance(value, list):
+            stack.append(iter(enumerate(value)))
+
+
+def referenced_names(value: Any) -> List[str]:
+    # "#/components/schemas/Pet" -> "Pet" (임베딩용 요약 텍스트에 사용)
+    return list(dict.fromkeys(ref.rsplit('/', 1)[-1] for ref in _iter_refs_in_order(value)))
+
+
+def _direct_refs(value: Any) -> List[str]:
+    refs = (component_doc_id(ref) for ref in _iter_refs_in_order(value))
+    return [ref_id for ref_id in dict.fromkeys(refs) if ref_id]
+
+
+class ComponentDependencyGraph:
+    """Collects direct $ref edges item by item, so dependencies can be computed while streaming a spec.
+
+    Only component ids are kept, never the items themselves.
+    """
+
+    def __init__(self):
+        self.direct = {}
+        self.path_refs = {}
+
+    def add_component(self, component_type: str, key: str, value: Any):
+        if component_type in COMPONENT_TYPES:
+            self.direct[f"{component_type}_{key}"] = _direct_refs(value)
+
+    def add_path(self, path: str, item: Any):
+        self.path_refs[path] = _direct_refs(item)
+
+    def resolve(self) -> Dict[str, Dict[str, List[str]]]:
+        return _resolve_dependencies(self.direct, self.path_refs)
+
+
+def compute_component_dependencies(spec: Dict) -> Dict[str, Dict[str, List[str]]]:
+    """Return the transitive component dependencies of every path and component.
+
+    Dependencies are component document ids in first-visit order, matching the order
+    resolve_component_refs would discover them. Cycles are detected and cut.
+    """
+    graph = ComponentDependencyGraph()
+    components = spec.get("components", {})
+    for component_type in COMPONENT_TYPES:
+        for key, value in components.get(component_type, {}).items():
+            graph.add_component(component_type, key, value)
+    for path, item in spec.get("paths", {}).items():
+        graph.add_path(path, item)
+    return graph.resolve()
+
+
+def _resolve_dependencies(direct: Dict[str, List[str]], path_refs: Dict[str, List[str]]) -> Dict[str, Dict[str, List[str]]]:
+    cyclic = set()
+
+    def closure(roots: List[str], origin: Optional[str] = None) -> List[str]:
+        seen = {}
+        stack = [iter(roots)]
+        while stack:
+            try:
+                ref_id = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            if ref_id == origin:
+                cyclic.add(origin)
+            if ref_id in seen or ref_id == origin:
+                continue
+            seen[ref_id] = True
+            stack.append(iter(direct.get(ref_id, [])))
+        return list(seen)
+
+    component_deps = {doc_id: closure(refs, doc_id) for doc_id, refs in direct.items()}
+    path_deps = {path: closure(refs) for path, refs in path_refs.items()}
+
+    if cyclic:
+        logger.info(f"Detected reference cycles through {len(cyclic)} components: {sorted(cyclic)[:20]}")
+    return {"paths": path_deps, "components": component_deps}
+
+
+FUSION_STRATEGIES = ("rrf", "min_max", "z_score", "weighted_sum")
+
+
+def _normalize_scores(scores: List[float], technique: str) -> List[float]:
+    if technique == "min_max":
+        low, high = min(scores), max(scores)
+        if high == low:
+            return [1.0] * len(scores)
+        return [(score - low) / (high - low) for score in scores]
+    if technique == "z_score":
+        mean = sum(scores) / len(scores)
+        std = (sum((score - mean) ** 2 for score in scores) / len(scores)) ** 0.5
+        if std == 0:
+            return [0.0] * len(scores)
+        return [(score - mean) / std for score in scores]
+    return list(scores)
+
+
+def fuse_rankings(rankings: List[List[Tuple[str, float]]], weights: List[float], strategy: str = "rrf", rrf_k: int = 60) -> Dict[str, float]:
+    """Combines ranked ``(doc_id, score)`` lists from several search legs into one score per document.
+
+    ``rrf`` uses only ranks (``weight / (rrf_k + rank)``); ``min_max`` and ``z_score`` normalize
+    each leg's scores before the weighted sum; ``weighted_sum`` adds the raw scores.
+    """
+    if strategy not in FUSION_STRATEGIES:
+        raise ValueError(f"Unknown fusion strategy: {strategy}")
+    fused = {}
+    for ranking, weight in zip(rankings, weights):
+        if not ranking:
+            continue
+        if strategy == "rrf":
+            scores = [1.0 / (rrf_k + rank) for rank in range(1, len(ranking) + 1)]
+        else:
+            scores = _normalize_scores([score for _, score in ranking], strategy)
+        seen = set()
+        for (doc_id, _), score in zip(ranking, scores):
+            # 같은 leg에 같은 문서가 여러 번 있으면 가장 높은 순위만 반영
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            fused[doc_id] = fused.get(doc_id, 0.0) + weight * score
+    return fused
+
+
 class OpenSearchRetriever(BaseRetriever):
     client: OpenSearch
+    # 설정 시 a* 메서드(_aget_relevant_documents 등)가 이 AsyncOpenSearch 클라이언트로 요청 (없으면 스레드에서 동기 메서드 실행)
+    async_client: Optional[Any] = Field(default=None)
     embedding_function: Any
     alpha: float = Field(default=0.5)
     k: int = Field(default=10)
@@ -20,6 +396,35 @@ class OpenSearchRetriever(BaseRetriever):
     text_field: str = Field(default="text")
     vector_field: str = Field(default="vector")
     metadata_field: str = Field(default="metadata")
+    # bulk ingestion
+    embedding_batch_size: int = Field(default=32)
+    embedding_concurrency: int = Field(default=4)
+    bulk_chunk_size: int = Field(default=500)
+    bulk_chunk_bytes: int = Field(default=5 * 1024 * 1024)
+    bulk_max_retries: int = Field(default=2)
+    max_reported_errors: int = Field(default=100)
+    # hybrid retrieval
+    parallel_search: bool = Field(default=True)
+    keyword_timeout: float = Field(default=5.0)
+    vector_timeout: float = Field(default=10.0)
+    request_timeout: float = Field(default=30.0)
+    # 설정 시 hybrid 쿼리 + search pipeline으로 한 번의 요청에서 서버측 점수 정규화
+    hybrid_search_pipeline: Optional[str] = Field(default=None)
+    # Python 결합 방식: rrf | min_max | z_score | weighted_sum (keyword에 alpha, vector에 1 - alpha 가중치)
+    fusion: str = Field(default="rrf")
+    rrf_k: int = Field(default=60)
+    _hybrid_unavailable: bool = PrivateAttr(default=False)
+    # parent 문서 캐시 (0이면 비활성), index_generation이 바뀌면 이전 항목은 사용되지 않음
+    parent_cache_size: int = Field(default=0)
+    index_generation: str = Field(default="")
+    _parent_cache: Optional[LRUCache] = PrivateAttr(default=None)
+    # $ref 해석용 컴포넌트 캐시 (0이면 비활성), warm 컨테이너의 호출 간에 유지
+    component_cache_size: int = Field(default=0)
+    # 미리 계산된 dependencies를 조회할 컴포넌트 인덱스 (없으면 index_name)
+    components_index_name: Optional[str] = Field(default=None)
+    _component_cache: Optional[LRUCache] = PrivateAttr(default=None)
+    # 이 metadata.type의 문서는 벡터 없이 저장되고 검색 대상에서 제외됨 (스펙 공통 헤더, 분할된 청크의 parent)
+    context_only_types: List[str] = Field(default_factory=lambda: ["spec", "parent"])
         # index_paths_name: str = Field(default="paths")
         # index_vector_paths_name: str = Field(default="vectors_paths")
         # index_components_name: str = Field(default="components")
@@ -39,6 +444,13 @@ class OpenSearchRetriever(BaseRetriever):
         self.text_field = data.get("text_field","text")
         self.vector_field = data.get("vector_field","vector")
         self.metadata_field = data.get("metadata_field","metadata")           # self.vector_paths_db = data.get("vector_paths_db")
+        if self.fusion not in FUSION_STRATEGIES:
+            raise ValueError(f"Unknown fusion strategy: {self.fusion}")
+        self._parent_cache = LRUCache(self.parent_cache_size)
+        self._component_cache = LRUCache(self.component_cache_size)
+        if self.vector_search is not None and self.client is not None:
+            # 벡터 검색도 같은 클라이언트(커넥션 풀)를 사용하도록 공유
+            self.vector_search.client = self.client
         
         # self.vector_components_db = data.get("vector_components_db")
         # self.index_paths_name = data.get("index_paths_name", "paths")
@@ -49,103 +461,533 @@ class OpenSearchRetriever(BaseRetriever):
         
     def _get_relevant_documents(self, query: str) -> List[Document]:
         try:
-            keyword_query = {
-                "query": {
-                    "match": {
-                        self.text_field: query
-                    }
+            if self.hybrid_search_pipeline and not self._hybrid_unavailable:
+                hybrid_docs = self._hybrid_search(query)
+                if hybrid_docs is not None:
+                    return self._add_parent_documents(hybrid_docs)
+
+            if self.parallel_search:
+                keyword_results, vector_results = self._search_concurrently(query)
+            else:
+                keyword_results = self._run_search_leg("keyword", self._keyword_search, query)
+                vector_results = self._run_search_leg("vector", self._vector_search, query)
+
+            with tracer.span("fusion", index=self.index_name, fusion=self.fusion):
+                combined_docs = self._combine_and_rerank(keyword_results, vector_results)
+            return self._add_parent_documents(combined_docs)
+        except Exception as e:
+            logger.error(f"Error in _get_relevant_documents: {e}")
+            _record_degraded("retrieval")
+            return []
+
+    async def _aget_relevant_documents(self, query: str) -> List[Document]:
+        # _get_relevant_documents와 같은 결과를 async_client로: keyword/vector 검색과 임베딩을 같은 이벤트 루프에서 동시에 실행
+        if self.async_client is None:
+            return await _run_in_thread(self._get_relevant_documents, query)
+        try:
+            if self.hybrid_search_pipeline and not self._hybrid_unavailable:
+                hybrid_docs = await self._ahybrid_search(query)
+                if hybrid_docs is not None:
+                    return await self._aadd_parent_documents(hybrid_docs)
+
+            keyword_results, vector_results = await asyncio.gather(
+                self._await_search_leg("keyword", self._akeyword_search(query), self.keyword_timeout),
+                self._await_search_leg("vector", self._avector_search(query), self.vector_timeout)
+            )
+
+            with tracer.span("fusion", index=self.index_name, fusion=self.fusion):
+                combined_docs = self._combine_and_rerank(keyword_results, vector_results)
+            return await self._aadd_parent_documents(combined_docs)
+        except Exception as e:
+            logger.error(f"Error in _aget_relevant_documents: {e}")
+            _record_degraded("retrieval")
+            return []
+
+    def _hybrid_query(self, query: str, vector: List[float]) -> Dict:
+        return {
+            "size": self.k,
+            "_source": {"excludes": [self.vector_field]},
+            "query": {
+                "hybrid": {
+                    "queries": [
+                        self._text_query(query),
+                        {"knn": {self.vector_field: {"vector": vector, "k": self.k}}}
+                    ]
                 }
             }
-            print("keyword query")
-            keyword_results = self.client.search(
+        }
+
+    def _hybrid_search(self, query: str) -> Optional[List[Document]]:
+        # None을 반환하면 기존 Python 결합(_combine_and_rerank)으로 fallback
+        try:
+            with tracer.span("embedding", index=self.index_name):
+                vector = self.embedding_function.embed_query(query)
+            with tracer.span("hybrid_query", index=self.index_name):
+                response = self.client.search(
+                    index=self.index_name,
+                    body=self._hybrid_query(query, vector),
+                    params={"search_pipeline": self.hybrid_search_pipeline},
+                    request_timeout=self.vector_timeout
+                )
+        except (RequestError, NotFoundError) as e:
+            return self._disable_hybrid(e)
+        except Exception as e:
+            logger.error(f"Hybrid query failed, falling back to client-side fusion: {e}")
+            return None
+        return self._hybrid_documents(response)
+
+    async def _ahybrid_search(self, query: str) -> Optional[List[Document]]:
+        try:
+            with tracer.span("embedding", index=self.index_name):
+                vector = await self.embedding_function.aembed_query(query)
+            with tracer.span("hybrid_query", index=self.index_name):
+                response = await self.async_client.search(
+                    index=self.index_name,
+                    body=self._hybrid_query(query, vector),
+                    params={"search_pipeline": self.hybrid_search_pipeline},
+                    request_timeout=self.vector_timeout
+                )
+        except (RequestError, NotFoundError) as e:
+            return self._disable_hybrid(e)
+        except Exception as e:
+            logger.error(f"Hybrid query failed, falling back to client-side fusion: {e}")
+            return None
+        return self._hybrid_documents(response)
+
+    def _disable_hybrid(self, error: Exception) -> None:
+        # neural-search 플러그인/파이프라인이 없는 클러스터: 이후 요청은 바로 fallback
+        logger.warning(f"Hybrid query unavailable on '{self.index_name}', falling back to client-side fusion: {error}")
+        self._hybrid_unavailable = True
+        return None
+
+    def _hybrid_documents(self, response: Dict) -> List[Document]:
+        return [
+            Document(
+                page_content=hit['_source'][self.text_field],
+                metadata={**hit['_source'].get(self.metadata_field, {}), 'score': hit['_score']}
+            )
+            for hit in response['hits']['hits']
+        ]
+
+    def _search_concurrently(self, query: str):
+        # 두 검색을 동시에 실행해서 지연시간을 합이 아닌 max(keyword, vector)로 줄임
+        started = time.monotonic()
+        keyword_future = _submit_in_context(_search_executor, self._keyword_search, query)
+        vector_future = _submit_in_context(_search_executor, self._vector_search, query)
+        keyword_results = self._wait_search_leg("keyword", keyword_future, started, self.keyword_timeout)
+        vector_results = self._wait_search_leg("vector", vector_future, started, self.vector_timeout)
+        return keyword_results, vector_results
+
+    def _wait_search_leg(self, name: str, future, started: float, timeout: float):
+        try:
+            return future.result(timeout=max(0.0, started + timeout - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            logger.warning(f"{name} search timed out after {timeout}s, returning degraded results")
+            _record_degraded(name)
+        except Exception as e:
+            logger.error(f"{name} search failed, returning degraded results: {e}")
+            _record_degraded(name)
+        return self._empty_search_leg(name)
+
+    def _run_search_leg(self, name: str, search, query: str):
+        try:
+            return search(query)
+        except Exception as e:
+            logger.error(f"{name} search failed, returning degraded results: {e}")
+            _record_degraded(name)
+            return self._empty_search_leg(name)
+
+    async def _await_search_leg(self, name: str, search, timeout: float):
+        try:
+            return await asyncio.wait_for(search, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"{name} search timed out after {timeout}s, returning degraded results")
+            _record_degraded(name)
+        except Exception as e:
+            logger.error(f"{name} search failed, returning degraded results: {e}")
+            _record_degraded(name)
+        return self._empty_search_leg(name)
+
+    @staticmethod
+    def _empty_search_leg(name: str):
+        return {'hits': {'hits': []}} if name == "keyword" else []
+
+    def _text_query(self, query: str) -> Dict:
+        match = {"match": {self.text_field: query}}
+        if not self.context_only_types:
+            return match
+        return {
+            "bool": {
+                "must": [match],
+                "must_not": [{"terms": {f"{self.metadata_field}.type": self.context_only_types}}]
+            }
+        }
+
+    def _keyword_search(self, query: str) -> Dict:
+        keyword_query = {
+            "query": self._text_query(query)
+        }
+        with tracer.span("bm25", index=self.index_name):
+            return self.client.search(
                 index=self.index_name,
                 body=keyword_query,
-                size=self.k
+                size=self.k,
+                request_timeout=self.keyword_timeout
             )
-            print("vector query1")
-            # 벡터 검색 부분 수정
-            
-            
-            vector_results = self.vector_search.similarity_search(query=query, k=self.k)
-            print("vector query2")
-            combined_docs = self._combine_and_rerank(keyword_results, vector_results) 
-            print("vector query3")
 
-            return self._add_parent_documents(combined_docs)
-            print("vector query2")
-    
-        except Exception as e:
-            logger.error(f"Error in _get_relevant_documents: {e}")
+    async def _akeyword_search(self, query: str) -> Dict:
+        with tracer.span("bm25", index=self.index_name):
+            return await self.async_client.search(
+                index=self.index_name,
+                body={"query": self._text_query(query)},
+                size=self.k,
+                request_timeout=self.keyword_timeout
+            )
+
+    def _vector_search(self, query: str) -> List[Tuple[Document, float]]:
+        if self.vector_search is None:
+            return []
+        with tracer.span("embedding", index=self.index_name):
+            vector = self.vector_search.embedding_function.embed_query(query)
+        # 점수 기반 결합(min_max, z_score, weighted_sum)을 위해 점수도 함께 받음
+        with tracer.span("knn", index=self.index_name):
+            return self.vector_search.similarity_search_with_score_by_vector(vector, k=self.k)
+
+    async def _avector_search(self, query: str) -> List[Tuple[Document, float]]:
+        # OpenSearchVectorSearch에는 async 클라이언트가 없으므로 같은 approximate knn 쿼리를 직접 보냄
+        if self.vector_search is None:
             return []
+        with tracer.span("embedding", index=self.index_name):
+            vector = await self.vector_search.embedding_function.aembed_query(query)
+        knn_query = {
+            "size": self.k,
+            "_source": {"excludes": [self.vector_field]},
+            "query": {"knn": {self.vector_field: {"vector": vector, "k": self.k}}}
+        }
+        with tracer.span("knn", index=self.index_name):
+            response = await self.async_client.search(index=self.vector_search.index_name, body=knn_query, request_timeout=self.vector_timeout)
+        return [
+            (Document(page_content=hit['_source'][self.text_field], metadata=hit['_source'].get(self.metadata_field, {})), hit['_score'])
+            for hit in response['hits']['hits']
+        ]
+
+    @staticmethod
+    def _doc_key(text: str, metadata: Dict) -> str:
+        # 두 검색 결과를 같은 문서로 합치기 위한 키: metadata.id(=_id), 없으면 본문 해시
+        return metadata.get('id') or content_hash(text)
 
-    def _combine_and_rerank(self, keyword_results: Dict, vector_results: List[Document]) -> List[Document]:
-        doc_scores = {}
+    def _combine_and_rerank(self, keyword_results: Dict, vector_results: List[Tuple[Document, float]], fusion: Optional[str] = None) -> List[Document]:
+        docs = {}
+        keyword_ranking = []
         for hit in keyword_results['hits']['hits']:
-            doc_id = hit['_id']
-            score = hit['_score'] * self.alpha
-            doc_scores[doc_id] = {'score': score, 'doc': hit['_source']}
-        
-        for i, doc in enumerate(vector_results):
-            doc_id = doc.metadata.get('id', f"vector_{i}")
-            score = (1 - self.alpha) * (1 / (i + 1))
-            if doc_id in doc_scores:
-                doc_scores[doc_id]['score'] += score
-            else:
-                doc_scores[doc_id] = {'score': score, 'doc': {self.text_field: doc.page_content, self.metadata_field: doc.metadata}}
-        
-        sorted_docs = sorted(doc_scores.items(), key=lambda x: x[1]['score'], reverse=True)
-        return [Document(page_content=item[1]['doc'][self.text_field], metadata=item[1]['doc'].get(self.metadata_field, {})) for item in sorted_docs[:self.k]]
+            text = hit['_source'][self.text_field]
+            metadata = hit['_source'].get(self.metadata_field, {})
+            doc_id = self._doc_key(text, metadata)
+            docs.setdefault(doc_id, (text, metadata))
+            keyword_ranking.append((doc_id, hit['_score']))
+
+        vector_ranking = []
+        for doc, score in vector_results:
+            doc_id = self._doc_key(doc.page_content, doc.metadata)
+            docs.setdefault(doc_id, (doc.page_content, doc.metadata))
+            vector_ranking.append((doc_id, score))
+
+        fused = fuse_rankings([keyword_ranking, vector_ranking], [self.alpha, 1 - self.alpha], fusion or self.fusion, self.rrf_k)
+        ranked = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:self.k]
+        return [
+            Document(page_content=docs[doc_id][0], metadata={**docs[doc_id][1], 'score': score})
+            for doc_id, score in ranked
+        ]
 
     def _add_parent_documents(self, docs: List[Document]) -> List[Document]:
+        # 여러 자식이 같은 parent를 공유하는 경우가 많으므로 중복 제거 후 한 번의 _mget으로 조회
+        parent_ids = self._parent_ids(docs)
+        if not parent_ids:
+            return docs
+        with tracer.span("parent_fetch", index=self.index_name, parents=len(parent_ids)):
+            parents = self._get_parent_documents(parent_ids)
+        return self._merge_parent_documents(docs, parents)
+
+    async def _aadd_parent_documents(self, docs: List[Document]) -> List[Document]:
+        parent_ids = self._parent_ids(docs)
+        if not parent_ids:
+            return docs
+        with tracer.span("parent_fetch", index=self.index_name, parents=len(parent_ids)):
+            parents = self._as_parent_documents(await self.aget_documents_by_ids(parent_ids))
+        return self._merge_parent_documents(docs, parents)
+
+    @staticmethod
+    def _parent_ids(docs: List[Document]) -> List[str]:
+        return list(dict.fromkeys(doc.metadata.get('parent_id') for doc in docs if doc.metadata.get('parent_id')))
+
+    @staticmethod
+    def _merge_parent_documents(docs: List[Document], parents: Dict[str, Document]) -> List[Document]:
         result = []
+        added_parents = set()
         for doc in docs:
             result.append(doc)
             parent_id = doc.metadata.get('parent_id')
-            if parent_id:
-                parent_doc = self._get_parent_document(parent_id)
-                if parent_doc:
-                    result.append(parent_doc)
+            if parent_id in parents and parent_id not in added_parents:
+                result.append(parents[parent_id])
+                added_parents.add(parent_id)
         return result
 
     def _get_parent_document(self, parent_id: str) -> Optional[Document]:
+        return self._get_parent_documents([parent_id]).get(parent_id)
+
+    def _get_parent_documents(self, parent_ids: List[str]) -> Dict[str, Document]:
+        return self._as_parent_documents(self.get_documents_by_ids(parent_ids))
+
+    @staticmethod
+    def _as_parent_documents(documents: Dict[str, Document]) -> Dict[str, Document]:
+        return {
+            doc_id: Document(page_content=doc.page_content, metadata={**doc.metadata, 'is_parent': True})
+            for doc_id, doc in documents.items()
+        }
+
+    def get_documents_by_ids(self, doc_ids: List[str]) -> Dict[str, Document]:
+        # parent/스펙 헤더 문서 조회: 캐시에 없는 것만 한 번의 _mget으로 가져옴
+        documents, missing = self._cached_documents(doc_ids)
+        if not missing:
+            return documents
+
         try:
-            response = self.client.get(index=self.index_name, id=parent_id)
-            source = response['_source']
-            return Document(
-                page_content=source[self.text_field],
-                metadata={**source.get(self.metadata_field, {}), 'is_parent': True}
-            )
-        except NotFoundError:
-            logger.warning(f"Parent document with id {parent_id} not found")
-            return None
+            response = self.client.mget(index=self.index_name, body={"ids": missing}, request_timeout=self.request_timeout)
         except Exception as e:
-            logger.error(f"Error retrieving parent document: {e}")
-            return None
+            logger.error(f"Error retrieving documents by id: {e}")
+            _record_degraded("documents_by_id")
+            return documents
+        return self._store_documents(response, documents)
+
+    async def aget_documents_by_ids(self, doc_ids: List[str]) -> Dict[str, Document]:
+        if self.async_client is None:
+            return await _run_in_thread(self.get_documents_by_ids, doc_ids)
+        documents, missing = self._cached_documents(doc_ids)
+        if not missing:
+            return documents
 
-    def add_documents(self, documents: List[Document], parent_documents: Optional[Dict[str, Document]] = None):
         try:
-            for doc in documents:
-                vector = self.embedding_function.embed_query(doc.page_content)
-                body = {
-                    self.text_field: doc.page_content,
-                    self.vector_field: vector,
-                    self.metadata_field: doc.metadata
-                }
-                
-                if parent_documents and doc.metadata.get('id') in parent_documents:
-                    parent_doc = parent_documents[doc.metadata['id']]
-                    body['parent'] = {
-                        'id': parent_doc.metadata.get('id'),
-                        self.text_field: parent_doc.page_content,
-                        self.metadata_field: parent_doc.metadata
-                    }
-                    body[self.metadata_field]['parent_id'] = parent_doc.metadata.get('id')
-                
-                self.client.index(index=self.index_name, body=body, id=doc.metadata.get('id'))
-            
-            self.client.indices.refresh(index=self.index_name)
+            response = await self.async_client.mget(index=self.index_name, body={"ids": missing}, request_timeout=self.request_timeout)
+        except Exception as e:
+            logger.error(f"Error retrieving documents by id: {e}")
+            _record_degraded("documents_by_id")
+            return documents
+        return self._store_documents(response, documents)
+
+    def _cached_documents(self, doc_ids: List[str]) -> Tuple[Dict[str, Document], List[str]]:
+        documents = {}
+        missing = []
+        for doc_id in doc_ids:
+            cached = self._parent_cache.get((self.index_generation, doc_id))
+            if cached is not None:
+                documents[doc_id] = cached
+            else:
+                missing.append(doc_id)
+        return documents, missing
+
+    def _store_documents(self, response: Dict, documents: Dict[str, Document]) -> Dict[str, Document]:
+        for item in response['docs']:
+            if not item.get('found'):
+                logger.warning(f"Document with id {item.get('_id')} not found")
+                continue
+            source = item['_source']
+            doc = Document(page_content=source[self.text_field], metadata=source.get(self.metadata_field, {}))
+            documents[item['_id']] = doc
+            self._parent_cache.put((self.index_generation, item['_id']), doc)
+        return documents
+
+    def add_documents(self, documents: Iterable[Document], parent_documents: Optional[Dict[str, Document]] = None, refresh: Union[bool, str] = True, source: Optional[str] = None) -> Dict[str, Any]:
+        # source가 주어지면 증분 모드: 해시가 같은 문서는 임베딩/색인을 건너뛰고, 스펙에서 사라진 문서는 삭제
+        summary = self._new_bulk_summary()
+        try:
+            if source is None:
+                actions = self._document_actions(documents, parent_documents, summary)
+            else:
+                existing = self._existing_hashes(source, f"{self.metadata_field}.source", f"{self.metadata_field}.content_hash")
+                seen = set()
+                changed = self._changed_documents(documents, parent_documents, source, existing, seen, summary)
+                actions = itertools.chain(
+                    self._document_actions(changed, parent_documents, summary),
+                    self._delete_actions(existing, seen)
+                )
+            self._bulk_write(actions, summary=summary, refresh=refresh)
         except Exception as e:
             logger.error(f"Error adding documents: {e}")
+            self._record_bulk_error(summary, None, str(e))
+        logger.info(f"add_documents to '{self.index_name}': {summary['indexed']} indexed, {summary['deleted']} deleted, "
+                    f"{summary['unchanged']} unchanged, {summary['failed']} failed")
+        return summary
+
+    def _document_actions(self, documents: Iterable[Document], parent_documents: Optional[Dict[str, Document]], summary: Dict[str, Any]) -> Iterator[Dict]:
+        # 임베딩을 배치 단위로 계산하고 _bulk 액션을 스트리밍으로 생성
+        with ThreadPoolExecutor(max_workers=max(1, self.embedding_concurrency)) as executor:
+            for batch in self._iter_batches(documents, self.embedding_batch_size):
+                # context_only 문서는 임베딩하지 않음, 나머지는 metadata.embedding_text가 있으면 그것을 임베딩
+                to_embed = [doc for doc in batch if doc.metadata.get('type') not in self.context_only_types]
+                texts = [doc.metadata.get('embedding_text') or doc.page_content for doc in to_embed]
+                vectors = dict(zip(map(id, to_embed), self._embed_texts(texts, executor) if texts else []))
+                for doc in batch:
+                    body = {
+                        self.text_field: doc.page_content,
+                        self.metadata_field: doc.metadata
+                    }
+                    if id(doc) in vectors:
+                        if vectors[id(doc)] is None:
+                            self._record_bulk_error(summary, doc.metadata.get('id'), "embedding failed")
+                            continue
+                        body[self.vector_field] = vectors[id(doc)]
+
+                    if parent_documents and doc.metadata.get('id') in parent_documents:
+                        parent_doc = parent_documents[doc.metadata['id']]
+                        body['parent'] = {
+                            'id': parent_doc.metadata.get('id'),
+                            self.text_field: parent_doc.page_content,
+                            self.metadata_field: parent_doc.metadata
+                        }
+                        body[self.metadata_field]['parent_id'] = parent_doc.metadata.get('id')
+
+                    action = {"_index": self.index_name, "_source": body}
+                    if doc.metadata.get('id'):
+                        action["_id"] = doc.metadata['id']
+                    yield action
+
+    def _changed_documents(self, documents: Iterable[Document], parent_documents: Optional[Dict[str, Document]], source: str,
+                           existing: Dict[str, str], seen: set, summary: Dict[str, Any]) -> Iterator[Document]:
+        for doc in documents:
+            parent_doc = (parent_documents or {}).get(doc.metadata.get('id'))
+            doc_hash = content_hash({
+                "text": doc.page_content,
+                "metadata": {k: v for k, v in doc.metadata.items() if k not in ("id", "source", "content_hash")},
+                "parent": parent_doc.page_content if parent_doc else None,
+            })
+            # id가 없으면 내용 해시를 id로 사용해 재업로드 시에도 같은 문서로 취급
+            doc.metadata.setdefault('id', doc_hash)
+            doc.metadata['source'] = source
+            doc.metadata['content_hash'] = doc_hash
+            seen.add(doc.metadata['id'])
+            if existing.get(doc.metadata['id']) == doc_hash:
+                summary["unchanged"] += 1
+                continue
+            yield doc
+
+    def _incremental_actions(self, actions: Iterable[Dict], source: Optional[str], summary: Dict[str, Any]) -> Iterator[Dict]:
+        # 키워드 인덱스용: _source의 해시를 기존 값과 비교해 바뀐 문서만 쓰고, 사라진 문서는 삭제
+        if source is None:
+            yield from actions
+            return
+        existing = self._existing_hashes(source, "source", "content_hash")
+        seen = set()
+        for action in actions:
+            doc = action["_source"]
+            doc["content_hash"] = content_hash(doc)
+            doc["source"] = source
+            seen.add(action["_id"])
+            if existing.get(action["_id"]) == doc["content_hash"]:
+                summary["unchanged"] += 1
+                continue
+            yield action
+        yield from self._delete_actions(existing, seen)
+
+    def _existing_hashes(self, source: str, source_field: str, hash_field: str) -> Dict[str, str]:
+        def get_hash(hit_source: Dict) -> Optional[str]:
+            for part in hash_field.split('.'):
+                hit_source = hit_source.get(part, {}) if isinstance(hit_source, dict) else {}
+            return hit_source or None
+
+        try:
+            return {
+                hit['_id']: get_hash(hit.get('_source', {}))
+                for hit in helpers.scan(
+                    self.client,
+                    index=self.index_name,
+                    query={"query": {"term": {source_field: source}}, "_source": [hash_field]},
+                    size=1000,
+                    request_timeout=self.request_timeout
+                )
+            }
+        except NotFoundError:
+            return {}
+        except Exception as e:
+            # 기존 해시를 알 수 없으면 전체를 다시 쓰고 삭제는 하지 않음
+            logger.error(f"Error reading content hashes from '{self.index_name}': {e}")
+            return {}
+
+    def _delete_actions(self, existing: Dict[str, str], seen: set) -> Iterator[Dict]:
+        for doc_id in existing:
+            if doc_id not in seen:
+                yield {"_op_type": "delete", "_index": self.index_name, "_id": doc_id}
+
+    def _embed_texts(self, texts: List[str], executor: ThreadPoolExecutor) -> List[Optional[List[float]]]:
+        def embed(text: str) -> Optional[List[float]]:
+            try:
+                return self.embedding_function.embed_query(text)
+            except Exception as e:
+                logger.error(f"Error embedding document: {e}")
+                return None
+
+        if self.embedding_concurrency > 1:
+            return list(executor.map(embed, texts))
+        try:
+            return self.embedding_function.embed_documents(texts)
+        except Exception as e:
+            logger.warning(f"Batch embedding failed, retrying per document: {e}")
+            return [embed(text) for text in texts]
+
+    @staticmethod
+    def _iter_batches(items: Iterable, size: int) -> Iterator[List]:
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _new_bulk_summary(self) -> Dict[str, Any]:
+        return {"indexed": 0, "created": 0, "updated": 0, "deleted": 0, "unchanged": 0, "failed": 0, "errors": []}
+
+    @staticmethod
+    def _format_bulk_summary(summary: Dict[str, Any]) -> str:
+        return (f"{summary['created']} created, {summary['updated']} updated, {summary['deleted']} deleted, "
+                f"{summary['unchanged']} unchanged, {summary['failed']} failed")
+
+    def _record_bulk_error(self, summary: Dict[str, Any], doc_id: Optional[str], error: Any):
+        summary["failed"] += 1
+        if len(summary["errors"]) < self.max_reported_errors:
+            summary["errors"].append({"id": doc_id, "error": error})
+
+    def _bulk_write(self, actions: Iterable[Dict], summary: Optional[Dict[str, Any]] = None, refresh: Union[bool, str] = True) -> Dict[str, Any]:
+        # _bulk API로 크기 제한된 청크 단위 전송
+        # refresh=True: 마지막에 한 번만 refresh, refresh="wait_for": 청크마다 다음 주기 refresh까지 대기
+        if summary is None:
+            summary = self._new_bulk_summary()
+        bulk_kwargs = {"refresh": "wait_for"} if refresh == "wait_for" else {}
+        for ok, item in helpers.streaming_bulk(
+            self.client,
+            actions,
+            chunk_size=self.bulk_chunk_size,
+            max_chunk_bytes=self.bulk_chunk_bytes,
+            max_retries=self.bulk_max_retries,
+            raise_on_error=False,
+            raise_on_exception=False,
+            **bulk_kwargs
+        ):
+            result = next(iter(item.values()))
+            if ok:
+                if result.get('result') == "deleted":
+                    summary["deleted"] += 1
+                    continue
+                summary["indexed"] += 1
+                if result.get('result') in ("created", "updated"):
+                    summary[result['result']] += 1
+            else:
+                self._record_bulk_error(summary, result.get('_id'), result.get('error', result.get('status')))
+                logger.warning(f"Bulk item failed: {result.get('_id')} {result.get('error')}")
+        if refresh is True:
+            self.client.indices.refresh(index=self.index_name)
+        return summary
 
     def create_index(self, index_name: str, index_mapping: Dict):
         try:
@@ -157,6 +999,52 @@ class OpenSearchRetriever(BaseRetriever):
         except Exception as e:
             logger.error(f"Error creating index: {e}")
 
+    def get_index_version(self) -> str:
+        try:
+            mapping = self.client.indices.get_mapping(index=self.index_name)
+            return mapping[self.index_name]['mappings'].get('_meta', {}).get('spec_version', "")
+        except Exception as e:
+            logger.error(f"Error reading index version: {e}")
+            return ""
+
+    def bump_index_version(self) -> Optional[str]:
+        # 새 스펙이 ingest되면 인덱스 매핑의 _meta.spec_version을 갱신해 캐시를 무효화
+        version = str(time.time_ns())
+        try:
+            self.client.indices.put_mapping(index=self.index_name, body={"_meta": {"spec_version": version}})
+            self.index_generation = version
+            logger.info(f"Index '{self.index_name}' version set to {version}")
+            return version
+        except Exception as e:
+            logger.error(f"Error updating index version: {e}")
+            return None
+
+    def create_hybrid_search_pipeline(self, pipeline_name: str, weights: Optional[List[float]] = None):
+        # hybrid 쿼리의 [match, knn] 점수를 min-max 정규화 후 가중 평균으로 결합
+        if weights is None:
+            weights = [self.alpha, 1 - self.alpha]
+        pipeline = {
+            "description": "Hybrid search score normalization for OpenAPI retrieval",
+            "phase_results_processors": [
+                {
+                    "normalization-processor": {
+                        "normalization": {"technique": "min_max"},
+                        "combination": {
+                            "technique": "arithmetic_mean",
+                            "parameters": {"weights": weights}
+                        }
+                    }
+                }
+            ]
+        }
+        try:
+            response = self.client.transport.perform_request("PUT", f"/_search/pipeline/{pipeline_name}", body=pipeline)
+            logger.info(f"Search pipeline '{pipeline_name}' created successfully.")
+            return response
+        except Exception as e:
+            logger.error(f"Error creating search pipeline: {e}")
+            return None
+
     def search_by_key(self, key: str) -> List[Dict]:
         try:
             query = {
@@ -167,7 +1055,7 @@ class OpenSearchRetriever(BaseRetriever):
                 },
                 "size": 100
             }
-            response = self.client.search(body=query, index=self.index_name)
+            response = self.client.search(body=query, index=self.index_name, request_timeout=self.request_timeout)
         
             hits = response['hits']['hits']
             if hits:
@@ -179,19 +1067,31 @@ class OpenSearchRetriever(BaseRetriever):
             logger.error(f"Error searching by key: {e}")
             return []
     
-    def bulk_write_paths(self, documents: Dict):
+    def bulk_write_paths(self, documents: Dict, refresh: Union[bool, str] = True, dependencies: Optional[Dict[str, List[str]]] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        summary = self._new_bulk_summary()
         try:
-            for path, methods in documents["paths"].items():
-                doc = {
-                    "key": path,
-                    "info": documents["info"],
-                    "methods": self._prepare_methods(methods)
+            actions = (
+                {
+                    "_index": self.index_name,
+                    "_id": path,
+                    "_source": self._with_dependencies(
+                        self._path_source(path, methods, documents.get("spec_id")), dependencies, path)
                 }
-                doc_id = path
-                response = self.client.index(index=self.index_name, id=doc_id, body=doc, refresh=True)
-                logger.info(f"Inserted document for path {path}: {response['result']}")
+                for path, methods in self._iter_pairs(documents["paths"])
+            )
+            self._bulk_write(self._incremental_actions(actions, source, summary), summary=summary, refresh=refresh)
         except Exception as e:
             logger.error(f"Error in bulk_write_paths: {e}")
+            self._record_bulk_error(summary, None, str(e))
+        logger.info(f"bulk_write_paths to '{self.index_name}': {self._format_bulk_summary(summary)}")
+        return summary
+
+    def _path_source(self, path: str, methods: Dict, spec_id: Optional[str]) -> Dict:
+        # 스펙 공통 헤더(info, servers, security)는 path마다 복사하지 않고 벡터 인덱스의 spec 문서를 spec_id로 참조
+        source = {"key": path, "methods": self._prepare_methods(methods)}
+        if spec_id:
+            source["spec_id"] = spec_id
+        return source
 
     def _prepare_methods(self, methods: Dict) -> Dict:
         prepared_methods = {}
@@ -208,85 +1108,217 @@ class OpenSearchRetriever(BaseRetriever):
             prepared_param['example'] = str(prepared_param['example'])
         return prepared_param
 
-    def bulk_write_components(self, documents: Dict):
+    def bulk_write_components(self, documents: Dict, refresh: Union[bool, str] = True, dependencies: Optional[Dict[str, List[str]]] = None, source: Optional[str] = None) -> Dict[str, Any]:
+        summary = self._new_bulk_summary()
         try:
-            component_types = ["schemas", "responses", "parameters", "examples", "requestBodies", "headers", "securitySchemes", "links", "callbacks"]
-            
-            for component_type in component_types:
-                if component_type in documents["components"]:
-                    for key, value in documents["components"][component_type].items():
-                        doc = {
-                            "key": key,
-                            "value": value,
-                            "component_type": component_type,
-                        }
-                        doc_id = f"{component_type}_{key}"
-                        response = self.client.index(index=self.index_name, id=doc_id, body=doc, refresh=True)
-                        logger.info(f"Inserted document for {component_type} {key}: {response['result']}")
+            actions = (
+                {
+                    "_index": self.index_name,
+                    "_id": f"{component_type}_{key}",
+                    "_source": self._with_dependencies({
+                        "key": key,
+                        "value": value,
+                        "component_type": component_type,
+                    }, dependencies, f"{component_type}_{key}")
+                }
+                for component_type, key, value in self._iter_components(documents["components"])
+            )
+            self._bulk_write(self._incremental_actions(actions, source, summary), summary=summary, refresh=refresh)
         except Exception as e:
             logger.error(f"Error in bulk_write_components: {e}")
+            self._record_bulk_error(summary, None, str(e))
+        logger.info(f"bulk_write_components to '{self.index_name}': {self._format_bulk_summary(summary)}")
+        return summary
+
+    @staticmethod
+    def _iter_pairs(items: Union[Dict, Iterable]) -> Iterator:
+        # dict 또는 스트리밍 파서가 주는 (key, value) iterable 모두 허용
+        return iter(items.items()) if isinstance(items, dict) else iter(items)
+
+    @staticmethod
+    def _iter_components(components: Union[Dict, Iterable]) -> Iterator:
+        # dict({component_type: {key: value}}) 또는 (component_type, key, value) iterable
+        if isinstance(components, dict):
+            return (
+                (component_type, key, value)
+                for component_type in COMPONENT_TYPES
+                if component_type in components
+                for key, value in components[component_type].items()
+            )
+        return (item for item in components if item[0] in COMPONENT_TYPES)
+
+    @staticmethod
+    def _with_dependencies(doc: Dict, dependencies: Optional[Dict[str, List[str]]], doc_id: str) -> Dict:
+        if dependencies is not None:
+            doc["dependencies"] = dependencies.get(doc_id, [])
+        return doc
 
     # def apispecification_write(self, documents: Dict):
     #     self.bulk_write_paths(documents)
     #     self.bulk_write_components(documents)
 
-    def bulk_write_testcases(self, documents: List[Dict]):
+    def bulk_write_testcases(self, documents: List[Dict], refresh: Union[bool, str] = True) -> Dict[str, Any]:
+        summary = self._new_bulk_summary()
         try:
-            for obj in documents:
-                doc = {
-                    "key": obj["EndPoint"],
-                    "method": obj["Method"],
-                    "host": obj["Host"],
-                    "endpoint": obj["EndPoint"],
-                    "precondition": obj["Precondition"],
-                    "verification_procedure": obj["VerificationProcedure"],
-                    "expected_result": obj["ExpectedResult"],
-                    "priority": obj["Priority"],
-                    "test_result": obj["TestResult"],
-                    "jira": obj["jira"],
-                    "remarks": obj["Remarks"],
-                    "response": obj["RESPONSE"]
-                }
-                doc_id = f"{obj['Host']}_{obj['EndPoint']}_{obj['Method']}"
-                response = self.client.index(index=self.index_name, id=doc_id, body=doc, refresh=True)
-                logger.info(f"Inserted document for testcase {doc_id}: {response['result']}")
+            self._bulk_write((self._testcase_action(obj) for obj in documents), summary=summary, refresh=refresh)
         except Exception as e:
             logger.error(f"Error in bulk_write_testcases: {e}")
+            self._record_bulk_error(summary, None, str(e))
+        logger.info(f"bulk_write_testcases to '{self.index_name}': {self._format_bulk_summary(summary)}")
+        return summary
+
+    def _testcase_action(self, obj: Dict) -> Dict:
+        doc = {
+            "key": obj["EndPoint"],
+            "method": obj["Method"],
+            "host": obj["Host"],
+            "endpoint": obj["EndPoint"],
+            "precondition": obj["Precondition"],
+            "verification_procedure": obj["VerificationProcedure"],
+            "expected_result": obj["ExpectedResult"],
+            "priority": obj["Priority"],
+            "test_result": obj["TestResult"],
+            "jira": obj["jira"],
+            "remarks": obj["Remarks"],
+            "response": obj["RESPONSE"]
+        }
+        doc_id = f"{obj['Host']}_{obj['EndPoint']}_{obj['Method']}"
+        return {"_index": self.index_name, "_id": doc_id, "_source": doc}
 
     def resolve_refs(self, schema: Dict, resolved_schemas: Optional[Dict] = None) -> Dict:
+        # $ref를 schema 안에 인라인으로 치환하고, 해석된 스키마를 key -> schema로 반환
         if resolved_schemas is None:
             resolved_schemas = {schema["key"]: schema}
-        if isinstance(schema, dict):
-            for key, value in schema.items():
-                if key == "$ref" and isinstance(value, str):
-                    ref_key = value.split('/')[-1]
-                    if ref_key not in resolved_schemas:
-                        ref_schema = self.get_schema_by_key(ref_key)
-                        resolved_schemas[ref_key] = ref_schema
-                        self.resolve_refs(ref_schema, resolved_schemas)
-                    schema[key] = resolved_schemas[ref_key]
-                elif isinstance(value, (dict, list)):
-                    self.resolve_refs(value, resolved_schemas)
-        elif isinstance(schema, list):
-            for item in schema:
-                self.resolve_refs(item, resolved_schemas)
+        fetched = self._fetch_ref_closure(schema, resolved_schemas)
+        self._walk_refs(schema, resolved_schemas, fetched, inline=True)
         return resolved_schemas
 
     def get_schema_by_key(self, key: str) -> Optional[Dict]:
-        try:
-            query = {
-                "query": {
-                    "term": {"key": key}
-                },
-                "size": 100
-            }
-            response = self.client.search(index=self.index_name, body=query)
-            if response['hits']['hits']:
-                return response['hits']['hits'][0]['_source']
-            return None
-        except Exception as e:
-            logger.error(f"Error in get_schema_by_key: {e}")
-            return None
+        return self.get_schemas_by_keys([key]).get(key)
+
+    def get_schemas_by_keys(self, keys: List[str]) -> Dict[str, Optional[Dict]]:
+        # 여러 key를 terms 쿼리 한 번으로 조회 (key별 첫 번째 hit 사용), 결과는 복사본을 반환
+        schemas, missing = self._cached_schemas(keys)
+        for batch in self._iter_batches(missing, 1000):
+            try:
+                response = self.client.search(index=self.index_name, body=self._schemas_query(batch), request_timeout=self.request_timeout)
+            except Exception as e:
+                logger.error(f"Error in get_schemas_by_keys: {e}")
+                _record_degraded("schemas_by_keys")
+                continue
+            self._store_schema_hits(batch, response, schemas)
+
+        for key in missing:
+            schemas.setdefault(key, None)
+        return schemas
+
+    async def aget_schemas_by_keys(self, keys: List[str]) -> Dict[str, Optional[Dict]]:
+        if self.async_client is None:
+            return await _run_in_thread(self.get_schemas_by_keys, keys)
+        schemas, missing = self._cached_schemas(keys)
+
+        async def fetch(batch: List[str]):
+            try:
+                response = await self.async_client.search(index=self.index_name, body=self._schemas_query(batch), request_timeout=self.request_timeout)
+            except Exception as e:
+                logger.error(f"Error in aget_schemas_by_keys: {e}")
+                _record_degraded("schemas_by_keys")
+                return
+            self._store_schema_hits(batch, response, schemas)
+
+        # 배치마다 key가 겹치지 않으므로 동시에 요청
+        await asyncio.gather(*(fetch(batch) for batch in self._iter_batches(missing, 1000)))
+        for key in missing:
+            schemas.setdefault(key, None)
+        return schemas
+
+    def _cached_schemas(self, keys: List[str]) -> Tuple[Dict[str, Optional[Dict]], List[str]]:
+        schemas = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            cached = self._component_cache.get((self.index_generation, key))
+            if cached is not None:
+                schemas[key] = copy.deepcopy(cached)
+            else:
+                missing.append(key)
+        return schemas, missing
+
+    @staticmethod
+    def _schemas_query(batch: List[str]) -> Dict:
+        return {
+            "query": {
+                "terms": {"key": batch}
+            },
+            "size": min(100 * len(batch), 10000)
+        }
+
+    def _store_schema_hits(self, batch: List[str], response: Dict, schemas: Dict[str, Optional[Dict]]):
+        for hit in response['hits']['hits']:
+            key = hit['_source'].get('key')
+            if key in batch and key not in schemas:
+                self._component_cache.put((self.index_generation, key), hit['_source'])
+                schemas[key] = copy.deepcopy(hit['_source'])
+
+    @staticmethod
+    def _iter_ref_keys(obj: Union[Dict, List]) -> Iterator[str]:
+        stack = [obj]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, dict):
+                for key, value in node.items():
+                    if key == "$ref" and isinstance(value, str):
+                        yield value.split('/')[-1]
+                    elif isinstance(value, (dict, list)):
+                        stack.append(value)
+            elif isinstance(node, list):
+                stack.extend(node)
+
+    def _fetch_ref_closure(self, root: Union[Dict, List], known: Dict) -> Dict[str, Optional[Dict]]:
+        # 깊이별로 새로 발견된 $ref를 모아 한 번에 조회하는 너비 우선 탐색
+        fetched = {}
+        frontier = list(self._iter_ref_keys(root))
+        while frontier:
+            pending = [key for key in dict.fromkeys(frontier) if key not in known and key not in fetched]
+            if not pending:
+                break
+            level = self.get_schemas_by_keys(pending)
+            fetched.update(level)
+            frontier = [ref_key for schema in level.values() if schema for ref_key in self._iter_ref_keys(schema)]
+        return fetched
+
+    @staticmethod
+    def _iter_children(obj: Any) -> Iterator:
+        if isinstance(obj, dict):
+            return ((obj, key, value) for key, value in obj.items())
+        if isinstance(obj, list):
+            return ((obj, index, value) for index, value in enumerate(obj))
+        return iter(())
+
+    def _walk_refs(self, root: Union[Dict, List], resolved: Dict, fetched: Dict[str, Optional[Dict]], inline: bool):
+        # 재귀 없이 기존 깊이 우선 순서 그대로 $ref를 따라가며 resolved를 채움
+        # inline=True: resolve_refs (누락된 스키마도 None으로 기록하고 $ref를 치환)
+        # inline=False: resolve_component_refs (찾은 컴포넌트만 기록)
+        stack = [self._iter_children(root)]
+        while stack:
+            try:
+                container, key, value = next(stack[-1])
+            except StopIteration:
+                stack.pop()
+                continue
+            if key == "$ref" and isinstance(value, str) and isinstance(container, dict):
+                ref_key = value.split('/')[-1]
+                if ref_key not in resolved:
+                    ref_schema = fetched.get(ref_key)
+                    if ref_schema is None and ref_key not in fetched:
+                        ref_schema = self.get_schema_by_key(ref_key)
+                        fetched[ref_key] = ref_schema
+                    if ref_schema is not None or inline:
+                        resolved[ref_key] = ref_schema
+                        stack.append(self._iter_children(ref_schema))
+                if inline:
+                    container[key] = resolved[ref_key]
+            elif isinstance(value, (dict, list)):
+                stack.append(self._iter_children(value))
 
     def get_fully_resolved_schema(self, initial_key: str) -> Optional[str]:
         try:
@@ -299,38 +1331,147 @@ class OpenSearchRetriever(BaseRetriever):
             logger.error(f"Error in get_fully_resolved_schema: {e}")
             return None
 
+    def get_components_by_ids(self, doc_ids: List[str]) -> List[Dict]:
+        if not doc_ids:
+            return []
+        response = self.client.search(index=self.components_index_name or self.index_name, body=self._components_query(doc_ids), request_timeout=self.request_timeout)
+        return self._components_in_order(response, doc_ids)
+
+    async def aget_components_by_ids(self, doc_ids: List[str]) -> List[Dict]:
+        if not doc_ids:
+            return []
+        response = await self.async_client.search(index=self.components_index_name or self.index_name, body=self._components_query(doc_ids), request_timeout=self.request_timeout)
+        return self._components_in_order(response, doc_ids)
+
+    @staticmethod
+    def _components_query(doc_ids: List[str]) -> Dict:
+        return {
+            "query": {"ids": {"values": doc_ids}},
+            "_source": {"excludes": ["dependencies"]},
+            "size": min(len(doc_ids), 10000)
+        }
+
+    @staticmethod
+    def _components_in_order(response: Dict, doc_ids: List[str]) -> List[Dict]:
+        by_id = {hit['_id']: hit['_source'] for hit in response['hits']['hits']}
+        return [by_id[doc_id] for doc_id in doc_ids if doc_id in by_id]
+
     def resolve_component_refs(self, obj: Union[Dict, List], resolved_components: Dict):
-        if isinstance(obj, dict):
-            for key, value in obj.items():
-                if key == "$ref" and isinstance(value, str):
-                    ref_key = value.split('/')[-1]
-                    if ref_key not in resolved_components:
-                        component = self.get_schema_by_key(ref_key)
-                        if component:
-                            resolved_components[ref_key] = component
-                            self.resolve_component_refs(component, resolved_components)
-                elif isinstance(value, (dict, list)):
-                    self.resolve_component_refs(value, resolved_components)
-        elif isinstance(obj, list):
-            for item in obj:
-                self.resolve_component_refs(item, resolved_components)
+        fetched = self._fetch_ref_closure(obj, resolved_components)
+        self._walk_refs(obj, resolved_components, fetched, inline=False)
 
-    def get_path_with_resolved_components(self, path: str) -> Optional[Dict]:
+    def get_components_with_dependencies(self, doc_ids: List[str], dependencies: Optional[List[str]] = None) -> List[Dict]:
+        # 컴포넌트(예: 질문에 이름이 나온 스키마)와 미리 계산된 의존성 closure를 두 번의 요청으로 조회
+        # dependencies를 이미 알고 있으면 ids 쿼리 한 번
+        if not doc_ids:
+            return []
         try:
-            path_doc = self.get_schema_by_key(path)
-            
+            if dependencies is not None:
+                return self.get_components_by_ids(list(dict.fromkeys(doc_ids + dependencies)))
+            response = self.client.search(index=self.components_index_name or self.index_name, body={"query": {"ids": {"values": doc_ids}}, "size": min(len(doc_ids), 10000)}, request_timeout=self.request_timeout)
+            roots = self._components_in_order(response, doc_ids)
+            return roots + self.get_components_by_ids(self._root_dependencies(roots, doc_ids))
+        except Exception as e:
+            logger.error(f"Error in get_components_with_dependencies: {e}")
+            _record_degraded("components")
+            return []
+
+    async def aget_components_with_dependencies(self, doc_ids: List[str], dependencies: Optional[List[str]] = None) -> List[Dict]:
+        if self.async_client is None:
+            return await _run_in_thread(self.get_components_with_dependencies, doc_ids, dependencies)
+        if not doc_ids:
+            return []
+        try:
+            if dependencies is not None:
+                return await self.aget_components_by_ids(list(dict.fromkeys(doc_ids + dependencies)))
+            response = await self.async_client.search(index=self.components_index_name or self.index_name, body={"query": {"ids": {"values": doc_ids}}, "size": min(len(doc_ids), 10000)}, request_timeout=self.request_timeout)
+            roots = self._components_in_order(response, doc_ids)
+            return roots + await self.aget_components_by_ids(self._root_dependencies(roots, doc_ids))
+        except Exception as e:
+            logger.error(f"Error in aget_components_with_dependencies: {e}")
+            _record_degraded("components")
+            return []
+
+    @staticmethod
+    def _root_dependencies(roots: List[Dict], doc_ids: List[str]) -> List[str]:
+        requested = set(doc_ids)
+        return list(dict.fromkeys(
+            dep for root in roots for dep in (root.pop("dependencies", None) or []) if dep not in requested
+        ))
+
+    def get_path_with_resolved_components(self, path: str) -> Optional[Dict]:
+        return self.get_paths_with_resolved_components([path])[0]
+
+    async def aget_path_with_resolved_components(self, path: str) -> Optional[Dict]:
+        return (await self.aget_paths_with_resolved_components([path]))[0]
+
+    def get_paths_with_resolved_components(self, paths: List[str], dependencies: Optional[List[str]] = None) -> List[Optional[Dict]]:
+        # path 문서들을 terms 쿼리 한 번, 의존성 closure의 합집합을 ids 쿼리 한 번으로 조회 (찾지 못한 path는 None)
+        # dependencies(예: endpoint 인덱스에 저장된 closure)를 알고 있으면 두 요청을 동시에 실행
+        with tracer.span("ref_resolution", index=self.index_name, paths=len(paths)):
+            try:
+                if dependencies is not None:
+                    components_future = _submit_in_context(_ref_executor, self.get_components_by_ids, dependencies)
+                    path_docs = self.get_schemas_by_keys(paths)
+                    components = components_future.result(timeout=self.request_timeout)
+                else:
+                    path_docs = self.get_schemas_by_keys(paths)
+                    components = self.get_components_by_ids(self._path_dependencies(path_docs))
+                results = self._resolved_paths(paths, path_docs, components)
+                for result in results:
+                    if result is not None and result["components"] is None:
+                        # dependencies가 저장되지 않은 예전 문서: $ref를 따라가며 해석
+                        resolved_components = {}
+                        self.resolve_component_refs(result["path"], resolved_components)
+                        result["components"] = list(resolved_components.values())
+                return results
+            except Exception as e:
+                logger.error(f"Error in get_path_with_resolved_components: {e}")
+                _record_degraded("ref_resolution")
+                return [None] * len(paths)
+
+    async def aget_paths_with_resolved_components(self, paths: List[str], dependencies: Optional[List[str]] = None) -> List[Optional[Dict]]:
+        if self.async_client is None:
+            return await _run_in_thread(self.get_paths_with_resolved_components, paths, dependencies)
+        with tracer.span("ref_resolution", index=self.index_name, paths=len(paths)):
+            try:
+                if dependencies is not None:
+                    path_docs, components = await asyncio.gather(self.aget_schemas_by_keys(paths), self.aget_components_by_ids(dependencies))
+                else:
+                    path_docs = await self.aget_schemas_by_keys(paths)
+                    components = await self.aget_components_by_ids(self._path_dependencies(path_docs))
+                results = self._resolved_paths(paths, path_docs, components)
+                for result in results:
+                    if result is not None and result["components"] is None:
+                        # 예전 문서: 깊이별로 이어지는 $ref 조회는 스레드에서 동기 클라이언트로 해석
+                        resolved_components = {}
+                        await _run_in_thread(self.resolve_component_refs, result["path"], resolved_components)
+                        result["components"] = list(resolved_components.values())
+                return results
+            except Exception as e:
+                logger.error(f"Error in aget_path_with_resolved_components: {e}")
+                _record_degraded("ref_resolution")
+                return [None] * len(paths)
+
+    @staticmethod
+    def _path_dependencies(path_docs: Dict[str, Optional[Dict]]) -> List[str]:
+        return list(dict.fromkeys(
+            dep for doc in path_docs.values() if doc and doc.get("dependencies") is not None for dep in doc["dependencies"]
+        ))
+
+    @staticmethod
+    def _resolved_paths(paths: List[str], path_docs: Dict[str, Optional[Dict]], components: List[Dict]) -> List[Optional[Dict]]:
+        by_id = {f"{component.get('component_type')}_{component.get('key')}": component for component in components}
+        results = []
+        for path in paths:
+            path_doc = path_docs.get(path)
             if not path_doc:
                 logger.warning(f"No path found for: {path}")
-                return None
-            
-            resolved_components = {}
-            
-            self.resolve_component_refs(path_doc, resolved_components)
-            
-            return {
+                results.append(None)
+                continue
+            dependencies = path_doc.pop("dependencies", None)
+            results.append({
                 "path": path_doc,
-                "components": list(resolved_components.values())
-            }
-        except Exception as e:
-            logger.error(f"Error in get_path_with_resolved_components: {e}")
-            return None
+                "components": None if dependencies is None else [by_id[dep] for dep in dependencies if dep in by_id]
+            })
+        return results
@@ -0,0 +1,85 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+THROTTLING_MARKERS = ("ThrottlingException", "TooManyRequestsException", "Too many requests", "Rate exceeded")
+
+
+class TokenBucket:
+    """Thread safe token bucket: ``rate`` tokens per second, bursts of up to ``capacity``.
+
+    A rate of 0 or less disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                wait = (tokens - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def is_throttling_error(error: Exception) -> bool:
+    # botocore ClientError는 error code로, langchain_aws가 감싼 ValueError는 메시지로 판단
+    response = getattr(error, "response", None)
+    code = response.get("Error", {}).get("Code", "") if isinstance(response, dict) else ""
+    return code in THROTTLING_MARKERS or any(marker in str(error) for marker in THROTTLING_MARKERS)
+
+
+class RateLimitedEmbeddings(Embeddings):
+    """Embeddings wrapper that takes a token per call and retries throttled calls with backoff.
+
+    Share one instance (and bucket) between pipelines so their combined call rate stays
+    under the Bedrock quota.
+    """
+
+    def __init__(self, embeddings: Embeddings, bucket: TokenBucket, max_retries: int = 5,
+                 backoff_base: float = 0.5, backoff_max: float = 20.0):
+        self.embeddings = embeddings
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.model_id = getattr(embeddings, "model_id", type(embeddings).__name__)
+        self.model_kwargs = getattr(embeddings, "model_kwargs", None)
+        self.throttled = 0
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._call(self.embeddings.embed_query, text)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        # Titan 임베딩은 텍스트마다 한 번씩 호출되므로 텍스트 단위로 토큰을 소비
+        return [self.embed_query(text) for text in texts]
+
+    def _call(self, func, *args) -> Any:
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            try:
+                return func(*args)
+            except Exception as e:
+                if not is_throttling_error(e) or attempt == self.max_retries:
+                    raise
+                self.throttled += 1
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.0)
+                logger.warning(f"Embedding call throttled, retrying in {delay:.2f}s")
+                time.sleep(delay)
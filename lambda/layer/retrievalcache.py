@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after ``ttl`` seconds.
+
+    Held in module scope it survives warm Lambda invocations. Thread safe.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry is not _MISSING:
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any],
+                       cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.put(key, value)
+        return value
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[Any]],
+                              cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = await compute()
+            if cache_if is None or cache_if(value):
+                self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "name": self.name,
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
+
+
+class IndexVersionTracker:
+    """Polls the ``_meta.spec_version`` of a set of indices at most every ``refresh_interval`` seconds.
+
+    ``on_change`` is called with the new versions whenever any of them differs from the
+    last seen value, which is where caches keyed on the old versions get invalidated.
+    """
+
+    def __init__(self, client: Any, index_names: List[str], refresh_interval: float = 30.0,
+                 on_change: Optional[Callable[[Dict[str, str]], None]] = None):
+        self.client = client
+        self.index_names = [name for name in index_names if name]
+        self.refresh_interval = refresh_interval
+        self.on_change = on_change
+        self._versions = {}
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def versions(self) -> Dict[str, str]:
+        with self._lock:
+            if time.monotonic() - self._checked_at < self.refresh_interval:
+                return self._versions
+            self._checked_at = time.monotonic()
+            try:
+                mappings = self.client.indices.get_mapping(index=",".join(self.index_names))
+                versions = {
+                    name: mappings.get(name, {}).get("mappings", {}).get("_meta", {}).get("spec_version", "")
+                    for name in self.index_names
+                }
+            except Exception as e:
+                logger.error(f"Error reading index versions: {e}")
+                return self._versions
+            changed = versions != self._versions
+            self._versions = versions
+        if changed and self.on_change:
+            self.on_change(versions)
+        return versions
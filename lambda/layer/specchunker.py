@@ -0,0 +1,120 @@
+import json
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+HTTP_METHODS = ("get", "put", "post", "delete", "options", "head", "patch", "trace")
+
+
+class Chunk(NamedTuple):
+    id: str
+    content: Dict[str, Any]
+    parent_id: Optional[str] = None
+    is_parent: bool = False
+
+
+def _default_token_counter(text: str) -> int:
+    # 토크나이저가 주어지지 않으면 보수적으로 3자당 1토큰으로 추정
+    return (len(text) + 2) // 3
+
+
+class SpecChunker:
+    """Splits oversized OpenAPI path items and schemas into chunks of at most ``max_tokens``.
+
+    Objects that fit are returned as one chunk. Oversized ones yield a parent chunk holding
+    the whole object (stored without a vector) followed by children that point to it via
+    ``parent_id``: one per operation, then per requestBody/response when an operation is
+    still too large, and per group of properties for schemas.
+    """
+
+    def __init__(self, max_tokens: int = 2000, token_counter: Optional[Callable[[str], int]] = None):
+        self.max_tokens = max_tokens
+        self.token_counter = token_counter or _default_token_counter
+
+    def tokens(self, value: Any) -> int:
+        text = value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+        return self.token_counter(text)
+
+    def truncate(self, text: str) -> str:
+        # 임베딩 입력이 모델 한도를 넘지 않도록 자름
+        tokens = self.tokens(text)
+        while tokens > self.max_tokens and text:
+            text = text[:max(1, int(len(text) * self.max_tokens / tokens) - 1)]
+            tokens = self.tokens(text)
+        return text
+
+    def chunk_path(self, path: str, item: Any) -> List[Chunk]:
+        content = {path: item}
+        if not isinstance(item, dict) or self.tokens(content) <= self.max_tokens:
+            return [Chunk(path, content)]
+
+        # path 수준 공통 항목(parameters, servers 등)은 각 operation 청크에 함께 넣음
+        shared = {key: value for key, value in item.items() if key not in HTTP_METHODS}
+        children = []
+        for method, operation in item.items():
+            if method not in HTTP_METHODS:
+                continue
+            operation_id = f"{path}#{method}"
+            operation_content = {path: {**shared, method: operation}}
+            if not isinstance(operation, dict) or self.tokens(operation_content) <= self.max_tokens:
+                children.append(Chunk(operation_id, operation_content, path))
+                continue
+            children.extend(self._chunk_operation(path, method, operation, shared))
+
+        if len(children) <= 1:
+            return [Chunk(path, content)]
+        logger.info(f"Split path {path} into {len(children)} chunks")
+        return [Chunk(path, content, is_parent=True)] + children
+
+    def _chunk_operation(self, path: str, method: str, operation: Dict, shared: Dict) -> List[Chunk]:
+        operation_id = f"{path}#{method}"
+        # 하위 청크도 어떤 operation인지 알 수 있도록 요약 항목을 함께 둠
+        heading = {key: operation[key] for key in ("summary", "operationId", "tags") if key in operation}
+        core = {key: value for key, value in operation.items() if key not in ("requestBody", "responses")}
+        chunks = [Chunk(operation_id, {path: {**shared, method: core}}, path)]
+        if "requestBody" in operation:
+            chunks.append(Chunk(
+                f"{operation_id}#requestBody",
+                {path: {method: {**heading, "requestBody": operation["requestBody"]}}},
+                path
+            ))
+        responses = operation.get("responses")
+        if isinstance(responses, dict):
+            for status, response in responses.items():
+                chunks.append(Chunk(
+                    f"{operation_id}#responses.{status}",
+                    {path: {method: {**heading, "responses": {status: response}}}},
+                    path
+                ))
+        return chunks
+
+    def chunk_schema(self, doc_id: str, name: str, schema: Any) -> List[Chunk]:
+        content = {name: schema}
+        if (not isinstance(schema, dict) or not isinstance(schema.get("properties"), dict)
+                or self.tokens(content) <= self.max_tokens):
+            return [Chunk(doc_id, content)]
+
+        rest = {key: value for key, value in schema.items() if key != "properties"}
+        base_tokens = self.tokens({name: {**rest, "properties": {}}})
+        groups = []
+        group = {}
+        group_tokens = base_tokens
+        for key, value in schema["properties"].items():
+            property_tokens = self.tokens({key: value})
+            if group and group_tokens + property_tokens > self.max_tokens:
+                groups.append(group)
+                group = {}
+                group_tokens = base_tokens
+            group[key] = value
+            group_tokens += property_tokens
+        if group:
+            groups.append(group)
+
+        if len(groups) <= 1:
+            return [Chunk(doc_id, content)]
+        logger.info(f"Split schema {name} into {len(groups)} chunks")
+        return [Chunk(doc_id, content, is_parent=True)] + [
+            Chunk(f"{doc_id}#properties.{index}", {name: {**rest, "properties": properties}}, doc_id)
+            for index, properties in enumerate(groups)
+        ]
@@ -0,0 +1,150 @@
+import logging
+from typing import Any, BinaryIO, Callable, Iterable, Iterator, Optional, Tuple
+
+import ijson
+import yaml
+
+logger = logging.getLogger(__name__)
+
+# OpenAPI 스펙을 한 번에 메모리에 올리지 않고 항목 단위로 읽는 파서
+# 섹션: "header"(paths/components 외 최상위 키), "paths", components 하위 타입(schemas, responses, ...)
+HEADER = "header"
+PATHS = "paths"
+COMPONENTS = "components"
+
+SpecItem = Tuple[str, Any, Any]
+
+
+def spec_format(key: str) -> str:
+    return "yaml" if key.lower().endswith((".yaml", ".yml")) else "json"
+
+
+class SpecStream:
+    """Iterates ``(section, key, value)`` items of an OpenAPI document from a byte stream.
+
+    Only one item is materialized at a time; items of sections that are not requested
+    are skipped at the parser event level. Every call opens a new stream through
+    ``open_stream`` so a spec can be read in several passes.
+    """
+
+    def __init__(self, open_stream: Callable[[], BinaryIO], format: str = "json"):
+        if format not in ("json", "yaml"):
+            raise ValueError(f"Unsupported spec format: {format}")
+        self.open_stream = open_stream
+        self.format = format
+
+    def items(self, sections: Optional[Iterable[str]] = None) -> Iterator[SpecItem]:
+        wanted = set(sections) if sections is not None else None
+        stream = self.open_stream()
+        try:
+            if self.format == "json":
+                yield from self._iter_json(stream, wanted)
+            else:
+                yield from self._iter_yaml(stream, wanted)
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    def paths(self) -> Iterator[Tuple[str, Any]]:
+        for _, path, item in self.items([PATHS]):
+            yield path, item
+
+    def components(self, component_types: Iterable[str]) -> Iterator[SpecItem]:
+        return self.items(component_types)
+
+    @staticmethod
+    def _section(parent: str, key: str) -> Optional[str]:
+        # ijson prefix 기준으로 (부모 prefix, 키)가 어느 섹션의 항목인지 판단
+        if parent == "":
+            return None if key in (PATHS, COMPONENTS) else HEADER
+        if parent == PATHS:
+            return PATHS
+        if parent.startswith(COMPONENTS + ".") and parent.count(".") == 1:
+            return parent[len(COMPONENTS) + 1:]
+        return None
+
+    def _iter_json(self, stream: BinaryIO, wanted: Optional[set]) -> Iterator[SpecItem]:
+        builder = None
+        depth = 0
+        pending = None
+        for prefix, event, value in ijson.parse(stream, use_float=True):
+            if builder is not None:
+                builder.event(event, value)
+                if event in ("start_map", "start_array"):
+                    depth += 1
+                elif event in ("end_map", "end_array"):
+                    depth -= 1
+                    if depth == 0:
+                        yield pending + (builder.value,)
+                        builder = None
+                        pending = None
+                continue
+            if pending is not None:
+                if event in ("start_map", "start_array"):
+                    builder = ijson.ObjectBuilder()
+                    builder.event(event, value)
+                    depth = 1
+                else:
+                    yield pending + (value,)
+                    pending = None
+                continue
+            if event == "map_key":
+                section = self._section(prefix, value)
+                if section is not None and (wanted is None or section in wanted):
+                    pending = (section, value)
+
+    def _iter_yaml(self, stream: BinaryIO, wanted: Optional[set]) -> Iterator[SpecItem]:
+        # SafeLoader를 이벤트 단위로 구동: 필요한 항목만 compose/construct 하고 나머지는 이벤트를 건너뜀
+        # 건너뛴 영역에 정의된 anchor를 다른 항목에서 alias로 참조하면 ComposerError가 발생함
+        loader = yaml.SafeLoader(stream)
+        try:
+            loader.get_event()  # StreamStart
+            if loader.check_event(yaml.StreamEndEvent):
+                return
+            loader.get_event()  # DocumentStart
+            if not loader.check_event(yaml.MappingStartEvent):
+                raise ValueError("OpenAPI document root must be a mapping")
+            loader.get_event()
+            while not loader.check_event(yaml.MappingEndEvent):
+                key = self._construct_yaml_node(loader)
+                if key == PATHS:
+                    yield from self._iter_yaml_members(loader, PATHS, wanted)
+                elif key == COMPONENTS and loader.check_event(yaml.MappingStartEvent):
+                    loader.get_event()
+                    while not loader.check_event(yaml.MappingEndEvent):
+                        component_type = self._construct_yaml_node(loader)
+                        yield from self._iter_yaml_members(loader, component_type, wanted)
+                    loader.get_event()
+                elif wanted is None or HEADER in wanted:
+                    yield HEADER, key, self._construct_yaml_node(loader)
+                else:
+                    self._skip_yaml_node(loader)
+        finally:
+            loader.dispose()
+
+    def _iter_yaml_members(self, loader: yaml.SafeLoader, section: str, wanted: Optional[set]) -> Iterator[SpecItem]:
+        if (wanted is not None and section not in wanted) or not loader.check_event(yaml.MappingStartEvent):
+            self._skip_yaml_node(loader)
+            return
+        loader.get_event()
+        while not loader.check_event(yaml.MappingEndEvent):
+            key = self._construct_yaml_node(loader)
+            yield section, key, self._construct_yaml_node(loader)
+        loader.get_event()
+
+    @staticmethod
+    def _construct_yaml_node(loader: yaml.SafeLoader) -> Any:
+        return loader.construct_document(loader.compose_node(None, None))
+
+    @staticmethod
+    def _skip_yaml_node(loader: yaml.SafeLoader):
+        depth = 0
+        while True:
+            event = loader.get_event()
+            if isinstance(event, (yaml.MappingStartEvent, yaml.SequenceStartEvent)):
+                depth += 1
+            elif isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                depth -= 1
+            if depth == 0:
+                return
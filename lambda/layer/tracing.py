@@ -0,0 +1,168 @@
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 요청 단위 트레이스: 단계별 span 시간과 카운터(OpenSearch 왕복/바이트, Bedrock 토큰 등)를 모아
+# 요청이 끝나면 EMF(CloudWatch Embedded Metric Format) 또는 JSON 로그 한 줄로 출력
+# 활성 트레이스가 없으면 span/add는 아무 일도 하지 않음
+
+NAMESPACE = os.getenv('TRACE_NAMESPACE', 'OpenApiChatbot')
+# emf | json | off
+OUTPUT = os.getenv('TRACE_OUTPUT', 'emf')
+
+_current: contextvars.ContextVar = contextvars.ContextVar("trace", default=None)
+
+
+class Trace:
+    """Spans and counters of one request. Thread safe, so worker threads can record into it."""
+
+    def __init__(self, name: str, **attributes: Any):
+        self.name = name
+        self.attributes = attributes
+        self.started = time.monotonic()
+        self.duration_ms: Optional[float] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def record_span(self, name: str, started: float, attributes: Dict[str, Any]):
+        ended = time.monotonic()
+        span = {
+            "name": name,
+            "start_ms": round((started - self.started) * 1000, 2),
+            "duration_ms": round((ended - started) * 1000, 2),
+        }
+        if attributes:
+            span["attributes"] = attributes
+        with self._lock:
+            self.spans.append(span)
+
+    def stages(self) -> Dict[str, float]:
+        # 같은 이름의 span(예: 여러 번의 embedding)은 합산
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["duration_ms"], 2)
+        return totals
+
+    def finish(self):
+        if self.duration_ms is None:
+            self.duration_ms = round((time.monotonic() - self.started) * 1000, 2)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start_ms"])
+            counters = dict(self.counters)
+        return {
+            "trace": self.name,
+            **self.attributes,
+            "duration_ms": self.duration_ms if self.duration_ms is not None else round((time.monotonic() - self.started) * 1000, 2),
+            "stages_ms": self.stages(),
+            "counters": counters,
+            "spans": spans,
+        }
+
+    def emf(self) -> Dict[str, Any]:
+        report = self.report()
+        metrics = {"duration_ms": report["duration_ms"]}
+        metrics.update({f"{name}_ms": value for name, value in report["stages_ms"].items()})
+        metrics.update(report["counters"])
+        units = {name: "Milliseconds" if name.endswith("_ms") else "Bytes" if name.endswith("bytes") else "Count" for name in metrics}
+        return {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [{
+                    "Namespace": NAMESPACE,
+                    "Dimensions": [["trace"]],
+                    "Metrics": [{"Name": name, "Unit": unit} for name, unit in units.items()],
+                }],
+            },
+            **metrics,
+            **{key: value for key, value in report.items() if key not in ("duration_ms", "stages_ms", "counters")},
+        }
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Trace]:
+    active = Trace(name, **attributes)
+    token = _current.set(active)
+    try:
+        yield active
+    finally:
+        _current.reset(token)
+        active.finish()
+        emit(active)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[None]:
+    active = _current.get()
+    if active is None:
+        yield
+        return
+    started = time.monotonic()
+    try:
+        yield
+    finally:
+        active.record_span(name, started, attributes)
+
+
+def add(name: str, value: float = 1):
+    active = _current.get()
+    if active is not None:
+        active.add(name, value)
+
+
+def emit(active: Trace):
+    if OUTPUT == "off":
+        return
+    try:
+        # Lambda에서는 stdout 한 줄이 CloudWatch Logs 이벤트 하나 (EMF는 여기서 메트릭으로 추출됨)
+        print(json.dumps(active.emf() if OUTPUT == "emf" else active.report(), ensure_ascii=False, default=str))
+    except Exception as e:
+        logger.error(f"Error emitting trace: {e}")
+
+
+def token_usage_callback(active: Optional[Trace] = None) -> Any:
+    """LangChain callback that records Bedrock prompt/response token counts on the trace."""
+    from langchain_core.callbacks import BaseCallbackHandler
+
+    target = active or current_trace()
+
+    class TokenUsageCallback(BaseCallbackHandler):
+        run_inline = True
+
+        def on_llm_end(self, response, **kwargs):
+            if target is None:
+                return
+            usage = None
+            for generations in response.generations:
+                for generation in generations:
+                    message = getattr(generation, "message", None)
+                    if getattr(message, "usage_metadata", None):
+                        usage = message.usage_metadata
+            if usage:
+                target.add("bedrock.input_tokens", usage.get("input_tokens", 0))
+                target.add("bedrock.output_tokens", usage.get("output_tokens", 0))
+                return
+            # usage_metadata가 없는 버전: llm_output.usage (prompt_tokens/completion_tokens)
+            usage = (response.llm_output or {}).get("usage") or {}
+            target.add("bedrock.input_tokens", usage.get("prompt_tokens", 0))
+            target.add("bedrock.output_tokens", usage.get("completion_tokens", 0))
+
+    return TokenUsageCallback()
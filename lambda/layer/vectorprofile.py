@@ -0,0 +1,142 @@
+import copy
+import logging
+import os
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# 벡터 인덱스 프로파일: Titan v2 출력 차원, 공간(space_type), 저장 형식(float/fp16/byte), HNSW 파라미터
+# os_index_function이 인덱스를 만들 때 매핑에 적용하고, 임베딩/OpenSearchVectorSearch도 같은 프로파일을 사용
+# 프로파일을 바꾸면 벡터 인덱스를 다시 만들고 스펙을 다시 ingest해야 함 (차원과 저장 형식이 매핑에 고정됨)
+
+TITAN_V2_DEFAULT_DIMENSIONS = 1024
+# 네이티브 메모리 추정용 벡터 한 차원의 저장 크기
+BYTES_PER_DIMENSION = {"float": 4, "fp16": 2, "byte": 1}
+
+
+class VectorIndexProfile(NamedTuple):
+    name: str
+    dimensions: int
+    space_type: str
+    engine: str = "faiss"
+    # 저장 형식: float | fp16 (faiss SQ encoder) | byte (int8로 양자화해서 전송, data_type=byte)
+    encoding: str = "float"
+    # Titan v2 normalize: 정규화된 벡터는 innerproduct가 cosine과 같은 순위를 줌
+    normalize: bool = True
+    m: int = 16
+    ef_construction: int = 100
+    ef_search: int = 100
+
+    def method(self) -> Dict[str, Any]:
+        parameters: Dict[str, Any] = {"m": self.m, "ef_construction": self.ef_construction}
+        if self.encoding == "fp16":
+            parameters["encoder"] = {"name": "sq", "parameters": {"type": "fp16"}}
+        return {"name": "hnsw", "engine": self.engine, "space_type": self.space_type, "parameters": parameters}
+
+    def field_mapping(self) -> Dict[str, Any]:
+        mapping: Dict[str, Any] = {"type": "knn_vector", "dimension": self.dimensions, "method": self.method()}
+        if self.encoding == "byte":
+            mapping["data_type"] = "byte"
+        return mapping
+
+    def apply(self, index_mapping: Dict[str, Any], vector_field: str = "vector_field") -> Dict[str, Any]:
+        # SSM의 인덱스 설정(json/index_vector.json)에 벡터 필드 매핑과 ef_search를 덮어씀 (원본은 변경하지 않음)
+        mapping = copy.deepcopy(index_mapping)
+        index_settings = mapping.setdefault("settings", {}).setdefault("index", {})
+        index_settings["knn"] = True
+        # 필드의 method.space_type이 적용되므로 인덱스 단위 기본값은 제거
+        index_settings.pop("knn.space_type", None)
+        if self.engine != "lucene":
+            # lucene 엔진은 검색 시 k를 ef_search로 사용
+            index_settings["knn.algo_param.ef_search"] = self.ef_search
+        mapping.setdefault("mappings", {}).setdefault("properties", {})[vector_field] = self.field_mapping()
+        return mapping
+
+    def embedding_kwargs(self) -> Dict[str, Any]:
+        # Titan v2 요청 본문 옵션: 기본값(1024차원, normalize)이면 비워서 기존 임베딩 캐시 키를 유지
+        kwargs: Dict[str, Any] = {}
+        if self.dimensions != TITAN_V2_DEFAULT_DIMENSIONS:
+            kwargs["dimensions"] = self.dimensions
+        if not self.normalize:
+            kwargs["normalize"] = False
+        return kwargs
+
+    def wrap_embeddings(self, embeddings: Embeddings) -> Embeddings:
+        return ByteQuantizedEmbeddings(embeddings) if self.encoding == "byte" else embeddings
+
+    def memory_bytes_per_vector(self) -> float:
+        # OpenSearch k-NN 메모리 산정식: 1.1 * (차원 * 차원당 바이트 + 8 * m)
+        return 1.1 * (self.dimensions * BYTES_PER_DIMENSION[self.encoding] + 8 * self.m)
+
+
+PROFILES = {
+    profile.name: profile for profile in [
+        # 기존 구성: 1024차원 float, faiss l2
+        VectorIndexProfile("float1024_l2", 1024, "l2"),
+        VectorIndexProfile("ip1024", 1024, "innerproduct", ef_construction=128),
+        VectorIndexProfile("ip512", 512, "innerproduct", ef_construction=128),
+        VectorIndexProfile("ip512_fp16", 512, "innerproduct", encoding="fp16", ef_construction=128),
+        VectorIndexProfile("ip256_fp16", 256, "innerproduct", encoding="fp16", ef_construction=128, ef_search=128),
+        # byte 벡터: faiss는 OpenSearch 2.17 이상이므로 현재 도메인(2.15)에서 쓸 수 있는 lucene 엔진 사용 (ef_search는 k로 결정)
+        VectorIndexProfile("ip512_byte", 512, "innerproduct", engine="lucene", encoding="byte", ef_construction=128),
+    ]
+}
+DEFAULT_PROFILE = "float1024_l2"
+
+
+def get_profile(name: str, m: Optional[int] = None, ef_construction: Optional[int] = None,
+                ef_search: Optional[int] = None) -> VectorIndexProfile:
+    if name not in PROFILES:
+        raise ValueError(f"Unknown vector index profile: {name} (expected one of {', '.join(PROFILES)})")
+    profile = PROFILES[name]
+    overrides = {key: value for key, value in (("m", m), ("ef_construction", ef_construction), ("ef_search", ef_search)) if value}
+    return profile._replace(**overrides) if overrides else profile
+
+
+def profile_from_env() -> VectorIndexProfile:
+    # VECTOR_INDEX_PROFILE로 프로파일을 고르고 VECTOR_HNSW_*로 HNSW 파라미터만 조정
+    def optional_int(name: str) -> Optional[int]:
+        value = os.getenv(name)
+        return int(value) if value else None
+
+    return get_profile(
+        os.getenv('VECTOR_INDEX_PROFILE', DEFAULT_PROFILE),
+        m=optional_int('VECTOR_HNSW_M'),
+        ef_construction=optional_int('VECTOR_HNSW_EF_CONSTRUCTION'),
+        ef_search=optional_int('VECTOR_HNSW_EF_SEARCH')
+    )
+
+
+def quantize_to_bytes(vector: List[float]) -> List[int]:
+    # 정규화된 벡터(각 성분 -1..1)를 int8 범위로 선형 양자화
+    return [max(-128, min(127, int(round(value * 127)))) for value in vector]
+
+
+class ByteQuantizedEmbeddings(Embeddings):
+    """Embeddings wrapper that returns int8-quantized vectors for ``data_type: byte`` k-NN fields.
+
+    Wrap it around the embedding cache, not inside it: the cache then keeps float vectors that
+    float and byte profiles of the same dimension can share. ``model_id`` gets a suffix so the
+    quantized output is never mistaken for float vectors.
+    """
+
+    def __init__(self, embeddings: Embeddings):
+        self.embeddings = embeddings
+        self.model_id = f"{getattr(embeddings, 'model_id', type(embeddings).__name__)}:byte"
+        self.model_kwargs = getattr(embeddings, "model_kwargs", None)
+
+    def embed_query(self, text: str) -> List[int]:
+        return quantize_to_bytes(self.embeddings.embed_query(text))
+
+    def embed_documents(self, texts: List[str]) -> List[List[int]]:
+        return [quantize_to_bytes(vector) for vector in self.embeddings.embed_documents(texts)]
+
+    async def aembed_query(self, text: str) -> List[int]:
+        return quantize_to_bytes(await self.embeddings.aembed_query(text))
+
+    def stats(self) -> Dict[str, Any]:
+        # 감싼 CachedEmbeddings의 적중률을 그대로 노출
+        stats = getattr(self.embeddings, "stats", None)
+        return stats() if stats else {}
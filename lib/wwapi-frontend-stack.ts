@@ -47,6 +47,17 @@ export class WwapiFrontendStack extends cdk.Stack {
       resources: ['*']
     }));
 
+    // 스트리밍 Function URL(AWS_IAM)을 SigV4 서명 요청으로 호출할 권한
+    const chatStreamFunctionArn = ssm.StringParameter.valueForStringParameter(this, '/wwapi/chat-stream-function-arn');
+    taskRole.addToPrincipalPolicy(new iam.PolicyStatement({
+      effect: iam.Effect.ALLOW,
+      actions: [
+        'lambda:InvokeFunctionUrl',
+        'lambda:InvokeFunction'
+      ],
+      resources: [chatStreamFunctionArn]
+    }));
+
     // Fargate 서비스 생성
     const fargateService = new ecs_patterns.ApplicationLoadBalancedFargateService(
       this,
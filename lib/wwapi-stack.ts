@@ -34,10 +34,13 @@ export class WwapiStack extends cdk.Stack {
       description: 'Shared role for multiple Lambda functions',
     });
 
+    // 레이어와 모든 Lambda 함수가 같은 Python 런타임을 사용
+    const pythonRuntime = lambda.Runtime.PYTHON_3_9;
+
     // Lambda 레이어 생성
     const commonLayer = new python.PythonLayerVersion(this, 'CommonLayer', {
       entry: 'lambda/layer',  // 레이어 코드가 있는 디렉토리
-      compatibleRuntimes: [lambda.Runtime.PYTHON_3_9],
+      compatibleRuntimes: [pythonRuntime],
       description: 'Common libraries for Lambda functions',
     });
     const vector_path_index_name = 'vector_paths';
@@ -61,6 +64,8 @@ export class WwapiStack extends cdk.Stack {
     });
 
     const vector_index_name = 'vector';
+    const hybrid_search_pipeline_name = 'hybrid-search-pipeline';
+    const embedding_cache_index_name = 'embedding_cache';
     const vector_settingsFilePath = './json/index_vector.json';
     const vector_settings = fs.readFileSync(vector_settingsFilePath, 'utf8');
     const vector_parameter = new ssm.StringParameter(this, 'WWAPI-Vector-Parameter', {
@@ -68,6 +73,17 @@ export class WwapiStack extends cdk.Stack {
       stringValue: vector_settings,
       tier: ssm.ParameterTier.ADVANCED
     });
+    const answer_cache_index_name = 'answer_cache';
+    // 벡터 인덱스 프로파일 (lambda/layer/vectorprofile.py): cdk deploy -c vectorIndexProfile=ip512_fp16
+    // 바꾼 뒤에는 인덱스를 다시 만들고(reset index) 스펙을 다시 업로드해야 함
+    const vector_index_profile = this.node.tryGetContext('vectorIndexProfile') ?? 'float1024_l2';
+    const answer_cache_settingsFilePath = './json/index_answer_cache.json';
+    const answer_cache_settings = fs.readFileSync(answer_cache_settingsFilePath, 'utf8');
+    const answer_cache_parameter = new ssm.StringParameter(this, 'WWAPI-AnswerCache-Parameter', {
+      parameterName: answer_cache_index_name,
+      stringValue: answer_cache_settings,
+      tier: ssm.ParameterTier.ADVANCED
+    });
     // Opensearch ID,Password
     const opensearch_account = 'raguser';
     const opensearch_passwd = 'Test1234!';
@@ -81,7 +97,7 @@ export class WwapiStack extends cdk.Stack {
     });
     // create lambda function with python, add lambda log, metric, trace
     const lambdaFn = new lambda.Function(this, 'WWAPI-Lambda', {
-      runtime: lambda.Runtime.PYTHON_3_9,
+      runtime: pythonRuntime,
       handler: 's3_function.lambda_handler',
       code: lambda.Code.fromAsset('lambda/function'),
       logRetention: cdk.aws_logs.RetentionDays.ONE_DAY,
@@ -94,7 +110,14 @@ export class WwapiStack extends cdk.Stack {
         COMPONENTS_INDEX_NAME: components_index_name,
         VECTORS_INDEX_NAME: vector_index_name,
         VECTORS_PATH_INDEX_NAME: vector_path_index_name,
-        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name
+        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name,
+        INGEST_CONCURRENCY: '4', // 동시에 실행할 ingest 파이프라인 수
+        EMBEDDING_RPS: '20', // Bedrock 임베딩 초당 호출 한도 (계정 할당량에 맞게 조정)
+        CHUNK_MAX_TOKENS: '2000', // 이 크기를 넘는 path/schema는 operation, 응답, 속성 그룹 단위로 분할
+        EMBEDDING_CACHE_BACKEND: 'opensearch', // 임베딩 캐시를 OpenSearch 인덱스에 저장해 함수 간 공유
+        EMBEDDING_CACHE_INDEX: embedding_cache_index_name,
+        ANSWER_CACHE_INDEX_NAME: answer_cache_index_name, // 스펙이 바뀌면 이전 버전의 캐시된 답변을 삭제
+        VECTOR_INDEX_PROFILE: vector_index_profile
       },
     });
     //create trigger for lambda function with s3 add,update object
@@ -130,7 +153,7 @@ export class WwapiStack extends cdk.Stack {
     sharedRole.addToPolicy(bedrockPolicy);
 
     const os_lambdaFn = new lambda.Function(this, 'IndexHandler-Lambda', {
-      runtime: lambda.Runtime.PYTHON_3_9,
+      runtime: pythonRuntime,
       handler: 'os_index_function.lambda_handler',
       code: lambda.Code.fromAsset('lambda/function'),
       logRetention: cdk.aws_logs.RetentionDays.ONE_DAY,
@@ -142,7 +165,10 @@ export class WwapiStack extends cdk.Stack {
         COMPONENTS_INDEX_NAME: components_index_name,
         VECTORS_INDEX_NAME: vector_index_name,
         VECTORS_PATH_INDEX_NAME: vector_path_index_name,
-        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name
+        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name,
+        HYBRID_SEARCH_PIPELINE: hybrid_search_pipeline_name,
+        ANSWER_CACHE_INDEX_NAME: answer_cache_index_name,
+        VECTOR_INDEX_PROFILE: vector_index_profile
       },
       role:sharedRole
     });
@@ -150,6 +176,7 @@ export class WwapiStack extends cdk.Stack {
     path_parameter.grantRead(os_lambdaFn);
     components_parameter.grantRead(os_lambdaFn);
     vector_parameter.grantRead(os_lambdaFn);
+    answer_cache_parameter.grantRead(os_lambdaFn);
 
 
     // Add OpenSearch
@@ -203,7 +230,7 @@ export class WwapiStack extends cdk.Stack {
     
     // Lambda 함수 생성
     const chatbotFunction = new lambda.Function(this, 'ChatbotFunction', {
-      runtime: lambda.Runtime.PYTHON_3_9,
+      runtime: pythonRuntime,
       handler: 'chat_function.lambda_handler',
       logRetention: cdk.aws_logs.RetentionDays.ONE_DAY,
       tracing: lambda.Tracing.ACTIVE,
@@ -216,10 +243,77 @@ export class WwapiStack extends cdk.Stack {
         COMPONENTS_INDEX_NAME: components_index_name,
         VECTORS_INDEX_NAME: vector_index_name,
         VECTORS_PATH_INDEX_NAME: vector_path_index_name,
-        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name
+        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name,
+        HYBRID_SEARCH_PIPELINE: hybrid_search_pipeline_name,
+        EMBEDDING_CACHE_BACKEND: 'opensearch',
+        EMBEDDING_CACHE_INDEX: embedding_cache_index_name,
+        CHAT_ASYNC: 'true', // path/component 검색을 AsyncOpenSearch로 동시에 실행
+        ANSWER_CACHE_INDEX_NAME: answer_cache_index_name,
+        ANSWER_CACHE_THRESHOLD: '0.95', // 질의 임베딩 cosine 유사도가 이 값 이상이면 캐시된 답변을 반환
+        VECTOR_INDEX_PROFILE: vector_index_profile
       },
     });
 
+    // 스트리밍 응답용 Lambda (Lambda Web Adapter + Function URL RESPONSE_STREAM)
+    const webAdapterLayer = lambda.LayerVersion.fromLayerVersionArn(this, 'LambdaWebAdapterLayer',
+      `arn:aws:lambda:${this.region}:753240598075:layer:LambdaAdapterLayerX86:23`);
+    const chatbotStreamFunction = new lambda.Function(this, 'ChatbotStreamFunction', {
+      runtime: pythonRuntime,
+      handler: 'run.sh',
+      logRetention: cdk.aws_logs.RetentionDays.ONE_DAY,
+      tracing: lambda.Tracing.ACTIVE,
+      layers: [commonLayer, webAdapterLayer],
+      code: lambda.Code.fromAsset('lambda/function'),
+      role:sharedRole,
+      timeout: cdk.Duration.seconds(300),
+      environment: {
+        PATHS_INDEX_NAME: path_index_name,
+        COMPONENTS_INDEX_NAME: components_index_name,
+        VECTORS_INDEX_NAME: vector_index_name,
+        VECTORS_PATH_INDEX_NAME: vector_path_index_name,
+        VECTORS_COMPONENTS_INDEX_NAME: vector_components_index_name,
+        HYBRID_SEARCH_PIPELINE: hybrid_search_pipeline_name,
+        EMBEDDING_CACHE_BACKEND: 'opensearch',
+        EMBEDDING_CACHE_INDEX: embedding_cache_index_name,
+        ANSWER_CACHE_INDEX_NAME: answer_cache_index_name,
+        ANSWER_CACHE_THRESHOLD: '0.95',
+        VECTOR_INDEX_PROFILE: vector_index_profile,
+        AWS_LAMBDA_EXEC_WRAPPER: '/opt/bootstrap',
+        AWS_LWA_INVOKE_MODE: 'response_stream',
+        PORT: '8080'
+      },
+    });
+    // IAM 인증: 프론트엔드(Fargate task role)가 SigV4로 서명한 요청만 허용
+    const chatbotStreamUrl = chatbotStreamFunction.addFunctionUrl({
+      authType: lambda.FunctionUrlAuthType.AWS_IAM,
+      invokeMode: lambda.InvokeMode.RESPONSE_STREAM,
+      cors: {
+        allowedOrigins: ['*'],
+        allowedMethods: [lambda.HttpMethod.POST],
+        allowedHeaders: ['Content-Type', 'Authorization', 'X-Amz-Date', 'X-Amz-Security-Token', 'X-Amz-Content-Sha256']
+      }
+    });
+
+    opensearchdomain.grantRead(chatbotStreamFunction);
+    domain.grantReadWrite(chatbotStreamFunction);
+    domain.grantIndexReadWrite('*', chatbotStreamFunction);
+    opensearchpassword.grantRead(chatbotStreamFunction);
+    opensearchid.grantRead(chatbotStreamFunction);
+
+    new ssm.StringParameter(this, 'WWAPI-ChatStreamUrlParameter', {
+      parameterName: '/wwapi/chat-stream-url',
+      stringValue: chatbotStreamUrl.url,
+    });
+    // 프론트엔드 스택이 Function URL 호출 권한을 부여할 때 사용
+    new ssm.StringParameter(this, 'WWAPI-ChatStreamFunctionArnParameter', {
+      parameterName: '/wwapi/chat-stream-function-arn',
+      stringValue: chatbotStreamFunction.functionArn,
+    });
+    new cdk.CfnOutput(this, 'ChatStreamUrl', {
+      value: chatbotStreamUrl.url,
+      description: 'Streaming chat Function URL',
+    });
+
     opensearchdomain.grantRead(chatbotFunction);
     domain.grantReadWrite(chatbotFunction);
     domain.grantIndexReadWrite('*', chatbotFunction);   